@@ -1,17 +1,41 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Query
+from fastapi import FastAPI, APIRouter, HTTPException, Query, UploadFile, File, Request
+from fastapi.responses import StreamingResponse, JSONResponse, ORJSONResponse
+from fastapi.encoders import jsonable_encoder
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.datastructures import UploadFile as StarletteUploadFile, Headers
+from starlette.formparsers import MultiPartParser, MultiPartException
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure, BulkWriteError
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, NamedTuple, Iterable, AsyncIterator
 import uuid
+import asyncio
+import time
 from datetime import datetime, timedelta
-from emergentintegrations.llm.chat import LlmChat, UserMessage
 import math
-from collections import defaultdict
+import numpy as np
+from collections import defaultdict, deque
+import re
+import bisect
+import hashlib
+import json
+import operator
+from cachetools import TTLCache, TLRUCache
+import base64
+import binascii
+import io
+import shutil
+import tempfile
+import random
+import functools
+from urllib.parse import parse_qsl, urlencode
+from PIL import Image, ImageOps
+from concurrent.futures import ThreadPoolExecutor
 
 
 ROOT_DIR = Path(__file__).parent
@@ -22,8 +46,84 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
-# Create the main app without a prefix
-app = FastAPI()
+# Seconds between full reloads of the in-memory bin index
+BIN_INDEX_REFRESH_SECONDS = float(os.environ.get('BIN_INDEX_REFRESH_SECONDS', '60'))
+
+# Classification result cache (set CLASSIFICATION_CACHE_SHARED=true to share it across workers via Mongo)
+CLASSIFICATION_CACHE_TTL_SECONDS = int(os.environ.get('CLASSIFICATION_CACHE_TTL_SECONDS', '86400'))
+CLASSIFICATION_CACHE_SIZE = int(os.environ.get('CLASSIFICATION_CACHE_SIZE', '10000'))
+CLASSIFICATION_CACHE_SHARED = os.environ.get('CLASSIFICATION_CACHE_SHARED', 'false').lower() == 'true'
+
+# Descriptions the local keyword classifier matches with at least this confidence skip the LLM
+LOCAL_CLASSIFIER_THRESHOLD = float(os.environ.get('LOCAL_CLASSIFIER_THRESHOLD', '0.8'))
+
+# Leaderboard sorted sets live in Mongo ("mongo") or in this process only ("memory", for tests/single worker)
+LEADERBOARD_STORE = os.environ.get('LEADERBOARD_STORE', 'mongo')
+
+# Seconds between full recomputes of the global analytics snapshot
+ANALYTICS_RECONCILE_SECONDS = float(os.environ.get('ANALYTICS_RECONCILE_SECONDS', '300'))
+
+# Seconds between re-reads of the badge_definitions collection (picks up reloads made on other workers)
+BADGE_RULES_REFRESH_SECONDS = float(os.environ.get('BADGE_RULES_REFRESH_SECONDS', '300'))
+
+# Concurrent LLM requests across the whole process, and the largest accepted batch
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', '8'))
+BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', '100'))
+
+# LLM client: LLM_BACKEND=fake answers in-process after FAKE_LLM_LATENCY_MS (tests/benchmarks)
+LLM_BACKEND = os.environ.get('LLM_BACKEND', 'emergent')
+LLM_PROVIDER = os.environ.get('LLM_PROVIDER', 'openai')
+LLM_MODEL = os.environ.get('LLM_MODEL', 'gpt-4o-mini')
+LLM_TIMEOUT_SECONDS = float(os.environ.get('LLM_TIMEOUT_SECONDS', '30'))
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', '2'))
+LLM_RETRY_BASE_SECONDS = float(os.environ.get('LLM_RETRY_BASE_SECONDS', '0.5'))
+LLM_BREAKER_THRESHOLD = int(os.environ.get('LLM_BREAKER_THRESHOLD', '5'))
+LLM_BREAKER_RESET_SECONDS = float(os.environ.get('LLM_BREAKER_RESET_SECONDS', '30'))
+LLM_WARMUP = os.environ.get('LLM_WARMUP', 'false').lower() == 'true'
+FAKE_LLM_LATENCY_MS = float(os.environ.get('FAKE_LLM_LATENCY_MS', '0'))
+
+# Async classification jobs: queue in Mongo ("mongo") or in this process ("memory")
+JOB_QUEUE = os.environ.get('JOB_QUEUE', 'mongo')
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '8'))
+JOB_QUEUE_MAX_DEPTH = int(os.environ.get('JOB_QUEUE_MAX_DEPTH', '1000'))
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', '180'))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '3'))
+JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', '1'))
+JOB_RESULT_TTL_SECONDS = int(os.environ.get('JOB_RESULT_TTL_SECONDS', '86400'))
+
+# Largest page a list endpoint returns
+PAGE_SIZE_MAX = int(os.environ.get('PAGE_SIZE_MAX', '500'))
+
+# Write-behind for user_stats counters: scans and report points are buffered in memory and
+# written with one bulk_write every USER_STATS_FLUSH_MS or USER_STATS_FLUSH_OPS updates,
+# whichever comes first; a crash loses at most the unflushed window
+USER_STATS_WRITE_BEHIND = os.environ.get('USER_STATS_WRITE_BEHIND', 'false').lower() == 'true'
+USER_STATS_FLUSH_MS = float(os.environ.get('USER_STATS_FLUSH_MS', '500'))
+USER_STATS_FLUSH_OPS = int(os.environ.get('USER_STATS_FLUSH_OPS', '1000'))
+
+# Rendered responses of read-mostly GET routes kept by this process (see declare_cached_route)
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', '1000'))
+
+# Per-query timeout for concurrent fan-out inside handlers
+QUERY_TIMEOUT_SECONDS = float(os.environ.get('QUERY_TIMEOUT_SECONDS', '10'))
+
+# Run explain() on every registered query shape at startup and refuse to start on COLLSCAN
+VERIFY_QUERY_PLANS = os.environ.get('VERIFY_QUERY_PLANS', 'false').lower() == 'true'
+
+# Image blobs live in GridFS ("gridfs") or under BLOB_STORE_DIR ("local", for tests/single host)
+BLOB_STORE = os.environ.get('BLOB_STORE', 'gridfs')
+BLOB_STORE_DIR = Path(os.environ.get('BLOB_STORE_DIR', str(ROOT_DIR / 'blobs')))
+BLOB_MAX_BYTES = int(os.environ.get('BLOB_MAX_BYTES', str(10 * 1024 * 1024)))
+THUMBNAIL_SIZE = int(os.environ.get('THUMBNAIL_SIZE', '256'))
+
+# Uploaded scans are downscaled to this many pixels on the long side before classification
+CLASSIFY_IMAGE_MAX_PX = int(os.environ.get('CLASSIFY_IMAGE_MAX_PX', '1024'))
+# Threads decoding/resizing images; bounds the memory held by decoded bitmaps
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', '4'))
+
+# Create the main app without a prefix; responses are serialized with orjson
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -75,6 +175,63 @@ WASTE_CATEGORIES = {
     }
 }
 
+# Disposal tips served by /api/tips/{category}
+TIPS_DATABASE = {
+    "RECYCLE": [
+        "Rinse containers before recycling to avoid contamination",
+        "Remove caps and lids from bottles",
+        "Flatten cardboard boxes to save space",
+        "Don't bag recyclables - keep them loose",
+        "Check local guidelines for specific materials"
+    ],
+    "COMPOST": [
+        "Balance green and brown materials",
+        "Turn your compost regularly for faster decomposition",
+        "Keep compost moist but not waterlogged",
+        "Avoid meat, dairy, and oily foods",
+        "Chop large items for faster breakdown"
+    ],
+    "E_WASTE": [
+        "Never throw electronics in regular trash",
+        "Remove batteries before recycling devices",
+        "Delete personal data before disposing",
+        "Look for manufacturer take-back programs",
+        "E-waste contains valuable recoverable materials"
+    ],
+    "HAZARDOUS": [
+        "Store hazardous waste in original containers",
+        "Never mix different chemicals",
+        "Contact local hazardous waste facility",
+        "Use up products completely when possible",
+        "Consider safer alternatives for future purchases"
+    ],
+    "LANDFILL": [
+        "Try to reduce landfill waste",
+        "Consider repairing instead of discarding",
+        "Explore creative reuse options",
+        "Check if items can be donated",
+        "Future purchases: choose recyclable alternatives"
+    ]
+}
+
+# Extra category items can be loaded from a JSON file: {"RECYCLE": ["pizza box", ...], ...}
+WASTE_TERMS_FILE = os.environ.get('WASTE_TERMS_FILE')
+if WASTE_TERMS_FILE:
+    with open(WASTE_TERMS_FILE) as terms_file:
+        for _category, _items in json.load(terms_file).items():
+            _known = set(WASTE_CATEGORIES[_category]['items'])
+            WASTE_CATEGORIES[_category]['items'].extend(i.lower() for i in _items if i.lower() not in _known)
+
+# Points needed to reach levels 2, 3, 4, 5 and 6
+LEVEL_THRESHOLDS = [100, 500, 1000, 2500, 5000]
+
+# Per-category counters in user_stats
+CATEGORY_COUNTERS = {
+    "RECYCLE": "items_recycled",
+    "COMPOST": "compost_items",
+    "E_WASTE": "ewaste_items"
+}
+
 # Badge definitions with requirements
 BADGES = {
     "Eco Warrior": {
@@ -127,7 +284,7 @@ BADGES = {
 # ============================================
 class WasteClassification(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    image_base64: str
+    image_id: Optional[str] = None
     classification: str
     category: str
     sub_category: Optional[str] = None
@@ -139,6 +296,8 @@ class WasteClassification(BaseModel):
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     user_id: str = "default_user"
     location: Optional[Dict[str, float]] = None
+    classified_by: str = "llm"  # local, cache, llm or coalesced
+    local_confidence: Optional[float] = None
 
 class WasteClassificationRequest(BaseModel):
     image_base64: str
@@ -147,6 +306,9 @@ class WasteClassificationRequest(BaseModel):
     longitude: Optional[float] = None
     description: Optional[str] = None
 
+class WasteClassificationBatchRequest(BaseModel):
+    items: List[WasteClassificationRequest]
+
 class WasteClassificationResponse(BaseModel):
     id: str
     classification: str
@@ -168,12 +330,25 @@ class BinLocation(BaseModel):
     address: str
     status: str = "active"
     capacity: int = 100
-    last_emptied: Optional<br>] = None
+    last_emptied: Optional[datetime] = None
     timings: str = "24/7"
     accepted_waste_types: List[str] = []
     contact: Optional[str] = None
     special_instructions: Optional[str] = None
 
+class BinSummary(BaseModel):
+    """Compact bin for list and map views"""
+    id: str
+    name: str
+    type: str
+    latitude: float
+    longitude: float
+    address: str
+    status: str
+    capacity: int
+    timings: str
+    distance: Optional[float] = None
+
 class BinLocationCreate(BaseModel):
     name: str
     type: str
@@ -203,6 +378,7 @@ class UserStats(BaseModel):
     monthly_stats: Dict[str, Any] = {}
     level: int = 1
     rank: Optional[str] = None
+    last_badges_awarded: List[str] = []
 
 class WasteReport(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -211,12 +387,23 @@ class WasteReport(BaseModel):
     latitude: float
     longitude: float
     description: str
-    image_base64: Optional[str] = None
+    image_id: Optional[str] = None
+    thumbnail_id: Optional[str] = None
     status: str = "pending"
     priority: str = "medium"
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     resolved_at: Optional[datetime] = None
 
+class WasteReportSummary(BaseModel):
+    id: str
+    location: str
+    latitude: float
+    longitude: float
+    status: str
+    priority: str
+    timestamp: datetime
+    thumbnail_id: Optional[str] = None
+
 class WasteReportCreate(BaseModel):
     user_id: Optional[str] = "default_user"
     location: str
@@ -226,6 +413,20 @@ class WasteReportCreate(BaseModel):
     image_base64: Optional[str] = None
     priority: Optional[str] = "medium"
 
+class ClassificationSummary(BaseModel):
+    id: str
+    classification: str
+    category: str
+    points_awarded: int
+    co2_saved: float
+    timestamp: datetime
+
+class LeaderboardSummary(BaseModel):
+    user_id: str
+    username: str
+    total_points: int
+    rank: int
+
 class LeaderboardEntry(BaseModel):
     user_id: str
     username: str
@@ -247,110 +448,575 @@ class MonthlyReport(BaseModel):
     comparison_to_last_month: Dict[str, Any]
 
 
+# ============================================
+# INDEX REGISTRY
+# ============================================
+# Indexes and query shapes are declared next to the code that relies on them
+REQUIRED_INDEXES: List[Tuple[str, List[Tuple[str, Any]], Dict[str, Any]]] = []
+QUERY_SHAPES: List[Dict[str, Any]] = []
+
+def declare_index(collection: str, keys: List[Tuple[str, Any]], **options):
+    """Register an index to be created (idempotently) at startup"""
+    REQUIRED_INDEXES.append((collection, keys, options))
+
+def declare_query(name: str, collection: str, filter: Dict[str, Any],
+                  sort: Optional[List[Tuple[str, int]]] = None):
+    """Register a query shape whose plan must not fall back to a collection scan"""
+    QUERY_SHAPES.append({"name": name, "collection": collection, "filter": filter, "sort": sort})
+
+async def ensure_indexes():
+    """Create every declared index; existing ones are left untouched"""
+    for collection, keys, options in REQUIRED_INDEXES:
+        try:
+            await db[collection].create_index(keys, **options)
+        except OperationFailure as e:
+            # e.g. duplicates blocking a unique index: report it, keep serving
+            logging.error(f"Could not create index {keys} on {collection}: {e}")
+
+def plan_stages(plan: Any) -> List[str]:
+    """All stage names in an explain() plan tree"""
+    if isinstance(plan, list):
+        return [stage for child in plan for stage in plan_stages(child)]
+    if not isinstance(plan, dict):
+        return []
+    stages = [plan['stage']] if 'stage' in plan else []
+    for value in plan.values():
+        stages.extend(plan_stages(value))
+    return stages
+
+async def verify_query_plans() -> List[Dict[str, Any]]:
+    """Explain every declared query shape and report its winning plan stages"""
+    report = []
+    for shape in QUERY_SHAPES:
+        command = {"find": shape['collection'], "filter": shape['filter']}
+        if shape['sort']:
+            command["sort"] = dict(shape['sort'])
+        explained = await db.command({"explain": command, "verbosity": "queryPlanner"})
+        stages = plan_stages(explained['queryPlanner']['winningPlan'])
+        report.append({"name": shape['name'], "stages": stages, "collscan": "COLLSCAN" in stages})
+    return report
+
+
+# ============================================
+# KEYSET PAGINATION
+# ============================================
+# List endpoints return a JSON array and put the next page's cursor in this header
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values: List[Any]) -> str:
+    """Opaque token for the sort key of the last row on a page"""
+    payload = [{"$date": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(token: str, size: int) -> List[Any]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        if not isinstance(payload, list) or len(payload) != size:
+            raise ValueError("wrong cursor shape")
+        return [datetime.fromisoformat(v["$date"]) if isinstance(v, dict) else v for v in payload]
+    except (ValueError, TypeError, KeyError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_filter(sort: List[Tuple[str, int]], values: List[Any]) -> Dict[str, Any]:
+    """Filter for rows strictly after `values` in `sort` order (no skip needed)"""
+    branches = []
+    for depth, (field, direction) in enumerate(sort):
+        branch = {f: v for (f, _), v in zip(sort[:depth], values)}
+        branch[field] = {"$gt" if direction == 1 else "$lt": values[depth]}
+        branches.append(branch)
+    return {"$or": branches}
+
+def page_size(limit: int) -> int:
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    return min(limit, PAGE_SIZE_MAX)
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[List[str]]:
+    """Validate a comma-separated `fields` parameter against the fields a response may carry"""
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = sorted(set(requested) - set(allowed))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+def field_projection(fields: Iterable[str], required: Iterable[str] = ()) -> Dict[str, Any]:
+    """Mongo projection for the fields a response uses plus those needed for sorting/cursors"""
+    return {"_id": 0, **{f: 1 for f in [*fields, *required]}}
+
+LIST_VIEWS = ("summary", "detail")
+
+def view_model(view: str, summary_model, detail_model):
+    """Response model for a list endpoint's `view` parameter"""
+    if view not in LIST_VIEWS:
+        raise HTTPException(status_code=400, detail=f"view must be one of {', '.join(LIST_VIEWS)}")
+    return summary_model if view == "summary" else detail_model
+
+@functools.lru_cache(maxsize=None)
+def model_defaults(model) -> Dict[str, Any]:
+    """Plain defaults of a model's optional fields (factory defaults are left out)"""
+    return {name: field.default for name, field in model.model_fields.items()
+            if not field.is_required() and field.default_factory is None}
+
+def trusted_rows(model, rows: List[Dict[str, Any]], fields: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """Shape documents read back from our own collections as `model` rows without re-validating.
+
+    Everything stored was validated on the way in, so like model_construct this
+    only fills defaults and drops unknown keys, but it stays a dict orjson can
+    write directly.
+    """
+    defaults = model_defaults(model)
+    keys = list(fields or model.__fields__)
+    return [{f: row.get(f, defaults.get(f)) for f in keys} for row in rows]
+
+def paged_response(rows: List[Dict[str, Any]], next_cursor: Optional[str]) -> ORJSONResponse:
+    """JSON array of already-shaped rows, with the next cursor in a header.
+
+    Returning the response directly skips response_model validation and
+    jsonable_encoder; rows must hold only orjson-native values.
+    """
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    return ORJSONResponse(content=rows, headers=headers)
+
+
+# ============================================
+# HTTP RESPONSE CACHE
+# ============================================
+class CachedRoute(NamedTuple):
+    pattern: re.Pattern
+    ttl: float  # Seconds this process reuses a rendered response
+    cache_control: bytes
+    resources: Tuple[str, ...]
+
+class CachedResponse(NamedTuple):
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+    etag: bytes
+    versions: Tuple[int, ...]
+    ttl: float
+
+class ResponseCache:
+    """Rendered 200 responses of read-mostly GET routes, keyed by path and query.
+
+    Each route names the resources it reads. Write paths call invalidate() on
+    those resources, which bumps their version and retires every entry rendered
+    before the write. Versions are per process, so another worker's writes show
+    up here once the entry's TTL runs out.
+    """
+
+    def __init__(self, maxsize: int):
+        self.routes: List[CachedRoute] = []
+        self._versions: Dict[str, int] = defaultdict(int)
+        self._entries = TLRUCache(maxsize=maxsize, ttu=lambda _key, entry, now: now + entry.ttl)
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def match(self, path: str) -> Optional[CachedRoute]:
+        return next((route for route in self.routes if route.pattern.fullmatch(path)), None)
+
+    def versions(self, route: CachedRoute) -> Tuple[int, ...]:
+        return tuple(self._versions[resource] for resource in route.resources)
+
+    def invalidate(self, *resources: str):
+        for resource in resources:
+            self._versions[resource] += 1
+
+    def get(self, key: str, route: CachedRoute) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.versions != self.versions(route):
+            return None
+        return entry
+
+    def put(self, key: str, entry: CachedResponse):
+        self._entries[key] = entry
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size": len(self._entries),
+            "versions": dict(self._versions)
+        }
+
+response_cache = ResponseCache(RESPONSE_CACHE_SIZE)
+
+def declare_cached_route(path_regex: str, ttl: float, max_age: int = 0, resources: Iterable[str] = ()):
+    """Cache GET responses for paths matching `path_regex`.
+
+    Clients may reuse a response for `max_age` seconds; with the default of 0
+    they revalidate every time, which costs a 304 while the ETag still matches.
+    """
+    cache_control = f"public, max-age={max_age}" if max_age else "no-cache"
+    response_cache.routes.append(CachedRoute(re.compile(path_regex), ttl, cache_control.encode(), tuple(resources)))
+
+def etag_matches(if_none_match: str, etag: bytes) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for GET)"""
+    if if_none_match.strip() == "*":
+        return True
+    return etag.decode() in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+class ResponseCacheMiddleware:
+    """Serves declared routes from response_cache, with strong ETags and 304s"""
+
+    def __init__(self, app, cache: ResponseCache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        route = None
+        if RESPONSE_CACHE_ENABLED and scope['type'] == 'http' and scope['method'] == 'GET':
+            route = self.cache.match(scope['path'])
+        if route is None:
+            return await self.app(scope, receive, send)
+        
+        query = urlencode(sorted(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True)))
+        key = f"{scope['path']}?{query}"
+        entry = self.cache.get(key, route)
+        if entry is not None:
+            self.cache.hits += 1
+            status = b"HIT"
+        else:
+            self.cache.misses += 1
+            status = b"MISS"
+            entry = await self._render(scope, receive, send, route)
+            if entry is None:
+                return
+            self.cache.put(key, entry)
+        
+        headers = [*entry.headers, (b"etag", entry.etag), (b"cache-control", route.cache_control), (b"x-cache", status)]
+        if etag_matches(Headers(scope=scope).get("if-none-match", ""), entry.etag):
+            self.cache.not_modified += 1
+            headers = [(name, value) for name, value in headers if name not in (b"content-length", b"content-type")]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": entry.body})
+
+    async def _render(self, scope, receive, send, route: CachedRoute) -> Optional[CachedResponse]:
+        """Run the route and buffer its response; anything but a 200 is passed straight through"""
+        # Taken before rendering, so a write that lands mid-render retires this entry
+        versions = self.cache.versions(route)
+        start, chunks = {}, []
+        
+        async def capture(message):
+            if message['type'] == 'http.response.start':
+                start.update(message)
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+        
+        await self.app(scope, receive, capture)
+        body = b"".join(chunks)
+        if start['status'] != 200:
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+            return None
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'.encode()
+        headers = [(name, value) for name, value in start.get('headers', []) if name not in (b"etag", b"cache-control")]
+        return CachedResponse(headers, body, etag, versions, route.ttl)
+
+
 # ============================================
 # HELPER FUNCTIONS
 # ============================================
-def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calculate distance between two coordinates in km"""
-    R = 6371  # Earth's radius in km
-    lat1_rad = math.radians(lat1)
-    lat2_rad = math.radians(lat2)
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Distances in km from one point to arrays of coordinates"""
+    lat_rad = math.radians(lat)
+    lats_rad = np.radians(lats)
+    dlat = lats_rad - lat_rad
+    dlon = np.radians(lons) - math.radians(lon)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat_rad) * np.cos(lats_rad) * np.sin(dlon / 2) ** 2
+    return 2 * 6371 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def haversine_matrix(origin_lats: np.ndarray, origin_lons: np.ndarray,
+                     lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Many-to-many distances in km, shape (len(origins), len(destinations))"""
+    o_lat = np.radians(np.asarray(origin_lats, dtype=float))[:, None]
+    o_lon = np.radians(np.asarray(origin_lons, dtype=float))[:, None]
+    d_lat = np.radians(np.asarray(lats, dtype=float))[None, :]
+    d_lon = np.radians(np.asarray(lons, dtype=float))[None, :]
+    a = np.sin((d_lat - o_lat) / 2) ** 2 + np.cos(o_lat) * np.cos(d_lat) * np.sin((d_lon - o_lon) / 2) ** 2
+    return 2 * 6371 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def top_k_indices(distances: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k smallest distances, sorted ascending"""
+    if k < len(distances):
+        candidates = np.argpartition(distances, k)[:k]
+    else:
+        candidates = np.arange(len(distances))
+    return candidates[np.argsort(distances[candidates], kind="stable")]
+
+def bin_geo_point(latitude: float, longitude: float) -> Dict[str, Any]:
+    """Build the GeoJSON point stored on bin documents (lon/lat order)"""
+    return {"type": "Point", "coordinates": [longitude, latitude]}
+
+def waste_type_filter(waste_type: str) -> Dict[str, Any]:
+    """Mongo filter matching bins that accept a waste type (case-insensitive)"""
+    pattern = re.compile(f"^{re.escape(waste_type)}$", re.IGNORECASE)
+    return {"$or": [{"accepted_waste_types": pattern}, {"type": pattern}]}
+
+declare_index("bin_locations", [("location", "2dsphere")])
+declare_index("bin_locations", [("id", 1)], unique=True)
+declare_index("bin_locations", [("status", 1)])
+declare_query("bin by id", "bin_locations", {"id": "bin"})
+declare_query("bins by status", "bin_locations", {"status": "active"})
+
+async def geo_near_bins(latitude: float, longitude: float, query: Dict[str, Any],
+                        max_distance_km: Optional[float] = None, limit: int = 100,
+                        after: Optional[List[Any]] = None,
+                        projection: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Run a $geoNear query against the 2dsphere index, nearest first.
+
+    Each returned bin carries a `distance` field in km. `after` is a
+    (distance, id) keyset position: results continue strictly after it, with
+    ties on distance broken by id.
+    """
+    geo_near = {
+        "near": bin_geo_point(latitude, longitude),
+        "distanceField": "distance",
+        "distanceMultiplier": 0.001,  # meters -> km
+        "spherical": True,
+        "query": query
+    }
+    if max_distance_km is not None:
+        geo_near["maxDistance"] = max_distance_km * 1000
     
-    a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    distance = R * c
-    return distance
+    pipeline = [{"$geoNear": geo_near}]
+    if after:
+        # minDistance prunes the index scan; the match makes the cut exact
+        geo_near["minDistance"] = max(after[0] * 1000 - 1, 0)
+        pipeline.append({"$match": keyset_filter([("distance", 1), ("id", 1)], after)})
+    # $geoNear leaves the order of equidistant bins open; every page (the first
+    # included) must cut at the same (distance, id) order the cursor resumes from
+    pipeline += [{"$sort": {"distance": 1, "id": 1}}, {"$limit": limit}, {"$project": projection or {"_id": 0}}]
+    return await db.bin_locations.aggregate(pipeline).to_list(limit)
 
 async def find_nearest_bins(latitude: float, longitude: float, waste_category: str, limit: int = 3):
     """Find nearest bins for a specific waste category"""
     try:
-        bins = await db.bin_locations.find().to_list(100)
-        
-        bins_with_distance = []
-        for bin_data in bins:
-            distance = calculate_distance(latitude, longitude, bin_data['latitude'], bin_data['longitude'])
-            
-            # Check if bin accepts this waste type
-            bin_types = bin_data.get('accepted_waste_types', [])
-            if waste_category.lower() in [t.lower() for t in bin_types] or bin_data['type'].upper() == waste_category:
-                bins_with_distance.append({
-                    "id": bin_data['id'],
-                    "name": bin_data['name'],
-                    "address": bin_data['address'],
-                    "distance_km": round(distance, 2),
-                    "status": bin_data['status'],
-                    "timings": bin_data['timings'],
-                    "capacity": bin_data['capacity']
-                })
-        
-        # Sort by distance and return top results
-        bins_with_distance.sort(key=lambda x: x['distance_km'])
-        return bins_with_distance[:limit]
+        if bin_index.ready:
+            bins = bin_index.nearest(latitude, longitude, waste_category, limit=limit)
+        else:
+            bins = await geo_near_bins(latitude, longitude, waste_type_filter(waste_category), limit=limit)
+        
+        return [{
+            "id": bin_data['id'],
+            "name": bin_data['name'],
+            "address": bin_data['address'],
+            "distance_km": round(bin_data['distance'], 2),
+            "status": bin_data['status'],
+            "timings": bin_data['timings'],
+            "capacity": bin_data['capacity']
+        } for bin_data in bins]
     except Exception as e:
         logging.error(f"Error finding nearest bins: {e}")
         return []
 
 async def calculate_user_level(total_points: int) -> int:
     """Calculate user level based on points"""
-    if total_points < 100:
-        return 1
-    elif total_points < 500:
-        return 2
-    elif total_points < 1000:
-        return 3
-    elif total_points < 2500:
-        return 4
-    elif total_points < 5000:
-        return 5
-    else:
-        return 6
+    return 1 + sum(1 for threshold in LEVEL_THRESHOLDS if total_points >= threshold)
+
+REQUIREMENT_OPERATORS = {
+    ">=": (operator.ge, "$gte"),
+    ">": (operator.gt, "$gt"),
+    "<=": (operator.le, "$lte"),
+    "<": (operator.lt, "$lt"),
+    "==": (operator.eq, "$eq")
+}
+
+class BadgeRule(NamedTuple):
+    name: str
+    field: str
+    operator: str
+    threshold: float
+    points_bonus: int
+
+    def is_met(self, stats: UserStats) -> bool:
+        compare, _ = REQUIREMENT_OPERATORS[self.operator]
+        return compare(getattr(stats, self.field), self.threshold)
+
+    def mongo_expr(self) -> Dict[str, Any]:
+        """Aggregation expression: requirement met and badge not yet held"""
+        _, mongo_operator = REQUIREMENT_OPERATORS[self.operator]
+        return {"$and": [
+            {mongo_operator: [f"${self.field}", self.threshold]},
+            {"$not": {"$in": [self.name, "$badges"]}}
+        ]}
+
+# Numeric UserStats counters a badge requirement may compare against
+BADGE_STATS = frozenset(name for name, field in UserStats.__fields__.items() if field.annotation in (int, float))
+
+def parse_badge_requirement(requirement: str) -> Tuple[str, str, float]:
+    """Split a requirement like "items_scanned >= 10" into (field, operator, threshold)"""
+    match = re.fullmatch(r"\s*(\w+)\s*(>=|<=|==|>|<)\s*([\d.]+)\s*", requirement)
+    if not match:
+        raise ValueError(f"Unsupported badge requirement: {requirement}")
+    field, op, threshold = match.groups()
+    if field not in BADGE_STATS:
+        raise ValueError(f"Badge requirement must compare one of {', '.join(sorted(BADGE_STATS))}: {requirement}")
+    return field, op, float(threshold)
 
-async def check_and_award_badges(stats: UserStats) -> List[str]:
+class BadgeRuleEngine:
+    """Badge requirements compiled once into predicates, indexed by the stat they read"""
+
+    def __init__(self):
+        self.definitions: Dict[str, Dict[str, Any]] = {}
+        self.rules: List[BadgeRule] = []
+        self.rules_by_field: Dict[str, List[BadgeRule]] = {}
+
+    def load(self, definitions: Dict[str, Dict[str, Any]]):
+        """Compile badge definitions; raises ValueError without touching the active rules"""
+        rules = []
+        for name, info in definitions.items():
+            requirement, bonus = info.get('requirement'), info.get('points_bonus')
+            if not isinstance(requirement, str):
+                raise ValueError(f"Badge {name!r} needs a requirement string")
+            # bool is an int subclass, but True is no bonus anyone meant to write
+            if not isinstance(bonus, int) or isinstance(bonus, bool) or bonus < 0:
+                raise ValueError(f"Badge {name!r} needs a non-negative integer points_bonus, got {bonus!r}")
+            field, op, threshold = parse_badge_requirement(requirement)
+            rules.append(BadgeRule(name, field, op, threshold, bonus))
+        
+        rules_by_field = defaultdict(list)
+        for rule in rules:
+            rules_by_field[rule.field].append(rule)
+        self.definitions, self.rules, self.rules_by_field = dict(definitions), rules, dict(rules_by_field)
+
+    def rules_for(self, changed_fields: Optional[Iterable[str]] = None) -> List[BadgeRule]:
+        """Rules that depend on any of the changed fields (all rules when None)"""
+        if changed_fields is None:
+            return self.rules
+        return [rule for field in changed_fields for rule in self.rules_by_field.get(field, [])]
+
+    def points_bonus(self, badge_name: str) -> int:
+        return self.definitions[badge_name]['points_bonus']
+
+
+badge_engine = BadgeRuleEngine()
+badge_engine.load(BADGES)
+
+async def reload_badge_rules():
+    """Rebuild badge rules from BADGES overlaid with the badge_definitions collection"""
+    definitions = {name: dict(info) for name, info in BADGES.items()}
+    async for doc in db.badge_definitions.find({}, {"_id": 0}):
+        if not isinstance(doc.get('name'), str):
+            raise ValueError(f"Badge definition without a name: {doc}")
+        definitions[doc['name']] = {key: value for key, value in doc.items() if key != 'name'}
+    badge_engine.load(definitions)
+
+async def refresh_badge_rules_periodically():
+    """Pick up badge_definitions edits reloaded through another worker"""
+    while True:
+        await asyncio.sleep(BADGE_RULES_REFRESH_SECONDS)
+        try:
+            await reload_badge_rules()
+        except Exception as e:
+            logging.error(f"Badge rules refresh failed, keeping the active rules: {e}")
+
+async def check_and_award_badges(stats: UserStats, changed_fields: Optional[Iterable[str]] = None) -> List[str]:
     """Check and award new badges based on user stats"""
-    new_badges = []
     current_badges = set(stats.badges)
-    
-    for badge_name, badge_info in BADGES.items():
-        if badge_name not in current_badges:
-            requirement = badge_info['requirement']
-            # Evaluate requirement
-            if eval(requirement, {"__builtins__": {}}, stats.dict()):
-                new_badges.append(badge_name)
-                current_badges.add(badge_name)
-    
-    return new_badges
+    return [
+        rule.name for rule in badge_engine.rules_for(changed_fields)
+        if rule.name not in current_badges and rule.is_met(stats)
+    ]
 
-async def update_daily_streak(user_id: str, last_scan_date: Optional[datetime]) -> int:
-    """Update and calculate daily streak"""
-    now = datetime.utcnow()
-    
-    if not last_scan_date:
-        return 1
-    
-    days_diff = (now.date() - last_scan_date.date()).days
-    
-    if days_diff == 0:
-        # Same day, keep current streak
-        user_stats = await db.user_stats.find_one({"user_id": user_id})
-        return user_stats.get('daily_streak', 1)
-    elif days_diff == 1:
-        # Consecutive day, increment streak
-        user_stats = await db.user_stats.find_one({"user_id": user_id})
-        return user_stats.get('daily_streak', 0) + 1
-    else:
-        # Streak broken, reset to 1
-        return 1
+class WasteTermMatcher:
+    """Aho-Corasick automaton over the WASTE_CATEGORIES item lists.
+
+    Scans a text once, whatever the number of terms, and only reports matches
+    that start and end on word boundaries (a trailing plural "s"/"es" is allowed).
+    """
+
+    def __init__(self, term_categories: Dict[str, str]):
+        self.term_categories = term_categories
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+
+        for term in term_categories:
+            state = 0
+            for ch in term:
+                if ch not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][ch] = len(self._goto) - 1
+                state = self._goto[state][ch]
+            self._output[state].append(term)
+
+        # Breadth-first so every failure target is finished before its dependants
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    @classmethod
+    def from_categories(cls, categories: Dict[str, Dict[str, Any]]) -> "WasteTermMatcher":
+        term_categories = {}
+        for category, data in categories.items():
+            for item in data['items']:
+                # First category listing a term wins, as with the old dict-order scan
+                term_categories.setdefault(item.lower(), category)
+        return cls(term_categories)
+
+    @staticmethod
+    def _is_boundary(text: str, position: int) -> bool:
+        return position < 0 or position >= len(text) or not text[position].isalnum()
+
+    def _ends_on_boundary(self, text: str, end: int) -> bool:
+        return any(
+            text[end:end + len(suffix)] == suffix and self._is_boundary(text, end + len(suffix))
+            for suffix in ("", "s", "es")
+        )
+
+    def find_all(self, text: str) -> List[Tuple[int, str, str]]:
+        """All word-bounded matches as (start, term, category), in text order"""
+        text = text.lower()
+        matches = []
+        state = 0
+        for position, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for term in self._output[state]:
+                start = position - len(term) + 1
+                if self._is_boundary(text, start - 1) and self._ends_on_boundary(text, position + 1):
+                    matches.append((start, term, self.term_categories[term]))
+        matches.sort(key=lambda m: m[0])
+        return matches
+
+    @staticmethod
+    def pick_longest(matches: List[Tuple[int, str, str]]) -> Optional[Tuple[str, str]]:
+        """The longest (term, category) among matches, earliest one on ties"""
+        if not matches:
+            return None
+        _, term, category = max(matches, key=lambda m: (len(m[1]), -m[0]))
+        return term, category
+
+    def longest_match(self, text: str) -> Optional[Tuple[str, str]]:
+        return self.pick_longest(self.find_all(text))
+
+
+waste_term_matcher = WasteTermMatcher.from_categories(WASTE_CATEGORIES)
 
 def categorize_waste_from_classification(classification: str) -> tuple:
     """Determine category and sub-category from classification"""
-    classification_lower = classification.lower()
-    
-    for category, data in WASTE_CATEGORIES.items():
-        for item in data['items']:
-            if item in classification_lower:
-                return category, data
+    match = waste_term_matcher.longest_match(classification)
+    if match:
+        _, category = match
+        return category, WASTE_CATEGORIES[category]
     
     return "LANDFILL", WASTE_CATEGORIES["LANDFILL"]
 
@@ -378,221 +1044,1796 @@ async def get_waste_disposal_tips(category: str, classification: str) -> Dict[st
     }
 
 
-# ============================================
-# AI CLASSIFICATION WITH ADVANCED LOGIC
-# ============================================
-@api_router.post("/classify-waste", response_model=WasteClassificationResponse)
-async def classify_waste(request: WasteClassificationRequest):
-    try:
-        # Initialize LLM chat
-        llm_key = os.environ['EMERGENT_LLM_KEY']
-        chat = LlmChat(
-            api_key=llm_key,
-            session_id=f"waste-{uuid.uuid4()}",
-            system_message="You are an expert waste management AI. Classify waste items accurately and provide detailed disposal guidance."
-        ).with_model("openai", "gpt-4o-mini")
-        
-        # Enhanced prompt with user description
-        prompt = f"""Analyze this waste item and provide classification.
+# ============================================
+# CONCURRENT QUERY FAN-OUT
+# ============================================
+fanout_timings: Dict[str, Dict[str, float]] = defaultdict(lambda: {"calls": 0, "wall_ms": 0.0, "serial_ms": 0.0})
+
+async def fan_out(name: str, *awaitables, timeout: float = None) -> List[Any]:
+    """Run independent queries concurrently and return their results in order.
+
+    Each query gets its own timeout; if any fails or times out the others are
+    cancelled and the error propagates. Per-name timings record the wall time
+    (the critical path) next to the summed query time a sequential version
+    would have paid.
+    """
+    timeout = timeout or QUERY_TIMEOUT_SECONDS
+    durations = [0.0] * len(awaitables)
+
+    async def timed(position: int, awaitable):
+        started = time.perf_counter()
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        finally:
+            durations[position] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    tasks = [asyncio.ensure_future(timed(i, a)) for i, a in enumerate(awaitables)]
+    try:
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    timing = fanout_timings[name]
+    timing["calls"] += 1
+    timing["wall_ms"] += (time.perf_counter() - started) * 1000
+    timing["serial_ms"] += sum(durations) * 1000
+    return results
+
+async def write_all(*awaitables) -> List[Any]:
+    """Run independent writes concurrently, each to completion.
+
+    Unlike fan_out there is no timeout and a failure cancels nothing, so a
+    write is never abandoned halfway while its siblings go on; the first error
+    is raised once every write has finished.
+    """
+    results = await asyncio.gather(*awaitables, return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+def fanout_stats() -> Dict[str, Dict[str, float]]:
+    return {
+        name: {
+            "calls": t["calls"],
+            "avg_wall_ms": round(t["wall_ms"] / t["calls"], 2),
+            "avg_serial_ms": round(t["serial_ms"] / t["calls"], 2)
+        }
+        for name, t in fanout_timings.items() if t["calls"]
+    }
+
+async def no_result():
+    return None
+
+
+# ============================================
+# IMAGE BLOB STORE
+# ============================================
+BLOB_CHUNK_SIZE = 255 * 1024  # GridFS default chunk size
+
+image_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="image")
+
+class BlobTooLarge(Exception):
+    pass
+
+async def run_image_task(func, *args):
+    """Run blocking Pillow work on the bounded image thread pool"""
+    return await asyncio.get_running_loop().run_in_executor(image_executor, func, *args)
+
+class LocalBlobStore:
+    """Content-addressed blobs on the local filesystem, a stand-in for GridFS"""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def _path(self, blob_id: str) -> Path:
+        return self.root / blob_id[:2] / blob_id
+
+    async def exists(self, blob_id: str) -> bool:
+        return self._path(blob_id).exists()
+
+    async def put_file(self, blob_id: str, source, content_type: str):
+        if await self.exists(blob_id):
+            return
+
+        def write():
+            path = self._path(blob_id)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            partial = path.with_name(f"{blob_id}.{uuid.uuid4().hex}.part")
+            with open(partial, 'wb') as out:
+                shutil.copyfileobj(source, out, BLOB_CHUNK_SIZE)
+            path.with_name(f"{blob_id}.type").write_text(content_type)
+            os.replace(partial, path)
+
+        await asyncio.to_thread(write)
+
+    async def open(self, blob_id: str) -> Optional[Tuple[AsyncIterator[bytes], str]]:
+        path = self._path(blob_id)
+        if not path.exists():
+            return None
+        content_type = path.with_name(f"{blob_id}.type").read_text()
+
+        async def chunks():
+            with open(path, 'rb') as f:
+                while chunk := await asyncio.to_thread(f.read, BLOB_CHUNK_SIZE):
+                    yield chunk
+
+        return chunks(), content_type
+
+class GridFSBlobStore:
+    """Content-addressed blobs in a GridFS bucket, keyed by filename"""
+
+    def __init__(self, database, bucket_name: str = "blobs"):
+        self.bucket = AsyncIOMotorGridFSBucket(database, bucket_name=bucket_name,
+                                               chunk_size_bytes=BLOB_CHUNK_SIZE)
+        self.files = database[f"{bucket_name}.files"]
+
+    async def exists(self, blob_id: str) -> bool:
+        return await self.files.find_one({"filename": blob_id}, {"_id": 1}) is not None
+
+    async def put_file(self, blob_id: str, source, content_type: str):
+        if await self.exists(blob_id):
+            return
+        await self.bucket.upload_from_stream(blob_id, source, metadata={"content_type": content_type})
+
+    async def open(self, blob_id: str) -> Optional[Tuple[AsyncIterator[bytes], str]]:
+        file_doc = await self.files.find_one({"filename": blob_id})
+        if not file_doc:
+            return None
+        grid_out = await self.bucket.open_download_stream(file_doc['_id'])
+
+        async def chunks():
+            while chunk := await grid_out.readchunk():
+                yield chunk
+
+        return chunks(), file_doc['metadata']['content_type']
+
+def blob_id_for(data: Optional[bytes]) -> Optional[str]:
+    return hashlib.sha256(data).hexdigest() if data else None
+
+def decode_image_base64(image_base64: Optional[str]) -> Optional[bytes]:
+    """Decode a base64 image, accepting data: URLs; None if it is not valid base64.
+
+    Line breaks and other whitespace (MIME-style wrapping, which older clients
+    stored) and missing padding are tolerated; any other stray character is not.
+    """
+    if not image_base64:
+        return None
+    if image_base64.startswith("data:"):
+        image_base64 = image_base64.partition(",")[2]
+    image_base64 = "".join(image_base64.split())
+    image_base64 += "=" * (-len(image_base64) % 4)
+    try:
+        return base64.b64decode(image_base64, validate=True) or None
+    except (binascii.Error, ValueError):
+        return None
+
+def inspect_image(source) -> Tuple[str, Optional[bytes]]:
+    """Content type and a JPEG thumbnail of an image file (blocking, run in a thread)"""
+    try:
+        with Image.open(source) as image:
+            content_type = Image.MIME.get(image.format, "application/octet-stream")
+            image.draft("RGB", (THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+            image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+            thumbnail = io.BytesIO()
+            image.convert("RGB").save(thumbnail, "JPEG", quality=80)
+            return content_type, thumbnail.getvalue()
+    except Exception:
+        return "application/octet-stream", None
+    finally:
+        source.seek(0)
+
+def downscale_image(source, max_px: int) -> Optional[bytes]:
+    """Re-encode an image as a JPEG at most max_px on the long side; None if undecodable (blocking).
+
+    JPEGs are decoded at a reduced DCT scale via draft(), so a 12 MP phone photo
+    never materialises as a full-size bitmap.
+    """
+    try:
+        with Image.open(source) as image:
+            image.draft("RGB", (max_px, max_px))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((max_px, max_px))
+            encoded = io.BytesIO()
+            image.convert("RGB").save(encoded, "JPEG", quality=85)
+            return encoded.getvalue()
+    except Exception:
+        return None
+
+async def store_image(source, require_image: bool = False) -> Dict[str, Any]:
+    """Store an image file and its thumbnail, returning their content-addressed ids.
+
+    Undecodable files are stored without a thumbnail unless require_image is set,
+    in which case they raise ValueError before anything is written.
+    """
+    def digest():
+        sha = hashlib.sha256()
+        while chunk := source.read(BLOB_CHUNK_SIZE):
+            sha.update(chunk)
+        source.seek(0)
+        return sha.hexdigest()
+
+    image_id = await asyncio.to_thread(digest)
+    content_type, thumbnail = await run_image_task(inspect_image, source)
+    if require_image and thumbnail is None:
+        raise ValueError("Upload is not a recognised image")
+    thumbnail_id = blob_id_for(thumbnail)
+    await asyncio.gather(
+        blob_store.put_file(image_id, source, content_type),
+        blob_store.put_file(thumbnail_id, io.BytesIO(thumbnail), "image/jpeg") if thumbnail else no_result()
+    )
+    return {"image_id": image_id, "thumbnail_id": thumbnail_id, "content_type": content_type}
+
+async def upload_chunks(upload: StarletteUploadFile) -> AsyncIterator[bytes]:
+    while chunk := await upload.read(BLOB_CHUNK_SIZE):
+        yield chunk
+
+async def limited_chunks(chunks: AsyncIterator[bytes], max_bytes: int = None) -> AsyncIterator[bytes]:
+    """Pass a byte stream through, raising BlobTooLarge as soon as it exceeds max_bytes"""
+    max_bytes = max_bytes or BLOB_MAX_BYTES
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > max_bytes:
+            raise BlobTooLarge(f"Upload exceeds {max_bytes} bytes")
+        yield chunk
+
+async def spool_chunks(chunks: AsyncIterator[bytes], max_bytes: int = None):
+    """Copy a byte stream into a temp file (in memory until 1 MB), enforcing a size limit"""
+    max_bytes = max_bytes or BLOB_MAX_BYTES
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > max_bytes:
+            spool.close()
+            raise BlobTooLarge(f"Upload exceeds {max_bytes} bytes")
+        spool.write(chunk)
+    spool.seek(0)
+    return spool, size
+
+blob_store = LocalBlobStore(BLOB_STORE_DIR) if BLOB_STORE == 'local' else GridFSBlobStore(db)
+
+@api_router.post("/blobs")
+async def upload_blob(file: UploadFile = File(...)):
+    """Upload an image; identical content always maps to the same blob id"""
+    try:
+        spool, size = await spool_chunks(upload_chunks(file))
+        with spool:
+            stored = await store_image(spool, require_image=True)
+        return {**stored, "size": size}
+    except BlobTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/blobs/{blob_id}")
+async def download_blob(blob_id: str):
+    """Stream a blob; content-addressed, so it can be cached forever"""
+    if not re.fullmatch(r"[0-9a-f]{64}", blob_id):
+        raise HTTPException(status_code=404, detail="Blob not found")
+    opened = await blob_store.open(blob_id)
+    if opened is None:
+        raise HTTPException(status_code=404, detail="Blob not found")
+    chunks, content_type = opened
+    return StreamingResponse(chunks, media_type=content_type, headers={
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "ETag": f'"{blob_id}"'
+    })
+
+
+# ============================================
+# IN-MEMORY BIN SPATIAL INDEX
+# ============================================
+KM_PER_DEGREE = 6371 * math.pi / 180
+
+class BinPartition:
+    """Bins sharing one accepted waste type, stored as contiguous coordinate arrays.
+
+    Writes only append to `bins`; the arrays and the cell -> row index are
+    rebuilt lazily on the next read.
+    """
+
+    def __init__(self, cell_size_deg: float):
+        self.cell_size = cell_size_deg
+        self.bins: List[Dict[str, Any]] = []
+        self._dirty = True
+        self.lats = np.empty(0)
+        self.lons = np.empty(0)
+        self.cells: Dict[Tuple[int, int], np.ndarray] = {}
+        self.bounds = (0, 0, 0, 0)
+
+    def add(self, bin_data: Dict[str, Any]):
+        self.bins.append(bin_data)
+        self._dirty = True
+
+    def remove(self, bin_id: str):
+        self.bins = [b for b in self.bins if b['id'] != bin_id]
+        self._dirty = True
+
+    def compile(self):
+        if not self._dirty:
+            return
+        self.lats = np.array([b['latitude'] for b in self.bins], dtype=float)
+        self.lons = np.array([b['longitude'] for b in self.bins], dtype=float)
+        rows = np.floor(self.lats / self.cell_size).astype(int)
+        cols = np.floor(self.lons / self.cell_size).astype(int)
+        cells = defaultdict(list)
+        for position, cell in enumerate(zip(rows.tolist(), cols.tolist())):
+            cells[cell].append(position)
+        self.cells = {cell: np.array(positions) for cell, positions in cells.items()}
+        if self.bins:
+            self.bounds = (rows.min(), rows.max(), cols.min(), cols.max())
+        self._dirty = False
+
+
+class BinSpatialIndex:
+    """Grid index of bin locations, partitioned by accepted waste type.
+
+    Every bin is filed under its lowercased `type`, each lowercased entry of
+    `accepted_waste_types` and the catch-all "*" partition. Lookups only compute
+    distances (vectorized) for the grid cells around the query point instead of
+    the whole fleet.
+    """
+    ALL = "*"
+
+    def __init__(self, cell_size_deg: float = 0.01):
+        self.cell_size = cell_size_deg
+        self.ready = False
+        self._bins: Dict[str, Dict[str, Any]] = {}
+        self._partitions: Dict[str, BinPartition] = {}
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return (math.floor(latitude / self.cell_size), math.floor(longitude / self.cell_size))
+
+    @classmethod
+    def _partition_keys(cls, bin_data: Dict[str, Any]) -> set:
+        keys = {cls.ALL, bin_data.get('type', '').lower()}
+        keys.update(t.lower() for t in bin_data.get('accepted_waste_types', []))
+        return keys
+
+    def _insert(self, bin_data: Dict[str, Any]):
+        for key in self._partition_keys(bin_data):
+            if key not in self._partitions:
+                self._partitions[key] = BinPartition(self.cell_size)
+            self._partitions[key].add(bin_data)
+        self._bins[bin_data['id']] = bin_data
+
+    def _remove(self, bin_id: str):
+        bin_data = self._bins.pop(bin_id, None)
+        if bin_data is None:
+            return
+        for key in self._partition_keys(bin_data):
+            self._partitions[key].remove(bin_id)
+
+    def load(self, bins: List[Dict[str, Any]]):
+        """Replace the index contents with a fresh snapshot of bins"""
+        fresh = BinSpatialIndex(self.cell_size)
+        for bin_data in bins:
+            fresh._insert(bin_data)
+        for partition in fresh._partitions.values():
+            partition.compile()
+        # Swap in one step so concurrent readers never see a half-built index
+        self._bins, self._partitions = fresh._bins, fresh._partitions
+        self.ready = True
+
+    def upsert(self, bin_data: Dict[str, Any]):
+        """Add a bin or replace its indexed copy"""
+        self._remove(bin_data['id'])
+        self._insert(bin_data)
+
+    def update_fields(self, bin_id: str, **fields):
+        """Update non-spatial fields of an indexed bin in place"""
+        if bin_id in self._bins:
+            self._bins[bin_id].update(fields)
+
+    def _partition(self, waste_type: Optional[str]) -> Optional[BinPartition]:
+        partition = self._partitions.get((waste_type or self.ALL).lower())
+        if partition is None or not partition.bins:
+            return None
+        partition.compile()
+        return partition
+
+    @staticmethod
+    def _ring_cells(ci: int, cj: int, ring: int) -> List[Tuple[int, int]]:
+        """Cells exactly `ring` steps (Chebyshev distance) away from (ci, cj)"""
+        if ring == 0:
+            return [(ci, cj)]
+        cells = [(ci + d, cj + s) for d in range(-ring, ring + 1) for s in (-ring, ring)]
+        cells += [(ci + s, cj + d) for d in range(-ring + 1, ring) for s in (-ring, ring)]
+        return cells
+
+    @staticmethod
+    def _results(partition: BinPartition, positions: np.ndarray, distances: np.ndarray) -> List[Dict[str, Any]]:
+        return [{**partition.bins[p], "distance": float(d)} for p, d in zip(positions.tolist(), distances.tolist())]
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float,
+                      waste_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Bins within `radius_km` of a point, nearest first, with `distance` in km"""
+        partition = self._partition(waste_type)
+        if partition is None:
+            return []
+        lat_cells = math.ceil(min(radius_km, 20000) / KM_PER_DEGREE / self.cell_size)
+        cos_lat = max(math.cos(math.radians(min(abs(latitude) + lat_cells * self.cell_size, 89.0))), 0.01)
+        lon_cells = math.ceil(min(radius_km, 20000) / (KM_PER_DEGREE * cos_lat) / self.cell_size)
+        ci, cj = self._cell(latitude, longitude)
+
+        if (2 * lat_cells + 1) * (2 * lon_cells + 1) > len(partition.cells):
+            cells = [c for c in partition.cells if abs(c[0] - ci) <= lat_cells and abs(c[1] - cj) <= lon_cells]
+        else:
+            cells = [(i, j) for i in range(ci - lat_cells, ci + lat_cells + 1)
+                     for j in range(cj - lon_cells, cj + lon_cells + 1) if (i, j) in partition.cells]
+        if not cells:
+            return []
+
+        positions = np.concatenate([partition.cells[c] for c in cells])
+        distances = haversine_km(latitude, longitude, partition.lats[positions], partition.lons[positions])
+        inside = distances <= radius_km
+        positions, distances = positions[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return self._results(partition, positions[order], distances[order])
+
+    def nearest(self, latitude: float, longitude: float, waste_type: Optional[str] = None,
+                limit: int = 3) -> List[Dict[str, Any]]:
+        """The `limit` nearest bins to a point, with `distance` in km"""
+        partition = self._partition(waste_type)
+        if partition is None or limit <= 0:
+            return []
+        ci, cj = self._cell(latitude, longitude)
+        min_i, max_i, min_j, max_j = partition.bounds
+        max_ring = max(ci - min_i, max_i - ci, cj - min_j, max_j - cj)
+
+        positions = None
+        if (2 * max_ring + 1) ** 2 <= 4 * len(partition.cells):
+            found = []
+            for ring in range(max_ring + 1):
+                found.extend(partition.cells[c] for c in self._ring_cells(ci, cj, ring) if c in partition.cells)
+                if sum(len(f) for f in found) < limit:
+                    continue
+                candidates = np.concatenate(found)
+                distances = haversine_km(latitude, longitude, partition.lats[candidates], partition.lons[candidates])
+                kth = np.partition(distances, limit - 1)[limit - 1]
+                # Anything in unvisited rings is at least `ring` full cells away
+                cos_lat = max(math.cos(math.radians(min(abs(latitude) + (ring + 1) * self.cell_size, 89.0))), 0.01)
+                if kth <= ring * self.cell_size * KM_PER_DEGREE * cos_lat:
+                    positions = candidates
+                    break
+
+        if positions is None:
+            # Sparse partition, far-away query point or fewer bins than requested
+            positions = np.arange(len(partition.bins))
+            distances = haversine_km(latitude, longitude, partition.lats, partition.lons)
+
+        best = top_k_indices(distances, limit)
+        return self._results(partition, positions[best], distances[best])
+
+
+def plan_collection_route(latitude: float, longitude: float,
+                          bins: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Order bins for a collection run, always driving to the nearest unvisited bin next.
+
+    Each stop carries `leg_km`, the distance from the previous stop.
+    """
+    if not bins:
+        return []
+    lats = np.array([b['latitude'] for b in bins], dtype=float)
+    lons = np.array([b['longitude'] for b in bins], dtype=float)
+    # Row 0 is the start point, row i + 1 is bins[i]
+    legs = haversine_matrix(np.concatenate(([latitude], lats)), np.concatenate(([longitude], lons)), lats, lons)
+
+    visited = np.zeros(len(bins), dtype=bool)
+    route = []
+    current = 0
+    for _ in range(len(bins)):
+        row = np.where(visited, np.inf, legs[current])
+        nxt = int(np.argmin(row))
+        visited[nxt] = True
+        route.append({**bins[nxt], "leg_km": round(float(row[nxt]), 2)})
+        current = nxt + 1
+    return route
+
+
+bin_index = BinSpatialIndex()
+
+async def reload_bin_index():
+    """Rebuild the in-memory bin index from the database"""
+    bins = await db.bin_locations.find({}, {"_id": 0, "location": 0}).to_list(None)
+    bin_index.load(bins)
+
+async def refresh_bin_index_periodically():
+    """Keep the bin index (and cached bin pages) in sync with writes made by other workers"""
+    while True:
+        await asyncio.sleep(BIN_INDEX_REFRESH_SECONDS)
+        try:
+            await reload_bin_index()
+            response_cache.invalidate("bins")
+        except Exception as e:
+            logging.error(f"Bin index refresh failed: {e}")
+
+
+# ============================================
+# CLASSIFICATION CACHE
+# ============================================
+class ClassificationCache:
+    """Content-addressed cache of LLM classification results.
+
+    Entries are keyed by a SHA-256 of the image and normalized description and
+    kept in a local TTL/LRU cache, optionally backed by the shared
+    `classification_cache` collection.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: int, shared: bool = False):
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        self._local = TTLCache(maxsize=maxsize, ttl=ttl_seconds)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(image: bytes, description: Optional[str]) -> str:
+        normalized = " ".join((description or "").lower().split())
+        digest = hashlib.sha256(image)
+        digest.update(b"\0" + normalized.encode())
+        return digest.hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, str]]:
+        result = self._local.get(key)
+        if result is None and self.shared:
+            doc = await db.classification_cache.find_one({"_id": key, "expires_at": {"$gt": datetime.utcnow()}})
+            if doc:
+                result = doc['result']
+                self._local[key] = result
+        
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    async def set(self, key: str, result: Dict[str, str]):
+        self._local[key] = result
+        if self.shared:
+            await db.classification_cache.update_one(
+                {"_id": key},
+                {"$set": {
+                    "result": result,
+                    "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+                }},
+                upsert=True
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size": len(self._local),
+            "shared": self.shared
+        }
+
+
+declare_index("classification_cache", [("expires_at", 1)], expireAfterSeconds=0)
+
+classification_cache = ClassificationCache(
+    CLASSIFICATION_CACHE_SIZE, CLASSIFICATION_CACHE_TTL_SECONDS, CLASSIFICATION_CACHE_SHARED
+)
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key onto one in-flight task.
+
+    The shared task is shielded, so a caller that disconnects does not cancel
+    the work the other callers are waiting on.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _land(self, key: str, flight: asyncio.Future):
+        self._flights.pop(key, None)
+        if not flight.cancelled():
+            flight.exception()  # Mark as retrieved even if every waiter went away
+
+    async def run(self, key: str, func, *args) -> Tuple[Any, bool]:
+        """Await func(*args), or join the identical call already in flight; returns (result, coalesced)"""
+        flight = self._flights.get(key)
+        coalesced = flight is not None
+        if coalesced:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            flight = asyncio.ensure_future(func(*args))
+            self._flights[key] = flight
+            flight.add_done_callback(lambda done: self._land(key, done))
+        return await asyncio.shield(flight), coalesced
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._flights), "leaders": self.leaders, "coalesced": self.coalesced}
+
+classification_flights = SingleFlight()
+
+
+# ============================================
+# LOCAL FAST-PATH CLASSIFIER
+# ============================================
+DESCRIPTION_STOPWORDS = {"a", "an", "the", "of", "my", "this", "that", "some", "old", "used", "empty", "one"}
+
+def classify_locally(description: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Classify a description against WASTE_CATEGORIES without calling the LLM.
+
+    Only a description fully covered by items of one category is confident.
+    Any other word can change what the thing is ("phone case", "paint brush",
+    "paper cup"), so partial matches score below 0.6 and items from several
+    categories 0.4, leaving both to the LLM at any sensible threshold.
+    """
+    if not description:
+        return None
+    text = description.lower()
+    words = [w for w in re.finditer(r"[a-z0-9]+", text) if w.group() not in DESCRIPTION_STOPWORDS]
+    if not words:
+        return None
+
+    matches = waste_term_matcher.find_all(text)
+    if not matches:
+        return None
+
+    item, category = WasteTermMatcher.pick_longest(matches)
+    if len({c for _, _, c in matches}) > 1:
+        confidence = 0.4
+    else:
+        # A word is covered when it starts inside a matched term, so the plural
+        # suffix the matcher allows ("bottles", "boxes") counts as well
+        spans = [(start, start + len(matched)) for start, matched, _ in matches]
+        covered = [w for w in words if any(start <= w.start() < end for start, end in spans)]
+        coverage = len({w.group() for w in covered}) / len({w.group() for w in words})
+        confidence = 1.0 if coverage == 1 else 0.6 * coverage
+
+    return {
+        "classification": item.title(),
+        "category": category,
+        "details": f"Matched '{item}' in the {category} item list",
+        "confidence": round(confidence, 3)
+    }
+
+classifier_routing = {"local": 0, "cache": 0, "llm": 0, "coalesced": 0}
+
+
+# ============================================
+# LLM CLIENT
+# ============================================
+LLM_SYSTEM_MESSAGE = "You are an expert waste management AI. Classify waste items accurately and provide detailed disposal guidance."
+
+# The prompt is assembled once; per call only the description line is spliced in
+CLASSIFICATION_PROMPT_HEAD = "Analyze this waste item and provide classification.\n\n"
+CLASSIFICATION_PROMPT_TAIL = """
+
+Classify into ONE category: RECYCLE, COMPOST, E_WASTE, HAZARDOUS, or LANDFILL
+
+Provide:
+1. CLASSIFICATION: Specific item name (e.g., "Plastic Water Bottle", "Banana Peel")
+2. CATEGORY: ONE of [RECYCLE, COMPOST, E_WASTE, HAZARDOUS, LANDFILL]
+3. DETAILS: Brief why it belongs in this category (1 sentence)
+
+Format:
+CLASSIFICATION: [item name]
+CATEGORY: [category]
+DETAILS: [reason]"""
+
+LLM_ANSWER_LINE = re.compile(r"^(CLASSIFICATION|CATEGORY|DETAILS):(.*)$", re.MULTILINE)
+
+def build_classification_prompt(description: Optional[str]) -> str:
+    description_line = f"User description: {description}" if description else ""
+    return CLASSIFICATION_PROMPT_HEAD + description_line + CLASSIFICATION_PROMPT_TAIL
+
+class LlmUnavailable(Exception):
+    """The LLM circuit is open or every retry failed"""
+    pass
+
+class FakeUserMessage(NamedTuple):
+    text: str
+
+class FakeLlmChat:
+    """In-process stand-in for LlmChat (LLM_BACKEND=fake) with a fixed answer and latency"""
+
+    def __init__(self, api_key: str, session_id: str, system_message: str):
+        self.session_id = session_id
+
+    def with_model(self, provider: str, model: str):
+        return self
+
+    async def send_message(self, message) -> str:
+        if FAKE_LLM_LATENCY_MS:
+            await asyncio.sleep(FAKE_LLM_LATENCY_MS / 1000)
+        return "CLASSIFICATION: Unknown Item\nCATEGORY: LANDFILL\nDETAILS: Fake LLM backend answer."
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; after `reset_seconds` one trial call is let through"""
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.failures >= self.threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+class LlmClientPool:
+    """Process-wide LLM access: bounded concurrency, timeouts, retries and a circuit breaker.
+
+    LlmChat keeps conversation state per instance, so a client serves exactly
+    one request. The pool keeps LLM_MAX_CONCURRENCY clients pre-built with the
+    key, system message and model already applied, and replaces each one as it
+    is checked out. HTTP connections are reused by the provider library across
+    clients.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.semaphore = asyncio.Semaphore(size)
+        self.breaker = CircuitBreaker(LLM_BREAKER_THRESHOLD, LLM_BREAKER_RESET_SECONDS)
+        self._idle: deque = deque()
+        if LLM_BACKEND == 'fake':
+            self._chat_class, self._message_class = FakeLlmChat, FakeUserMessage
+        else:
+            # Imported here so the fake backend (tests, benchmarks) runs without the provider SDK
+            from emergentintegrations.llm.chat import LlmChat, UserMessage
+            self._chat_class, self._message_class = LlmChat, UserMessage
+        self._api_key: Optional[str] = None
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+        self.latency_ms = 0.0
+
+    def _new_chat(self):
+        if self._api_key is None:
+            self._api_key = os.environ.get('EMERGENT_LLM_KEY', '') if LLM_BACKEND == 'fake' else os.environ['EMERGENT_LLM_KEY']
+        return self._chat_class(
+            api_key=self._api_key,
+            session_id=f"waste-{uuid.uuid4()}",
+            system_message=LLM_SYSTEM_MESSAGE
+        ).with_model(LLM_PROVIDER, LLM_MODEL)
+
+    def fill(self):
+        while len(self._idle) < self.size:
+            self._idle.append(self._new_chat())
+
+    def _checkout(self):
+        chat = self._idle.popleft() if self._idle else self._new_chat()
+        # Top up after this request, off its critical path
+        asyncio.get_running_loop().call_soon(self._top_up)
+        return chat
+
+    def _top_up(self):
+        try:
+            self.fill()
+        except Exception as e:
+            logging.error(f"LLM client pool refill failed: {e}")
+
+    async def complete(self, prompt: str) -> str:
+        """Send one prompt, retrying with jittered exponential backoff"""
+        async with self.semaphore:
+            for attempt in range(LLM_MAX_RETRIES + 1):
+                if not self.breaker.allow():
+                    self.rejected += 1
+                    raise LlmUnavailable("LLM circuit breaker is open")
+                started = time.perf_counter()
+                try:
+                    response = await asyncio.wait_for(
+                        self._checkout().send_message(self._message_class(text=prompt)), LLM_TIMEOUT_SECONDS)
+                except Exception as e:
+                    self.failures += 1
+                    self.breaker.record_failure()
+                    logging.error(f"LLM call failed (attempt {attempt + 1}): {e!r}")
+                    if attempt == LLM_MAX_RETRIES:
+                        raise LlmUnavailable(f"LLM call failed after {attempt + 1} attempts: {e!r}")
+                    self.retries += 1
+                    await asyncio.sleep(LLM_RETRY_BASE_SECONDS * 2 ** attempt * random.uniform(0.5, 1.0))
+                    continue
+                self.breaker.record_success()
+                self.calls += 1
+                self.latency_ms += (time.perf_counter() - started) * 1000
+                return response
+
+    async def warm_up(self):
+        """Pre-build the clients and, with LLM_WARMUP, open the provider connection with one short call"""
+        self.fill()
+        if LLM_WARMUP:
+            await self.complete("Reply with OK.")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": LLM_BACKEND,
+            "model": f"{LLM_PROVIDER}/{LLM_MODEL}",
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "avg_latency_ms": round(self.latency_ms / self.calls, 2) if self.calls else 0.0,
+            "idle_clients": len(self._idle),
+            "circuit": self.breaker.state
+        }
+
+llm_client = LlmClientPool(LLM_MAX_CONCURRENCY)
+
+
+# ============================================
+# AI CLASSIFICATION WITH ADVANCED LOGIC
+# ============================================
+async def classify_with_llm(description: Optional[str]) -> Dict[str, str]:
+    """Ask the LLM to classify a waste item and parse its structured answer"""
+    response = await llm_client.complete(build_classification_prompt(description))
+    
+    # Parse AI response
+    answer = dict(LLM_ANSWER_LINE.findall(response))
+    return {
+        "classification": answer.get("CLASSIFICATION", "Unknown Waste").strip(),
+        "category": answer.get("CATEGORY", "LANDFILL").strip().upper(),
+        "details": answer.get("DETAILS", "").strip()
+    }
+
+async def classify_and_cache(cache_key: str, description: Optional[str]) -> Dict[str, str]:
+    result = await classify_with_llm(description)
+    await classification_cache.set(cache_key, result)
+    return result
+
+async def classify_item(image_id: Optional[str], cache_key: str, description: Optional[str],
+                        user_id: str, latitude: Optional[float] = None,
+                        longitude: Optional[float] = None) -> WasteClassification:
+    """Classify one scan and build its record, without writing anything"""
+    # Tiered routing: confident local match, then cached LLM answer, then the LLM
+    local_result = classify_locally(description)
+    local_confidence = local_result['confidence'] if local_result else None
+    
+    if local_result and local_confidence >= LOCAL_CLASSIFIER_THRESHOLD:
+        result, classified_by = local_result, "local"
+    else:
+        result, classified_by = await classification_cache.get(cache_key), "cache"
+        if result is None:
+            try:
+                # Identical scans arriving together share one LLM call
+                result, coalesced = await classification_flights.run(
+                    cache_key, classify_and_cache, cache_key, description)
+                classified_by = "coalesced" if coalesced else "llm"
+            except LlmUnavailable:
+                # Degrade to a low-confidence local match rather than failing the scan
+                if not local_result:
+                    raise
+                result, classified_by = local_result, "local"
+    classifier_routing[classified_by] += 1
+    
+    classification = result['classification']
+    category = result['category']
+    details = result['details']
+    
+    # Validate and normalize category
+    if category not in WASTE_CATEGORIES:
+        category, category_data = categorize_waste_from_classification(classification)
+    else:
+        category_data = WASTE_CATEGORIES[category]
+    
+    # Get disposal tips
+    tips = await get_waste_disposal_tips(category, classification)
+    
+    # The scan image goes to the blob store; the record keeps only its content hash
+    return WasteClassification(
+        image_id=image_id,
+        classification=classification,
+        category=category,
+        sub_category=details,
+        suggestions=tips['suggestions'],
+        recycling_info=f"{category} - {details}",
+        environmental_impact=tips['environmental_impact'],
+        points_awarded=category_data['points'],
+        co2_saved=category_data['co2_saved_per_item'],
+        user_id=user_id,
+        location={"latitude": latitude, "longitude": longitude} if latitude is not None and longitude is not None else None,
+        classified_by=classified_by,
+        local_confidence=local_confidence
+    )
+
+async def record_classification(waste_obj: WasteClassification, image_bytes: Optional[bytes]):
+    """Persist a classification and return the nearest matching bins (if located)"""
+    location = waste_obj.location or {}
+    # The bin lookup runs alongside everything else; it handles its own errors,
+    # so it can neither fail nor hold up the writes. The record, its rollup and
+    # the user stats wait only for the image they reference to be stored.
+    nearest = asyncio.ensure_future(
+        find_nearest_bins(location['latitude'], location['longitude'], waste_obj.category, limit=3)
+        if location.get('latitude') and location.get('longitude') else no_result()
+    )
+    try:
+        if image_bytes:
+            await store_image(io.BytesIO(image_bytes))
+        await write_all(
+            db.waste_classifications.insert_one(waste_obj.dict()),
+            record_classification_rollups([waste_obj]),
+            update_user_stats_advanced(waste_obj.user_id, waste_obj.category,
+                                       waste_obj.points_awarded, waste_obj.co2_saved)
+        )
+    except BaseException:
+        nearest.cancel()
+        raise
+    return await nearest
+
+def classification_response(waste_obj: WasteClassification,
+                            nearest_bins: Optional[List[Dict[str, Any]]] = None) -> WasteClassificationResponse:
+    return WasteClassificationResponse(
+        id=waste_obj.id,
+        classification=waste_obj.classification,
+        category=waste_obj.category,
+        sub_category=waste_obj.sub_category,
+        suggestions=waste_obj.suggestions,
+        recycling_info=waste_obj.recycling_info,
+        environmental_impact=waste_obj.environmental_impact,
+        points_awarded=waste_obj.points_awarded,
+        co2_saved=waste_obj.co2_saved,
+        nearest_bins=nearest_bins
+    )
+
+@api_router.post("/classify-waste", response_model=WasteClassificationResponse)
+async def classify_waste(request: WasteClassificationRequest, async_mode: bool = Query(False, alias="async")):
+    """Classify a scan; with ?async=true, queue it and answer 202 with a job id at once"""
+    try:
+        image_bytes = decode_image_base64(request.image_base64)
+        cache_key = ClassificationCache.key(image_bytes or request.image_base64.encode(), request.description)
+        if async_mode:
+            if image_bytes:
+                await store_image(io.BytesIO(image_bytes))
+            job = await job_service.enqueue({
+                "image_id": blob_id_for(image_bytes),
+                "cache_key": cache_key,
+                "description": request.description,
+                "user_id": request.user_id,
+                "latitude": request.latitude,
+                "longitude": request.longitude
+            })
+            return JSONResponse(status_code=202, content=jsonable_encoder({
+                **job_view(job),
+                "poll_url": f"/api/jobs/{job['id']}",
+                "events_url": f"/api/jobs/{job['id']}/events"
+            }))
+        
+        waste_obj = await classify_item(blob_id_for(image_bytes), cache_key, request.description,
+                                        request.user_id, request.latitude, request.longitude)
+        nearest_bins = await record_classification(waste_obj, image_bytes)
+        return classification_response(waste_obj, nearest_bins)
+        
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(int(JOB_POLL_SECONDS * 5))})
+    except LlmUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"Classification unavailable: {str(e)}")
+    except Exception as e:
+        logging.error(f"Classification error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Classification failed: {str(e)}")
+
+@api_router.post("/classify-waste/upload", response_model=WasteClassificationResponse)
+async def classify_waste_upload(
+    request: Request,
+    user_id: str = "default_user",
+    description: Optional[str] = None,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None
+):
+    """Classify an image sent as multipart form data (field `file`) or as the raw request body.
+
+    The body is counted as it arrives, so uploads without a Content-Length
+    (chunked) are cut off at BLOB_MAX_BYTES too. It is streamed once into a
+    spooled temp file (the multipart file part is used in place), then
+    downscaled and re-encoded on the image thread pool; only the small JPEG is
+    kept in memory. Multipart form fields override the query parameters.
+    """
+    declared_size = request.headers.get("content-length")
+    if declared_size and declared_size.isdigit() and int(declared_size) > BLOB_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {BLOB_MAX_BYTES} bytes")
+    
+    body = limited_chunks(request.stream())
+    try:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await MultiPartParser(request.headers, body, max_files=1).parse()
+            try:
+                upload = form.get("file")
+                if not isinstance(upload, StarletteUploadFile):
+                    raise HTTPException(status_code=400, detail="Missing multipart field: file")
+                user_id = form.get("user_id", user_id)
+                description = form.get("description", description)
+                latitude = float(form["latitude"]) if form.get("latitude") else latitude
+                longitude = float(form["longitude"]) if form.get("longitude") else longitude
+                upload.file.seek(0)
+                image_bytes = await run_image_task(downscale_image, upload.file, CLASSIFY_IMAGE_MAX_PX)
+            finally:
+                await form.close()
+        else:
+            spool, _ = await spool_chunks(body)
+            with spool:
+                image_bytes = await run_image_task(downscale_image, spool, CLASSIFY_IMAGE_MAX_PX)
+        if image_bytes is None:
+            raise HTTPException(status_code=400, detail="Upload is not a recognised image")
+    except BlobTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (MultiPartException, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        cache_key = ClassificationCache.key(image_bytes, description)
+        waste_obj = await classify_item(blob_id_for(image_bytes), cache_key, description, user_id,
+                                        latitude, longitude)
+        nearest_bins = await record_classification(waste_obj, image_bytes)
+        return classification_response(waste_obj, nearest_bins)
+        
+    except LlmUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"Classification unavailable: {str(e)}")
+    except Exception as e:
+        logging.error(f"Classification error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Classification failed: {str(e)}")
+
+
+@api_router.post("/classify-waste/batch")
+async def classify_waste_batch(batch: WasteClassificationBatchRequest):
+    """Classify many items concurrently, streaming NDJSON results as they complete.
+
+    LLM calls share the process-wide LLM_MAX_CONCURRENCY semaphore. Each item
+    yields {"index", "status": "ok", "result"} or {"index", "status": "error",
+    "detail"}; once every item is done the records are written with one
+    insert_many, rollups and per-user stats are folded into one update each,
+    and a final {"status": "done"} line reports the counts. Writes happen in a
+    task of their own, so a client disconnecting mid-stream does not lose them.
+    """
+    if not batch.items:
+        raise HTTPException(status_code=400, detail="Batch has no items")
+    if len(batch.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_ITEMS} items")
+    
+    async def classify_one(index: int, item: WasteClassificationRequest):
+        try:
+            image_bytes = decode_image_base64(item.image_base64)
+            cache_key = ClassificationCache.key(image_bytes or item.image_base64.encode(), item.description)
+            waste_obj = await classify_item(blob_id_for(image_bytes), cache_key, item.description,
+                                            item.user_id, item.latitude, item.longitude)
+            nearest_bins, _ = await asyncio.gather(
+                find_nearest_bins(item.latitude, item.longitude, waste_obj.category, limit=3)
+                if item.latitude and item.longitude else no_result(),
+                store_image(io.BytesIO(image_bytes)) if image_bytes else no_result()
+            )
+            return {"index": index, "status": "ok", "waste_obj": waste_obj, "nearest_bins": nearest_bins}
+        except Exception as e:
+            logging.error(f"Batch classification error: {str(e)}")
+            return {"index": index, "status": "error", "detail": f"Classification failed: {str(e)}"}
+    
+    tasks = [asyncio.create_task(classify_one(i, item)) for i, item in enumerate(batch.items)]
+    
+    async def persist():
+        outcomes = await asyncio.gather(*tasks)
+        classified = [outcome['waste_obj'] for outcome in outcomes if outcome['status'] == "ok"]
+        if not classified:
+            return 0
+        scans_by_user = defaultdict(list)
+        for waste_obj in classified:
+            scans_by_user[waste_obj.user_id].append(
+                (waste_obj.category, waste_obj.points_awarded, waste_obj.co2_saved))
+        await write_all(
+            db.waste_classifications.insert_many([waste_obj.dict() for waste_obj in classified]),
+            record_classification_rollups(classified),
+            *[apply_user_scans(user_id, scans) for user_id, scans in scans_by_user.items()]
+        )
+        return len(classified)
+    
+    persisted = asyncio.create_task(persist())
+    
+    async def results():
+        for next_done in asyncio.as_completed(tasks):
+            outcome = await next_done
+            if outcome['status'] == "ok":
+                outcome = {"index": outcome['index'], "status": "ok",
+                           "result": classification_response(outcome['waste_obj'], outcome['nearest_bins'])}
+            yield json.dumps(jsonable_encoder(outcome)) + "\n"
+        
+        try:
+            classified = await persisted
+            line = {"status": "done", "classified": classified, "failed": len(tasks) - classified}
+        except Exception as e:
+            logging.error(f"Batch persist error: {str(e)}")
+            line = {"status": "error", "detail": f"Saving classifications failed: {str(e)}"}
+        yield json.dumps(line) + "\n"
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+
+# ============================================
+# CLASSIFICATION JOB QUEUE
+# ============================================
+JOB_FINAL_STATES = ("done", "failed")
+
+class QueueFull(Exception):
+    pass
+
+def job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """The client-facing part of a job document"""
+    return {key: job.get(key) for key in
+            ("id", "status", "created_at", "started_at", "finished_at", "attempts", "result", "error")}
+
+class InMemoryJobStore:
+    """Job queue held in this process; finished jobs are kept for JOB_RESULT_TTL_SECONDS"""
+
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._queued: deque = deque()
+        self._finished: deque = deque()
+
+    async def insert(self, job: Dict[str, Any]):
+        self._jobs[job['id']] = job
+        self._queued.append(job['id'])
+
+    async def claim(self, now: datetime) -> Optional[Dict[str, Any]]:
+        if not self._queued:
+            return None
+        job = self._jobs[self._queued.popleft()]
+        job.update(status="running", started_at=now, attempts=job['attempts'] + 1)
+        return dict(job)
+
+    async def finish(self, job_id: str, fields: Dict[str, Any]):
+        self._jobs[job_id].update(fields)
+        self._finished.append((fields['finished_at'], job_id))
+        horizon = fields['finished_at'] - timedelta(seconds=JOB_RESULT_TTL_SECONDS)
+        while self._finished and self._finished[0][0] < horizon:
+            self._jobs.pop(self._finished.popleft()[1], None)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    async def counts(self) -> Dict[str, int]:
+        running = sum(1 for job in self._jobs.values() if job['status'] == "running")
+        return {"queued": len(self._queued), "running": running}
+
+
+declare_index("classification_jobs", [("id", 1)], unique=True)
+declare_index("classification_jobs", [("status", 1), ("created_at", 1)])
+declare_index("classification_jobs", [("expires_at", 1)], expireAfterSeconds=0)
+declare_query("next queued job", "classification_jobs", {"status": "queued"}, [("created_at", 1)])
+declare_query("abandoned jobs", "classification_jobs", {"status": "running", "lease_until": {"$lt": datetime(2000, 1, 1)}})
+
+class MongoJobStore:
+    """Job queue shared by all workers.
+
+    A claimed job is leased; when the lease runs out it is claimed again, or
+    failed once it has used up JOB_MAX_ATTEMPTS.
+    """
+
+    def __init__(self, database):
+        self.jobs = database.classification_jobs
+
+    async def insert(self, job: Dict[str, Any]):
+        await self.jobs.insert_one({**job, "expires_at": job['created_at'] + timedelta(seconds=JOB_RESULT_TTL_SECONDS)})
+
+    async def claim(self, now: datetime) -> Optional[Dict[str, Any]]:
+        # A job whose lease ran out on its last attempt will not be re-claimed; fail it so
+        # pollers and event streams see a final state instead of "running" forever
+        await self.jobs.update_many(
+            {"status": "running", "lease_until": {"$lt": now}, "attempts": {"$gte": JOB_MAX_ATTEMPTS}},
+            {"$set": {"status": "failed", "finished_at": now,
+                      "error": f"Classification abandoned after {JOB_MAX_ATTEMPTS} attempts"},
+             "$unset": {"lease_until": ""}}
+        )
+        job = await self.jobs.find_one_and_update(
+            {"$or": [
+                {"status": "queued"},
+                # Jobs whose worker died mid-run
+                {"status": "running", "lease_until": {"$lt": now}, "attempts": {"$lt": JOB_MAX_ATTEMPTS}}
+            ]},
+            {"$set": {"status": "running", "started_at": now,
+                      "lease_until": now + timedelta(seconds=JOB_LEASE_SECONDS)},
+             "$inc": {"attempts": 1}},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        if job:
+            del job['_id']
+        return job
+
+    async def finish(self, job_id: str, fields: Dict[str, Any]):
+        await self.jobs.update_one({"id": job_id}, {"$set": fields, "$unset": {"lease_until": ""}})
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.jobs.find_one({"id": job_id}, {"_id": 0})
+
+    async def counts(self) -> Dict[str, int]:
+        queued, running = await asyncio.gather(
+            self.jobs.count_documents({"status": "queued"}),
+            self.jobs.count_documents({"status": "running"})
+        )
+        return {"queued": queued, "running": running}
+
+class ClassificationJobService:
+    """Queues classifications and runs them on up to JOB_WORKERS concurrent tasks.
+
+    One dispatcher loop claims jobs while a worker slot is free, waking on
+    local enqueues and otherwise polling every JOB_POLL_SECONDS. Enqueueing is
+    refused once JOB_QUEUE_MAX_DEPTH jobs are waiting.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.slots = asyncio.Semaphore(JOB_WORKERS)
+        self._wake = asyncio.Event()
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._running: set = set()
+        self.enqueued = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_ms = 0.0
+        self.run_ms = 0.0
+
+    async def enqueue(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        if (await self.store.counts())["queued"] >= JOB_QUEUE_MAX_DEPTH:
+            self.rejected += 1
+            raise QueueFull(f"Classification queue is full ({JOB_QUEUE_MAX_DEPTH} jobs waiting)")
+        job = {"id": str(uuid.uuid4()), "status": "queued", "params": params, "attempts": 0,
+               "created_at": datetime.utcnow(), "started_at": None, "finished_at": None,
+               "result": None, "error": None}
+        await self.store.insert(job)
+        self.enqueued += 1
+        self._wake.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.store.get(job_id)
+
+    async def wait_for_change(self, job_id: str, timeout: float) -> bool:
+        """Wait until this process changes the job, or the timeout passes (other workers may have)"""
+        changed = self._changed.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def forget(self, job_id: str):
+        self._changed.pop(job_id, None)
+
+    def _notify(self, job_id: str):
+        changed = self._changed.pop(job_id, None)
+        if changed:
+            changed.set()
+
+    async def _process(self, job: Dict[str, Any]):
+        started = datetime.utcnow()
+        self.wait_ms += (started - job['created_at']).total_seconds() * 1000
+        params = job['params']
+        try:
+            waste_obj = await classify_item(params['image_id'], params['cache_key'], params['description'],
+                                            params['user_id'], params['latitude'], params['longitude'])
+            nearest_bins = await record_classification(waste_obj, None)
+            fields = {"status": "done", "result": jsonable_encoder(classification_response(waste_obj, nearest_bins))}
+            self.completed += 1
+        except Exception as e:
+            logging.error(f"Classification job {job['id']} failed: {str(e)}")
+            fields = {"status": "failed", "error": f"Classification failed: {str(e)}"}
+            self.failed += 1
+        fields["finished_at"] = datetime.utcnow()
+        self.run_ms += (fields["finished_at"] - started).total_seconds() * 1000
+        try:
+            await self.store.finish(job['id'], fields)
+        finally:
+            self._notify(job['id'])
+
+    async def _dispatch(self):
+        while True:
+            await self.slots.acquire()
+            try:
+                self._wake.clear()
+                job = await self.store.claim(datetime.utcnow())
+            except Exception as e:
+                logging.error(f"Claiming classification job failed: {e}")
+                job = None
+            if job is None:
+                self.slots.release()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self._notify(job['id'])
+            task = asyncio.create_task(self._process(job))
+            self._running.add(task)
+            task.add_done_callback(self._release)
+
+    def _release(self, task: asyncio.Task):
+        self._running.discard(task)
+        self.slots.release()
 
-{f"User description: {request.description}" if request.description else ""}
+    def start(self):
+        self._dispatcher = asyncio.create_task(self._dispatch())
 
-Classify into ONE category: RECYCLE, COMPOST, E_WASTE, HAZARDOUS, or LANDFILL
+    async def stop(self):
+        """Stop claiming and let in-flight jobs finish (unfinished Mongo jobs are re-claimed after their lease)"""
+        if self._dispatcher:
+            self._dispatcher.cancel()
+        if self._running:
+            await asyncio.wait(self._running, timeout=JOB_LEASE_SECONDS)
 
-Provide:
-1. CLASSIFICATION: Specific item name (e.g., "Plastic Water Bottle", "Banana Peel")
-2. CATEGORY: ONE of [RECYCLE, COMPOST, E_WASTE, HAZARDOUS, LANDFILL]
-3. DETAILS: Brief why it belongs in this category (1 sentence)
+    async def stats(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            **await self.store.counts(),
+            "max_depth": JOB_QUEUE_MAX_DEPTH,
+            "workers": JOB_WORKERS,
+            "busy_workers": len(self._running),
+            "enqueued": self.enqueued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_queue_wait_ms": round(self.wait_ms / finished, 2) if finished else 0.0,
+            "avg_run_ms": round(self.run_ms / finished, 2) if finished else 0.0
+        }
 
-Format:
-CLASSIFICATION: [item name]
-CATEGORY: [category]
-DETAILS: [reason]"""
-        
-        user_message = UserMessage(text=prompt)
-        response = await chat.send_message(user_message)
-        
-        # Parse AI response
-        lines = response.strip().split('\n')
-        classification = "Unknown Waste"
-        category = "LANDFILL"
-        details = ""
-        
-        for line in lines:
-            if line.startswith("CLASSIFICATION:"):
-                classification = line.replace("CLASSIFICATION:", "").strip()
-            elif line.startswith("CATEGORY:"):
-                category = line.replace("CATEGORY:", "").strip().upper()
-            elif line.startswith("DETAILS:"):
-                details = line.replace("DETAILS:", "").strip()
-        
-        # Validate and normalize category
-        if category not in WASTE_CATEGORIES:
-            category, category_data = categorize_waste_from_classification(classification)
-        else:
-            category_data = WASTE_CATEGORIES[category]
-        
-        # Calculate points and CO2 saved
-        points_awarded = category_data['points']
-        co2_saved = category_data['co2_saved_per_item']
-        
-        # Get disposal tips
-        tips = await get_waste_disposal_tips(category, classification)
-        
-        # Find nearest bins if location provided
-        nearest_bins = None
-        if request.latitude and request.longitude:
-            nearest_bins = await find_nearest_bins(
-                request.latitude, 
-                request.longitude, 
-                category, 
-                limit=3
-            )
-        
-        # Store classification in database
-        waste_obj = WasteClassification(
-            image_base64=request.image_base64[:100],
-            classification=classification,
-            category=category,
-            sub_category=details,
-            suggestions=tips['suggestions'],
-            recycling_info=f"{category} - {details}",
-            environmental_impact=tips['environmental_impact'],
-            points_awarded=points_awarded,
-            co2_saved=co2_saved,
-            user_id=request.user_id,
-            location={"latitude": request.latitude, "longitude": request.longitude} if request.latitude else None
-        )
-        
-        await db.waste_classifications.insert_one(waste_obj.dict())
-        
-        # Update user stats with advanced logic
-        await update_user_stats_advanced(request.user_id, category, points_awarded, co2_saved)
-        
-        return WasteClassificationResponse(
-            id=waste_obj.id,
-            classification=classification,
-            category=category,
-            sub_category=details,
-            suggestions=tips['suggestions'],
-            recycling_info=f"{category} - {details}",
-            environmental_impact=tips['environmental_impact'],
-            points_awarded=points_awarded,
-            co2_saved=co2_saved,
-            nearest_bins=nearest_bins
-        )
-        
-    except Exception as e:
-        logging.error(f"Classification error: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Classification failed: {str(e)}")
+job_service = ClassificationJobService(MongoJobStore(db) if JOB_QUEUE == 'mongo' else InMemoryJobStore())
 
+@api_router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Poll a classification job; `result` is set once status is done"""
+    job = await job_service.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_view(job)
 
-async def update_user_stats_advanced(user_id: str, category: str, points: int, co2_saved: float):
-    """Advanced user stats update with streak, level, and badge logic"""
-    user_stats = await db.user_stats.find_one({"user_id": user_id})
-    
-    if not user_stats:
-        user_stats = UserStats(user_id=user_id).dict()
-        await db.user_stats.insert_one(user_stats)
-        user_stats = await db.user_stats.find_one({"user_id": user_id})
+@api_router.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Server-sent events: a `status` event per state change, closing after done/failed.
+
+    If the job document disappears (its results expired) a final `gone` event
+    closes the stream.
+    """
+    job = await job_service.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
     
-    # Calculate new streak
-    new_streak = await update_daily_streak(user_id, user_stats.get('last_scan_date'))
+    async def events():
+        current = job
+        last_status = None
+        last_sent = time.monotonic()
+        try:
+            while True:
+                if current['status'] != last_status:
+                    last_status = current['status']
+                    last_sent = time.monotonic()
+                    yield f"event: status\ndata: {json.dumps(jsonable_encoder(job_view(current)))}\n\n"
+                if last_status in JOB_FINAL_STATES:
+                    return
+                # Local workers wake us directly; jobs run by other processes are polled
+                await job_service.wait_for_change(job_id, JOB_POLL_SECONDS)
+                if time.monotonic() - last_sent >= 15:
+                    last_sent = time.monotonic()
+                    yield ": keep-alive\n\n"
+                latest = await job_service.get(job_id)
+                if latest is None:
+                    yield f"event: gone\ndata: {json.dumps({'id': job_id})}\n\n"
+                    return
+                current = latest
+        finally:
+            job_service.forget(job_id)
     
-    # Update counters based on category
-    category_increments = {}
-    if category == "RECYCLE":
-        category_increments['items_recycled'] = 1
-    elif category == "COMPOST":
-        category_increments['compost_items'] = 1
-    elif category == "E_WASTE":
-        category_increments['ewaste_items'] = 1
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def days_since_epoch(date_expr: Any) -> Dict[str, Any]:
+    """Aggregation expression for the UTC day number of a date"""
+    return {"$floor": {"$divide": [{"$subtract": [date_expr, datetime(1970, 1, 1)]}, 86400000]}}
+
+def user_stats_pipeline(now: datetime, increments: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Update pipeline applying one scan to a user_stats document.
+
+    Fills defaults for new users, advances the daily streak, applies the counter
+    increments, awards newly satisfied badges with their bonus points and
+    recomputes the level, all inside a single atomic update.
+    """
+    defaults = UserStats(user_id="", created_at=now).dict()
+    del defaults['user_id']
+    today = (now - datetime(1970, 1, 1)).days
+    days_since_last_scan = {"$subtract": [today, days_since_epoch("$last_scan_date")]}
+
+    # Only badges reading a stat this scan changes can become newly earned
+    badge_rules = badge_engine.rules_for([*increments, "daily_streak"])
+
+    return [
+        {"$set": {field: {"$ifNull": [f"${field}", {"$literal": value}]} for field, value in defaults.items()}},
+        {"$set": {
+            "daily_streak": {"$switch": {
+                "branches": [
+                    {"case": {"$eq": ["$last_scan_date", None]}, "then": 1},
+                    # Same day keeps the streak, the next day extends it
+                    {"case": {"$eq": [days_since_last_scan, 0]}, "then": {"$max": ["$daily_streak", 1]}},
+                    {"case": {"$eq": [days_since_last_scan, 1]}, "then": {"$add": ["$daily_streak", 1]}}
+                ],
+                "default": 1
+            }},
+            "last_scan_date": now,
+            "updated_at": now,
+            **{field: {"$add": [f"${field}", value]} for field, value in increments.items()}
+        }},
+        {"$set": {
+            "last_badges_awarded": {"$concatArrays": [
+                [], *[{"$cond": [rule.mongo_expr(), [rule.name], []]} for rule in badge_rules]
+            ]},
+            "_badge_bonus": {"$add": [0, *[{"$cond": [rule.mongo_expr(), rule.points_bonus, 0]} for rule in badge_rules]]}
+        }},
+        {"$set": {
+            "badges": {"$concatArrays": ["$badges", "$last_badges_awarded"]},
+            "total_points": {"$add": ["$total_points", "$_badge_bonus"]}
+        }},
+        {"$set": {
+            "level": {"$add": [1, *[{"$cond": [{"$gte": ["$total_points", t]}, 1, 0]} for t in LEVEL_THRESHOLDS]]}
+        }},
+        {"$project": {"_badge_bonus": 0}}
+    ]
+
+async def update_user_stats_advanced(user_id: str, category: str, points: int, co2_saved: float):
+    """Advanced user stats update with streak, level, and badge logic.
+
+    Runs as one upsert so concurrent scans from the same user cannot lose
+    badge bonuses or leave a stale level behind.
+    """
+    return await apply_user_scans(user_id, [(category, points, co2_saved)])
+
+async def apply_user_scans(user_id: str, scans: List[Tuple[str, int, float]]):
+    """Fold (category, points, co2_saved) scans into a single user_stats upsert"""
+    points = sum(scan_points for _, scan_points, _ in scans)
+    co2_saved = sum(scan_co2 for _, _, scan_co2 in scans)
+    category_counts = defaultdict(int)
+    for category, _, _ in scans:
+        category_counts[category] += 1
     
-    # Update user stats
-    update_data = {
-        "$inc": {
-            "total_points": points,
-            "items_scanned": 1,
-            "co2_saved_kg": co2_saved,
-            **category_increments
-        },
-        "$set": {
-            "updated_at": datetime.utcnow(),
-            "last_scan_date": datetime.utcnow(),
-            "daily_streak": new_streak
-        }
-    }
+    increments = {"total_points": points, "items_scanned": len(scans), "co2_saved_kg": co2_saved}
+    for category, count in category_counts.items():
+        if category in CATEGORY_COUNTERS:
+            increments[CATEGORY_COUNTERS[category]] = count
     
-    await db.user_stats.update_one({"user_id": user_id}, update_data)
+    if user_stats_buffer.enabled:
+        # Leaderboard and analytics follow when the buffer is flushed
+        user_stats_buffer.add_scans(user_id, increments, category_counts)
+        return None
     
-    # Reload stats and check badges
-    updated_stats = await db.user_stats.find_one({"user_id": user_id})
-    stats_obj = UserStats(**updated_stats)
+    stats = await db.user_stats.find_one_and_update(
+        {"user_id": user_id},
+        user_stats_pipeline(datetime.utcnow(), increments),
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
     
-    # Check and award new badges
-    new_badges = await check_and_award_badges(stats_obj)
+    badge_bonus = sum(badge_engine.points_bonus(b) for b in stats['last_badges_awarded'])
+    await leaderboard.record(user_id, points + badge_bonus)
+    await bump_analytics({
+        "total_scans": len(scans),
+        **{f"category_breakdown.{category}": count for category, count in category_counts.items()},
+        "total_co2_saved_kg": co2_saved,
+        "total_points_awarded": points + badge_bonus,
+        # A user created by this upsert has created_at == last_scan_date
+        "total_users": 1 if stats['created_at'] == stats['last_scan_date'] else 0
+    })
     
-    if new_badges:
-        for badge in new_badges:
-            bonus_points = BADGES[badge]['points_bonus']
-            await db.user_stats.update_one(
-                {"user_id": user_id},
-                {
-                    "$push": {"badges": badge},
-                    "$inc": {"total_points": bonus_points}
-                }
+    if stats['last_badges_awarded']:
+        logging.info(f"Awarded badges: {stats['last_badges_awarded']} to user {user_id}")
+    return stats
+
+class UserStatsBuffer:
+    """Write-behind buffer for user_stats counter updates.
+
+    Scans are folded per user into the increments of one user_stats_pipeline
+    update and report points into one $inc (or into that user's pipeline
+    update), and each flush writes every pending user with a single unordered
+    bulk_write. Leaderboard and analytics updates for the flushed deltas follow
+    the write. Badges awarded by the pipeline are read back by the flush
+    marker, so badges from a concurrent write by another worker are left for
+    that worker to record.
+
+    A batch being written still counts towards pending() until the write is
+    acknowledged. Deltas whose write failed go back into the buffer; anything
+    the server applied is never re-sent, even if the read-back after it fails.
+    A network error that leaves the outcome unknown is retried, so that case
+    is at-least-once.
+    """
+
+    def __init__(self, enabled: bool, flush_ms: float, flush_ops: int):
+        self.enabled = enabled
+        self.flush_seconds = flush_ms / 1000
+        self.flush_ops = flush_ops
+        self._scans: Dict[str, Dict[str, Any]] = {}
+        self._points: Dict[str, int] = defaultdict(int)
+        self._in_flight: Optional[Tuple[Dict[str, Dict[str, Any]], Dict[str, int]]] = None
+        self._ops = 0
+        self._full = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.flushes = 0
+        self.flushed_ops = 0
+        self.failures = 0
+        self.readback_failures = 0
+        self.last_flush_ms = 0.0
+
+    def _merge_scans(self, user_id: str, increments: Dict[str, Any], category_counts: Dict[str, int]):
+        pending = self._scans.setdefault(user_id, {"increments": defaultdict(int), "categories": defaultdict(int)})
+        for field, value in increments.items():
+            pending['increments'][field] += value
+        for category, count in category_counts.items():
+            pending['categories'][category] += count
+
+    def add_scans(self, user_id: str, increments: Dict[str, Any], category_counts: Dict[str, int]):
+        self._merge_scans(user_id, increments, category_counts)
+        self._added(1)
+
+    def add_points(self, user_id: str, points: int):
+        """Points for an existing user only (like update_one without upsert)"""
+        self._points[user_id] += points
+        self._added(1)
+
+    def _added(self, ops: int):
+        self._ops += ops
+        if self._ops >= self.flush_ops:
+            self._full.set()
+
+    def pending(self, user_id: str) -> Dict[str, Any]:
+        """Unwritten counter deltas for a user (buffered or in flight), for read-your-writes in this process"""
+        deltas = defaultdict(int)
+        for scans, points in filter(None, [self._in_flight, (self._scans, self._points)]):
+            if user_id in scans:
+                for field, value in scans[user_id]['increments'].items():
+                    deltas[field] += value
+            if user_id in points:
+                deltas['total_points'] += points[user_id]
+        return dict(deltas)
+
+    def _restore(self, scans: Dict[str, Dict[str, Any]], points: Dict[str, int], ops: int):
+        """Put the deltas of a failed flush back with anything added since"""
+        for user_id, pending in scans.items():
+            self._merge_scans(user_id, pending['increments'], pending['categories'])
+        for user_id, user_points in points.items():
+            self._points[user_id] += user_points
+        self._added(ops)
+
+    async def flush(self) -> int:
+        """Write all pending deltas; returns the number of buffered updates written"""
+        async with self._lock:
+            if not self._ops:
+                return 0
+            scans, points, ops = self._scans, self._points, self._ops
+            self._scans, self._points, self._ops = {}, defaultdict(int), 0
+            self._full.clear()
+            # One update per user, since an unordered bulk_write may apply them in any order;
+            # the scan upsert creates the user, so report points ride along with it
+            for user_id in scans.keys() & points.keys():
+                scans[user_id]['increments']['total_points'] += points.pop(user_id)
+            
+            self._in_flight = (scans, points)
+            
+            started = time.perf_counter()
+            now = datetime.utcnow()
+            marker = uuid.uuid4().hex
+            targets = [*((scans, user_id) for user_id in scans), *((points, user_id) for user_id in points)]
+            requests = [
+                UpdateOne({"user_id": user_id},
+                          [*user_stats_pipeline(now, dict(pending['increments'])), {"$set": {"last_flush_id": marker}}],
+                          upsert=True)
+                for user_id, pending in scans.items()
+            ]
+            requests.extend(
+                UpdateOne({"user_id": user_id}, {"$inc": {"total_points": user_points}, "$set": {"updated_at": now}})
+                for user_id, user_points in points.items()
             )
-        
-        logging.info(f"Awarded badges: {new_badges} to user {user_id}")
-    
-    # Update level
-    total_points = stats_obj.total_points + sum(BADGES[b]['points_bonus'] for b in new_badges)
-    new_level = await calculate_user_level(total_points)
-    
-    await db.user_stats.update_one(
-        {"user_id": user_id},
-        {"$set": {"level": new_level}}
-    )
+            written = ops
+            try:
+                await db.user_stats.bulk_write(requests, ordered=False)
+            except BulkWriteError as e:
+                # Unordered, so every update except the reported write errors was applied
+                failed = [targets[error['index']] for error in e.details.get('writeErrors', [])]
+                failed_scans = {user_id: scans.pop(user_id) for batch, user_id in failed if batch is scans}
+                failed_points = {user_id: points.pop(user_id) for batch, user_id in failed if batch is points}
+                self.failures += 1
+                self._in_flight = None
+                self._restore(failed_scans, failed_points, len(failed))
+                logging.error(f"User stats flush partly failed, keeping {len(failed)} users pending: {e}")
+                written = len(targets) - len(failed)
+                if not written:
+                    return 0
+            except Exception as e:
+                self.failures += 1
+                self._in_flight = None
+                self._restore(scans, points, ops)
+                logging.error(f"User stats flush failed, keeping {ops} updates pending: {e}")
+                return 0
+            self._in_flight = None
+            
+            self.flushes += 1
+            self.flushed_ops += written
+            self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+            try:
+                flushed = await db.user_stats.find(
+                    {"user_id": {"$in": [*scans, *points]}},
+                    {"_id": 0, "user_id": 1, "last_badges_awarded": 1, "created_at": 1, "last_scan_date": 1, "last_flush_id": 1}
+                ).to_list(None)
+                docs = {doc['user_id']: doc for doc in flushed}
+            except Exception as e:
+                # The deltas are stored; only badge bonuses and report points go unrecorded on the boards
+                self.readback_failures += 1
+                docs = None
+                logging.error(f"User stats read-back failed after a flush, skipping badge bonuses: {e}")
+            await self._record_flushed(scans, points, docs, marker)
+            return written
+
+    async def _record_flushed(self, scans: Dict[str, Dict[str, Any]], points: Dict[str, int],
+                              docs: Optional[Dict[str, Dict[str, Any]]], marker: str):
+        """Leaderboard and analytics updates for a written flush (`docs` is None if the read-back failed)"""
+        awarded = defaultdict(int)
+        analytics = defaultdict(int)
+        for user_id, pending in scans.items():
+            doc = (docs or {}).get(user_id, {})
+            ours = doc.get('last_flush_id') == marker
+            badges = doc.get('last_badges_awarded', []) if ours else []
+            if badges:
+                logging.info(f"Awarded badges: {badges} to user {user_id}")
+            awarded[user_id] += pending['increments']['total_points'] + sum(badge_engine.points_bonus(b) for b in badges)
+            analytics["total_scans"] += pending['increments']['items_scanned']
+            analytics["total_co2_saved_kg"] += pending['increments']['co2_saved_kg']
+            for category, count in pending['categories'].items():
+                analytics[f"category_breakdown.{category}"] += count
+            # A user created by this upsert has created_at == last_scan_date
+            if ours and doc['created_at'] == doc['last_scan_date']:
+                analytics["total_users"] += 1
+        for user_id, user_points in points.items():
+            # Points only count for users that exist, which is unknown without the read-back
+            if docs and user_id in docs:
+                awarded[user_id] += user_points
+        analytics["total_points_awarded"] += sum(awarded.values())
+        
+        await asyncio.gather(*[leaderboard.record(user_id, user_points) for user_id, user_points in awarded.items()])
+        await bump_analytics(dict(analytics))
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                # Shielded, so stopping the loop never abandons a batch mid-write
+                await asyncio.shield(self.flush())
+            except Exception as e:
+                logging.error(f"User stats flush failed: {e}")
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and write whatever is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self.enabled:
+            await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "pending_users": len(self._scans.keys() | self._points.keys()),
+            "pending_ops": self._ops,
+            "flushes": self.flushes,
+            "flushed_ops": self.flushed_ops,
+            "failures": self.failures,
+            "readback_failures": self.readback_failures,
+            "last_flush_ms": self.last_flush_ms
+        }
+
+user_stats_buffer = UserStatsBuffer(USER_STATS_WRITE_BEHIND, USER_STATS_FLUSH_MS, USER_STATS_FLUSH_OPS)
 
 
 # ============================================
 # BIN LOCATIONS WITH ADVANCED FEATURES
 # ============================================
+declare_cached_route(r"/api/bins", ttl=300, resources=["bins"])
+
 @api_router.get("/bins", response_model=List[BinLocation])
 async def get_bins(
     latitude: Optional[float] = None,
     longitude: Optional[float] = None,
     waste_type: Optional[str] = None,
     radius_km: Optional[float] = 10.0,
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: str = "detail"
 ):
-    """Get bin locations with filtering and sorting options"""
+    """Get bin locations with filtering and sorting options.
+
+    Located queries page nearest first by (distance, id), others by id; send
+    the X-Next-Cursor header back as `cursor` for the next page. `view=summary`
+    returns BinSummary rows; `fields` (comma-separated, plus `distance` when
+    located) trims each bin further.
+    """
     try:
+        limit = page_size(limit)
+        located = bool(latitude and longitude)
+        model = view_model(view, BinSummary, BinLocation)
+        selected = parse_fields(fields, [*model.__fields__, *(["distance"] if located else [])])
+        projection = field_projection(selected or model.__fields__, ["id"])
+        after = decode_cursor(cursor, 2 if located else 1) if cursor else None
+        
         query = {}
         if status:
             query['status'] = status
-        
-        bins = await db.bin_locations.find(query).to_list(100)
-        
-        # Filter by waste type
         if waste_type:
-            bins = [b for b in bins if waste_type.lower() in [t.lower() for t in b.get('accepted_waste_types', [])] 
-                    or b['type'].lower() == waste_type.lower()]
-        
-        # Calculate distances and filter by radius
-        if latitude and longitude:
-            bins_with_distance = []
-            for bin_data in bins:
-                distance = calculate_distance(latitude, longitude, bin_data['latitude'], bin_data['longitude'])
-                if distance <= radius_km:
-                    bin_data['distance'] = round(distance, 2)
-                    bins_with_distance.append(bin_data)
-            
-            # Sort by distance
-            bins_with_distance.sort(key=lambda x: x.get('distance', float('inf')))
-            bins = bins_with_distance
+            query.update(waste_type_filter(waste_type))
+        
+        if located and bin_index.ready:
+            bins = bin_index.within_radius(latitude, longitude, radius_km, waste_type)
+            if status:
+                bins = [b for b in bins if b['status'] == status]
+            bins.sort(key=lambda b: (b['distance'], b['id']))
+            if after:
+                start = bisect.bisect_right([(b['distance'], b['id']) for b in bins], tuple(after))
+                bins = bins[start:]
+            bins = bins[:limit + 1]
+        elif located:
+            # Radius filter and distance sort are both served by the 2dsphere index
+            bins = await geo_near_bins(latitude, longitude, query, max_distance_km=radius_km, limit=limit + 1,
+                                       after=after, projection={**projection, "distance": 1})
+        else:
+            if after:
+                query = {"$and": [query, keyset_filter([("id", 1)], after)]}
+            bins = await db.bin_locations.find(query, projection) \
+                .sort("id", 1).limit(limit + 1).to_list(limit + 1)
+        
+        next_cursor = None
+        if len(bins) > limit:
+            bins = bins[:limit]
+            last = bins[-1]
+            next_cursor = encode_cursor([last['distance'], last['id']] if located else [last['id']])
+        for bin_data in bins:
+            if 'distance' in bin_data:
+                bin_data['distance'] = round(bin_data['distance'], 2)
         
-        return [BinLocation(**bin_data) for bin_data in bins]
+        # Located pages keep the distance the server sorted by
+        keys = selected or [*(f for f in model.__fields__ if f != "distance"), *(["distance"] if located else [])]
+        return paged_response(trusted_rows(model, bins, keys), next_cursor)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -601,7 +2842,14 @@ async def create_bin(bin_data: BinLocationCreate):
     """Create new bin location"""
     try:
         bin_obj = BinLocation(**bin_data.dict())
-        await db.bin_locations.insert_one(bin_obj.dict())
+        await db.bin_locations.insert_one({
+            **bin_obj.dict(),
+            "location": bin_geo_point(bin_obj.latitude, bin_obj.longitude)
+        })
+        bin_index.upsert(bin_obj.dict())
+        response_cache.invalidate("bins")
+        if bin_obj.status == "active":
+            await bump_analytics({"active_bins": 1})
         return bin_obj
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -616,16 +2864,61 @@ async def update_bin_capacity(bin_id: str, capacity: int):
         )
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Bin not found")
+        bin_index.update_fields(bin_id, capacity=capacity)
+        response_cache.invalidate("bins")
         return {"message": "Capacity updated", "bin_id": bin_id, "new_capacity": capacity}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/bins/collection-route")
+async def get_collection_route(
+    latitude: float,
+    longitude: float,
+    status: str = "full",
+    waste_type: Optional[str] = None,
+    limit: int = Query(50, le=500)
+):
+    """Plan a nearest-neighbour collection route through bins needing service"""
+    try:
+        if bin_index.ready:
+            bins = bin_index.within_radius(latitude, longitude, float('inf'), waste_type)
+            bins = [b for b in bins if b['status'] == status][:limit]
+        else:
+            query = {"status": status}
+            if waste_type:
+                query.update(waste_type_filter(waste_type))
+            bins = await db.bin_locations.find(query, {"_id": 0, "location": 0}).to_list(limit)
+        
+        route = plan_collection_route(latitude, longitude, bins)
+        return {
+            "total_distance_km": round(sum(stop['leg_km'] for stop in route), 2),
+            "stops": route
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 
 # ============================================
 # USER STATS WITH ADVANCED ANALYTICS
 # ============================================
+declare_index("user_stats", [("user_id", 1)], unique=True)
+declare_index("user_stats", [("total_points", -1)])
+declare_query("user stats by id", "user_stats", {"user_id": "u"})
+declare_query("users ahead in points", "user_stats", {"total_points": {"$gt": 0}})
+
+async def with_pending_stats(stats_obj: UserStats) -> UserStats:
+    """Stats with this process's unflushed write-behind deltas applied"""
+    pending = user_stats_buffer.pending(stats_obj.user_id)
+    if not pending:
+        return stats_obj
+    merged = stats_obj.dict()
+    for field, value in pending.items():
+        merged[field] += value
+    merged['level'] = max(merged['level'], await calculate_user_level(merged['total_points']))
+    return UserStats(**merged)
+
 @api_router.get("/user-stats/{user_id}", response_model=UserStats)
 async def get_user_stats(user_id: str = "default_user"):
     """Get comprehensive user statistics"""
@@ -635,69 +2928,148 @@ async def get_user_stats(user_id: str = "default_user"):
         if not user_stats:
             new_stats = UserStats(user_id=user_id)
             await db.user_stats.insert_one(new_stats.dict())
-            return new_stats
+            await bump_analytics({"total_users": 1})
+            return await with_pending_stats(new_stats)
         
         stats_obj = UserStats(**user_stats)
         
         # Check for new badges
         new_badges = await check_and_award_badges(stats_obj)
         if new_badges:
-            for badge in new_badges:
-                bonus_points = BADGES[badge]['points_bonus']
-                await db.user_stats.update_one(
-                    {"user_id": user_id},
-                    {
-                        "$push": {"badges": badge},
-                        "$inc": {"total_points": bonus_points}
-                    }
-                )
-            stats_obj = UserStats(**await db.user_stats.find_one({"user_id": user_id}))
-        
-        # Update rank
-        all_users = await db.user_stats.find().sort("total_points", -1).to_list(1000)
-        rank_position = next((i+1 for i, u in enumerate(all_users) if u['user_id'] == user_id), None)
-        
-        if rank_position:
-            rank_title = "Beginner" if rank_position > 100 else "Expert" if rank_position > 10 else "Master" if rank_position > 3 else "Legend"
+            # One guarded update, so a concurrent read cannot award the same bonus twice
+            badge_bonus = sum(badge_engine.points_bonus(b) for b in new_badges)
+            updated = await db.user_stats.find_one_and_update(
+                {"user_id": user_id, "badges": {"$nin": new_badges}},
+                {
+                    "$push": {"badges": {"$each": new_badges}},
+                    "$inc": {"total_points": badge_bonus}
+                },
+                return_document=ReturnDocument.AFTER
+            )
+            if updated:
+                await leaderboard.record(user_id, badge_bonus)
+                await bump_analytics({"total_points_awarded": badge_bonus})
+            stats_obj = UserStats(**(updated or await db.user_stats.find_one({"user_id": user_id})))
+        
+        # Update rank: users with strictly more points, counted on the total_points index
+        rank_position = await db.user_stats.count_documents({"total_points": {"$gt": stats_obj.total_points}}) + 1
+        rank_title = "Beginner" if rank_position > 100 else "Expert" if rank_position > 10 else "Master" if rank_position > 3 else "Legend"
+        if stats_obj.rank != rank_title:
             await db.user_stats.update_one(
                 {"user_id": user_id},
                 {"$set": {"rank": rank_title}}
             )
             stats_obj.rank = rank_title
         
-        return stats_obj
+        return await with_pending_stats(stats_obj)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+declare_index("user_daily_rollups", [("user_id", 1), ("day", 1), ("category", 1)], unique=True)
+declare_index("waste_classifications", [("user_id", 1), ("timestamp", -1), ("id", -1)])
+declare_query("rollups by user and day", "user_daily_rollups", {"user_id": "u", "day": {"$gte": "2024-01-01"}})
+declare_query("recent classifications", "waste_classifications",
+              {"user_id": "u", "timestamp": {"$gte": datetime(2024, 1, 1)}}, [("timestamp", -1), ("id", -1)])
+
+HISTORY_SORT = [("timestamp", -1), ("id", -1)]
+
+async def record_classification_rollups(classifications: List[WasteClassification]):
+    """Fold classifications into the user x day x category rollups, one upsert per rollup"""
+    folded = defaultdict(lambda: {"count": 0, "points": 0, "co2": 0.0})
+    for classification in classifications:
+        day = classification.timestamp.strftime("%Y-%m-%d")
+        totals = folded[(classification.user_id, day, classification.category)]
+        totals["count"] += 1
+        totals["points"] += classification.points_awarded
+        totals["co2"] += classification.co2_saved
+    if folded:
+        await db.user_daily_rollups.bulk_write([
+            UpdateOne({"user_id": user_id, "day": day, "category": category}, {"$inc": totals}, upsert=True)
+            for (user_id, day, category), totals in folded.items()
+        ], ordered=False)
+
+async def load_user_rollups(user_id: str, start_day: str, end_day: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Rollup rows for a user with start_day <= day < end_day (YYYY-MM-DD)"""
+    day_range = {"$gte": start_day}
+    if end_day:
+        day_range["$lt"] = end_day
+    return await db.user_daily_rollups.find(
+        {"user_id": user_id, "day": day_range}, {"_id": 0}
+    ).to_list(None)
+
+async def rebuild_user_rollups():
+    """Recompute every rollup row from waste_classifications"""
+    await db.waste_classifications.aggregate([
+        {"$group": {
+            "_id": {
+                "user_id": "$user_id",
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+                "category": "$category"
+            },
+            "count": {"$sum": 1},
+            "points": {"$sum": "$points_awarded"},
+            "co2": {"$sum": "$co2_saved"}
+        }},
+        {"$project": {
+            "_id": 0, "user_id": "$_id.user_id", "day": "$_id.day", "category": "$_id.category",
+            "count": 1, "points": 1, "co2": 1
+        }},
+        {"$merge": {"into": "user_daily_rollups", "on": ["user_id", "day", "category"], "whenMatched": "replace"}}
+    ]).to_list(None)
+
+async def ensure_user_rollups():
+    """Backfill rollups when the collection is new"""
+    if not await db.user_daily_rollups.find_one({}) and await db.waste_classifications.find_one({}):
+        await rebuild_user_rollups()
+
 @api_router.get("/user-stats/{user_id}/history")
-async def get_user_history(user_id: str, days: int = 30):
-    """Get user's waste classification history"""
+async def get_user_history(user_id: str, days: int = 30, limit: int = 10,
+                           cursor: Optional[str] = None, fields: Optional[str] = None, view: str = "detail"):
+    """Get user's waste classification history.
+
+    `recent_items` is paged newest first; pass `next_cursor` back as `cursor`
+    for older items. `view=summary` returns ClassificationSummary items and
+    `fields` trims each item.
+    """
     try:
+        limit = page_size(limit)
+        model = view_model(view, ClassificationSummary, WasteClassification)
+        selected = parse_fields(fields, model.__fields__)
         cutoff_date = datetime.utcnow() - timedelta(days=days)
-        
-        history = await db.waste_classifications.find({
-            "user_id": user_id,
-            "timestamp": {"$gte": cutoff_date}
-        }).sort("timestamp", -1).to_list(100)
+        rollups = await load_user_rollups(user_id, cutoff_date.strftime("%Y-%m-%d"))
         
         # Aggregate by category
         category_breakdown = defaultdict(int)
         daily_scans = defaultdict(int)
         
-        for item in history:
-            category_breakdown[item['category']] += 1
-            date_key = item['timestamp'].strftime("%Y-%m-%d")
-            daily_scans[date_key] += 1
+        for row in rollups:
+            category_breakdown[row['category']] += row['count']
+            daily_scans[row['day']] += row['count']
         
-        return {
+        query = {"user_id": user_id, "timestamp": {"$gte": cutoff_date}}
+        if cursor:
+            query = {"$and": [query, keyset_filter(HISTORY_SORT, decode_cursor(cursor, 2))]}
+        projection = field_projection(selected or model.__fields__, ["timestamp", "id"])
+        recent_items = await db.waste_classifications.find(query, projection) \
+            .sort(HISTORY_SORT).limit(limit + 1).to_list(limit + 1)
+        
+        next_cursor = None
+        if len(recent_items) > limit:
+            recent_items = recent_items[:limit]
+            next_cursor = encode_cursor([recent_items[-1]['timestamp'], recent_items[-1]['id']])
+        
+        return ORJSONResponse({
             "user_id": user_id,
             "period_days": days,
-            "total_scans": len(history),
+            "total_scans": sum(category_breakdown.values()),
             "category_breakdown": dict(category_breakdown),
             "daily_activity": dict(daily_scans),
-            "recent_items": history[:10]
-        }
+            "recent_items": trusted_rows(model, recent_items, selected),
+            "next_cursor": next_cursor
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -717,43 +3089,43 @@ async def get_monthly_report(user_id: str, month: Optional[str] = None):
         else:
             end_date = datetime(year, month_num + 1, 1)
         
-        # Get this month's data
-        this_month_data = await db.waste_classifications.find({
-            "user_id": user_id,
-            "timestamp": {"$gte": start_date, "$lt": end_date}
-        }).to_list(1000)
-        
-        # Get last month's data for comparison
+        # Get this month's and last month's rollups (last month = the 30 days before)
         last_month_start = start_date - timedelta(days=30)
-        last_month_data = await db.waste_classifications.find({
-            "user_id": user_id,
-            "timestamp": {"$gte": last_month_start, "$lt": start_date}
-        }).to_list(1000)
+        rollups, user_stats = await fan_out(
+            "monthly_report",
+            load_user_rollups(user_id, last_month_start.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")),
+            db.user_stats.find_one({"user_id": user_id})
+        )
+        month_start_day = start_date.strftime("%Y-%m-%d")
         
         # Calculate statistics
         category_breakdown = defaultdict(int)
         total_points = 0
         total_co2 = 0.0
+        last_month_scans = 0
         
-        for item in this_month_data:
-            category_breakdown[item['category']] += 1
-            total_points += item.get('points_awarded', 0)
-            total_co2 += item.get('co2_saved', 0.0)
+        for row in rollups:
+            if row['day'] < month_start_day:
+                last_month_scans += row['count']
+                continue
+            category_breakdown[row['category']] += row['count']
+            total_points += row['points']
+            total_co2 += row['co2']
+        this_month_scans = sum(category_breakdown.values())
         
         # Get badges earned this month
-        user_stats = await db.user_stats.find_one({"user_id": user_id})
         badges_earned = user_stats.get('badges', []) if user_stats else []
         
         # Comparison to last month
         comparison = {
-            "scans_change": len(this_month_data) - len(last_month_data),
-            "scans_change_percent": ((len(this_month_data) - len(last_month_data)) / max(len(last_month_data), 1)) * 100
+            "scans_change": this_month_scans - last_month_scans,
+            "scans_change_percent": ((this_month_scans - last_month_scans) / max(last_month_scans, 1)) * 100
         }
         
         return MonthlyReport(
             user_id=user_id,
             month=month,
-            total_scans=len(this_month_data),
+            total_scans=this_month_scans,
             total_points=total_points,
             co2_saved=round(total_co2, 2),
             category_breakdown=dict(category_breakdown),
@@ -768,41 +3140,311 @@ async def get_monthly_report(user_id: str, month: Optional[str] = None):
 # ============================================
 # LEADERBOARD SYSTEM
 # ============================================
+class InMemorySortedSetStore:
+    """Redis-style sorted sets held in this process.
+
+    Each key keeps a score dict plus a list of (-score, member) kept sorted with
+    bisect, so rank and top-N reads are O(log N) lookups.
+    """
+
+    def __init__(self):
+        self._scores: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._ordered: Dict[str, List[Tuple[float, str]]] = defaultdict(list)
+        self._claims: Dict[str, str] = {}
+
+    async def zincrby(self, key: str, member: str, delta: float) -> float:
+        scores, ordered = self._scores[key], self._ordered[key]
+        if member in scores:
+            del ordered[bisect.bisect_left(ordered, (-scores[member], member))]
+        score = scores.get(member, 0) + delta
+        if score > 0:
+            scores[member] = score
+            bisect.insort(ordered, (-score, member))
+        else:
+            scores.pop(member, None)
+        return score
+
+    async def zscore(self, key: str, member: str) -> Optional[float]:
+        return self._scores[key].get(member)
+
+    async def zrevrank(self, key: str, member: str) -> Optional[int]:
+        score = self._scores[key].get(member)
+        if score is None:
+            return None
+        return bisect.bisect_left(self._ordered[key], (-score, ""))
+
+    async def zrevrange(self, key: str, start: int, stop: int) -> List[Tuple[str, float]]:
+        return [(member, -neg_score) for neg_score, member in self._ordered[key][start:stop + 1]]
+
+    async def zrevrange_after(self, key: str, score: float, member: str, count: int) -> List[Tuple[str, float]]:
+        """Up to `count` members ranked after (score, member), highest score first"""
+        ordered = self._ordered[key]
+        start = bisect.bisect_right(ordered, (-score, member))
+        return [(m, -neg_score) for neg_score, m in ordered[start:start + count]]
+
+    async def members(self, key: str) -> List[Tuple[str, float]]:
+        return list(self._scores[key].items())
+
+    async def delete(self, key: str):
+        self._scores.pop(key, None)
+        self._ordered.pop(key, None)
+
+    async def is_empty(self) -> bool:
+        return not any(self._scores.values())
+
+    async def claim(self, name: str, value: str) -> bool:
+        """Advance a named watermark to `value`; False if it is already there or beyond"""
+        if self._claims.get(name, "") >= value:
+            return False
+        self._claims[name] = value
+        return True
+
+
+declare_index("leaderboard_scores", [("key", 1), ("score", -1), ("member", 1)])
+declare_query("leaderboard top", "leaderboard_scores", {"key": "all_time"}, [("score", -1)])
+declare_query("leaderboard rank", "leaderboard_scores", {"key": "all_time", "score": {"$gt": 0}})
+
+class MongoSortedSetStore:
+    """Sorted sets shared by all workers: one document per (key, member), indexed by score"""
+
+    def __init__(self, database):
+        self.scores = database.leaderboard_scores
+        self.claims = database.leaderboard_claims
+
+    async def zincrby(self, key: str, member: str, delta: float) -> float:
+        doc = await self.scores.find_one_and_update(
+            {"_id": f"{key}|{member}"},
+            {"$inc": {"score": delta}, "$setOnInsert": {"key": key, "member": member}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if doc['score'] <= 0:
+            await self.scores.delete_one({"_id": doc['_id'], "score": {"$lte": 0}})
+        return doc['score']
+
+    async def zscore(self, key: str, member: str) -> Optional[float]:
+        doc = await self.scores.find_one({"_id": f"{key}|{member}"})
+        return doc['score'] if doc else None
+
+    async def zrevrank(self, key: str, member: str) -> Optional[int]:
+        score = await self.zscore(key, member)
+        if score is None:
+            return None
+        return await self.scores.count_documents({"key": key, "score": {"$gt": score}})
+
+    async def zrevrange(self, key: str, start: int, stop: int) -> List[Tuple[str, float]]:
+        docs = await self.scores.find({"key": key}).sort([("score", -1), ("member", 1)]) \
+            .skip(start).limit(stop - start + 1).to_list(stop - start + 1)
+        return [(doc['member'], doc['score']) for doc in docs]
+
+    async def zrevrange_after(self, key: str, score: float, member: str, count: int) -> List[Tuple[str, float]]:
+        query = {"key": key, **keyset_filter([("score", -1), ("member", 1)], [score, member])}
+        docs = await self.scores.find(query).sort([("score", -1), ("member", 1)]).limit(count).to_list(count)
+        return [(doc['member'], doc['score']) for doc in docs]
+
+    async def members(self, key: str) -> List[Tuple[str, float]]:
+        return [(doc['member'], doc['score']) async for doc in self.scores.find({"key": key})]
+
+    async def delete(self, key: str):
+        await self.scores.delete_many({"key": key})
+
+    async def is_empty(self) -> bool:
+        return await self.scores.find_one({}) is None
+
+    async def claim(self, name: str, value: str) -> bool:
+        """Advance a named watermark to `value` atomically; only one worker wins"""
+        try:
+            await self.claims.update_one(
+                {"_id": name, "value": {"$lt": value}},
+                {"$set": {"value": value}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            # The watermark exists and is already at or past `value`
+            return False
+
+
+class LeaderboardService:
+    """Sorted-set leaderboards for all-time and rolling weekly/monthly points.
+
+    Points go into the all-time set, a per-day bucket and each window set.
+    When a day drops out of a window, its bucket is subtracted from that window
+    set once (guarded by a claim so only one worker does it).
+    """
+    WINDOWS = {"weekly": 7, "monthly": 30}
+
+    def __init__(self, store):
+        self.store = store
+        self._rolled_on: Optional[str] = None
+
+    @staticmethod
+    def _day_key(day) -> str:
+        return f"day:{day.isoformat()}"
+
+    async def _roll_windows(self):
+        today = datetime.utcnow().date()
+        if self._rolled_on == today.isoformat():
+            return
+        for window, length in self.WINDOWS.items():
+            # Walk forward so the watermark only ever advances over expired days
+            for age in range(length + max(self.WINDOWS.values()), length - 1, -1):
+                day = today - timedelta(days=age)
+                if await self.store.claim(f"expired:{window}", day.isoformat()):
+                    for member, score in await self.store.members(self._day_key(day)):
+                        await self.store.zincrby(window, member, -score)
+                    if length == max(self.WINDOWS.values()):
+                        await self.store.delete(self._day_key(day))
+        self._rolled_on = today.isoformat()
+
+    async def record(self, user_id: str, points: float):
+        """Add points earned now to every board"""
+        if not points:
+            return
+        try:
+            await self._roll_windows()
+            await self.store.zincrby("all_time", user_id, points)
+            await self.store.zincrby(self._day_key(datetime.utcnow().date()), user_id, points)
+            for window in self.WINDOWS:
+                await self.store.zincrby(window, user_id, points)
+        except Exception as e:
+            logging.error(f"Leaderboard update failed for {user_id}: {e}")
+        finally:
+            # After the write: a page rendered while it was in flight must not stay current
+            response_cache.invalidate("leaderboard")
+
+    async def top(self, timeframe: str, limit: int,
+                  after: Optional[Tuple[float, str]] = None) -> List[Tuple[str, float]]:
+        """Highest scores first, optionally continuing after a (score, member) position"""
+        await self._roll_windows()
+        if after:
+            return await self.store.zrevrange_after(timeframe, after[0], after[1], limit)
+        return await self.store.zrevrange(timeframe, 0, limit - 1)
+
+    async def rank(self, timeframe: str, user_id: str) -> Optional[Tuple[int, float]]:
+        """1-based rank and score of a user, or None if they have no points on the board"""
+        await self._roll_windows()
+        position = await self.store.zrevrank(timeframe, user_id)
+        if position is None:
+            return None
+        return position + 1, await self.store.zscore(timeframe, user_id)
+
+    async def rebuild(self):
+        """Seed the boards from user_stats and the last month of classifications"""
+        today = datetime.utcnow().date()
+        async for user in db.user_stats.find({"total_points": {"$gt": 0}}, {"user_id": 1, "total_points": 1}):
+            await self.store.zincrby("all_time", user['user_id'], user['total_points'])
+        
+        horizon = max(self.WINDOWS.values())
+        daily_points = db.waste_classifications.aggregate([
+            {"$match": {"timestamp": {"$gte": datetime.combine(today - timedelta(days=horizon - 1), datetime.min.time())}}},
+            {"$group": {
+                "_id": {"user_id": "$user_id", "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}}},
+                "points": {"$sum": "$points_awarded"}
+            }}
+        ])
+        async for row in daily_points:
+            day = datetime.strptime(row['_id']['day'], "%Y-%m-%d").date()
+            await self.store.zincrby(self._day_key(day), row['_id']['user_id'], row['points'])
+            for window, length in self.WINDOWS.items():
+                if (today - day).days < length:
+                    await self.store.zincrby(window, row['_id']['user_id'], row['points'])
+        
+        for window, length in self.WINDOWS.items():
+            await self.store.claim(f"expired:{window}", (today - timedelta(days=length)).isoformat())
+        self._rolled_on = today.isoformat()
+        response_cache.invalidate("leaderboard")
+
+
+leaderboard = LeaderboardService(
+    MongoSortedSetStore(db) if LEADERBOARD_STORE == 'mongo' else InMemorySortedSetStore()
+)
+
+async def init_leaderboard():
+    """Seed the boards the first time they are used.
+
+    Every worker runs this at startup; the "seeded" claim lets only one of them
+    rebuild, since two concurrent rebuilds would each add every user's points.
+    """
+    if await leaderboard.store.is_empty() and await leaderboard.store.claim("seeded", "1"):
+        await leaderboard.rebuild()
+
+LEADERBOARD_TIMEFRAMES = {"all_time", *LeaderboardService.WINDOWS}
+
+declare_cached_route(r"/api/leaderboard", ttl=60, resources=["leaderboard"])
+
 @api_router.get("/leaderboard", response_model=List[LeaderboardEntry])
-async def get_leaderboard(limit: int = 10, timeframe: str = "all_time"):
-    """Get leaderboard rankings"""
+async def get_leaderboard(limit: int = 10, timeframe: str = "all_time",
+                          cursor: Optional[str] = None, fields: Optional[str] = None, view: str = "detail"):
+    """Get leaderboard rankings (weekly/monthly rank by points earned in that window).
+
+    Paged by (score, user) position; send the X-Next-Cursor header back as
+    `cursor` for the next ranks. `view=summary` (or `fields` limited to
+    user_id, username, total_points and rank) is served from the sorted set
+    alone, without reading user_stats.
+    """
     try:
-        # Determine time filter
-        query = {}
-        if timeframe == "weekly":
-            cutoff = datetime.utcnow() - timedelta(days=7)
-            # Get weekly leaders based on recent activity
-            users = await db.user_stats.find({
-                "last_scan_date": {"$gte": cutoff}
-            }).sort("total_points", -1).limit(limit).to_list(limit)
-        elif timeframe == "monthly":
-            cutoff = datetime.utcnow() - timedelta(days=30)
-            users = await db.user_stats.find({
-                "last_scan_date": {"$gte": cutoff}
-            }).sort("total_points", -1).limit(limit).to_list(limit)
-        else:
-            users = await db.user_stats.find().sort("total_points", -1).limit(limit).to_list(limit)
-        
-        leaderboard = []
-        for rank, user in enumerate(users, 1):
-            leaderboard.append(LeaderboardEntry(
-                user_id=user['user_id'],
-                username=f"User{user['user_id'][-4:]}",  # Anonymous username
-                total_points=user['total_points'],
-                items_scanned=user['items_scanned'],
-                co2_saved_kg=user['co2_saved_kg'],
-                badges=user['badges'],
-                rank=rank,
-                level=user.get('level', 1)
-            ))
-        
-        return leaderboard
+        limit = page_size(limit)
+        model = view_model(view, LeaderboardSummary, LeaderboardEntry)
+        selected = parse_fields(fields, model.__fields__)
+        if timeframe not in LEADERBOARD_TIMEFRAMES:
+            timeframe = "all_time"
+        
+        # The cursor carries the last rank handed out so ranks continue across pages
+        score, member, last_rank = decode_cursor(cursor, 3) if cursor else (None, None, 0)
+        top_scores = await leaderboard.top(timeframe, limit + 1, (score, member) if cursor else None)
+        next_cursor = None
+        if len(top_scores) > limit:
+            top_scores = top_scores[:limit]
+            next_cursor = encode_cursor([top_scores[-1][1], top_scores[-1][0], last_rank + limit])
+        
+        user_fields = [f for f in selected or model.__fields__ if f not in LeaderboardSummary.__fields__]
+        if not user_fields:
+            return paged_response(trusted_rows(LeaderboardSummary, [
+                {"user_id": user_id, "username": f"User{user_id[-4:]}", "total_points": int(score), "rank": rank}
+                for rank, (user_id, score) in enumerate(top_scores, last_rank + 1)
+            ], selected), next_cursor)
+        
+        users = await db.user_stats.find(
+            {"user_id": {"$in": [user_id for user_id, _ in top_scores]}},
+            field_projection(user_fields, ["user_id"])
+        ).to_list(limit)
+        users_by_id = {user['user_id']: user for user in users}
+        
+        leaderboard_entries = []
+        for rank, (user_id, score) in enumerate(top_scores, last_rank + 1):
+            user = users_by_id.get(user_id)
+            if not user:
+                continue
+            leaderboard_entries.append({
+                "user_id": user_id,
+                "username": f"User{user_id[-4:]}",  # Anonymous username
+                "total_points": int(score),
+                "items_scanned": user.get('items_scanned', 0),
+                "co2_saved_kg": user.get('co2_saved_kg', 0.0),
+                "badges": user.get('badges', []),
+                "rank": rank,
+                "level": user.get('level', 1)
+            })
+        
+        return paged_response(trusted_rows(LeaderboardEntry, leaderboard_entries, selected), next_cursor)
         
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/leaderboard/rank/{user_id}")
+async def get_leaderboard_rank(user_id: str, timeframe: str = "all_time"):
+    """Get one user's position on a leaderboard"""
+    if timeframe not in LEADERBOARD_TIMEFRAMES:
+        raise HTTPException(status_code=400, detail=f"Unknown timeframe: {timeframe}")
+    try:
+        position = await leaderboard.rank(timeframe, user_id)
+        if position is None:
+            return {"user_id": user_id, "timeframe": timeframe, "rank": None, "points": 0}
+        rank, points = position
+        return {"user_id": user_id, "timeframe": timeframe, "rank": rank, "points": int(points)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -810,40 +3452,81 @@ async def get_leaderboard(limit: int = 10, timeframe: str = "all_time"):
 # ============================================
 # WASTE REPORTS WITH PRIORITY
 # ============================================
+declare_index("waste_reports", [("id", 1)], unique=True)
+declare_index("waste_reports", [("status", 1), ("priority", 1), ("timestamp", -1), ("id", -1)])
+declare_index("waste_reports", [("timestamp", -1), ("id", -1)])
+declare_query("report by id", "waste_reports", {"id": "r"})
+declare_query("reports by status and priority", "waste_reports",
+              {"status": "pending", "priority": "high"}, [("timestamp", -1), ("id", -1)])
+declare_query("reports by status", "waste_reports", {"status": "pending"}, [("timestamp", -1), ("id", -1)])
+declare_query("latest reports", "waste_reports", {}, [("timestamp", -1), ("id", -1)])
+
+REPORT_SORT = [("timestamp", -1), ("id", -1)]
+
 @api_router.post("/reports", response_model=WasteReport)
 async def create_report(report_data: WasteReportCreate):
     """Create waste report with priority assignment"""
     try:
-        report_obj = WasteReport(**report_data.dict())
+        image_refs = {}
+        image_bytes = decode_image_base64(report_data.image_base64)
+        if report_data.image_base64 and report_data.image_base64.strip() and not image_bytes:
+            raise HTTPException(status_code=400, detail="image_base64 is not valid base64")
+        if image_bytes:
+            stored = await store_image(io.BytesIO(image_bytes))
+            image_refs = {"image_id": stored['image_id'], "thumbnail_id": stored['thumbnail_id']}
+        report_obj = WasteReport(**report_data.dict(exclude={"image_base64"}), **image_refs)
         await db.waste_reports.insert_one(report_obj.dict())
         
         # Award points based on priority
         points = {"low": 3, "medium": 5, "high": 10}.get(report_data.priority, 5)
         
-        await db.user_stats.update_one(
-            {"user_id": report_data.user_id},
-            {
-                "$inc": {"total_points": points},
-                "$set": {"updated_at": datetime.utcnow()}
-            }
-        )
+        if user_stats_buffer.enabled:
+            user_stats_buffer.add_points(report_data.user_id, points)
+        else:
+            result = await db.user_stats.update_one(
+                {"user_id": report_data.user_id},
+                {
+                    "$inc": {"total_points": points},
+                    "$set": {"updated_at": datetime.utcnow()}
+                }
+            )
+            if result.matched_count:
+                await leaderboard.record(report_data.user_id, points)
+                await bump_analytics({"total_points_awarded": points})
         
         return report_obj
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/reports", response_model=List[WasteReport])
-async def get_reports(status: Optional[str] = None, priority: Optional[str] = None, limit: int = 50):
-    """Get waste reports with filtering"""
+async def get_reports(status: Optional[str] = None, priority: Optional[str] = None, limit: int = 50,
+                      cursor: Optional[str] = None, fields: Optional[str] = None, view: str = "detail"):
+    """Get waste reports with filtering, newest first, paged by (timestamp, id) cursor"""
     try:
+        limit = page_size(limit)
+        model = view_model(view, WasteReportSummary, WasteReport)
+        selected = parse_fields(fields, model.__fields__)
         query = {}
         if status:
             query['status'] = status
         if priority:
             query['priority'] = priority
-        
-        reports = await db.waste_reports.find(query).sort("timestamp", -1).limit(limit).to_list(limit)
-        return [WasteReport(**report) for report in reports]
+        if cursor:
+            query.update(keyset_filter(REPORT_SORT, decode_cursor(cursor, 2)))
+        
+        projection = field_projection(selected or model.__fields__, ["timestamp", "id"])
+        reports = await db.waste_reports.find(query, projection) \
+            .sort(REPORT_SORT).limit(limit + 1).to_list(limit + 1)
+        
+        next_cursor = None
+        if len(reports) > limit:
+            reports = reports[:limit]
+            next_cursor = encode_cursor([reports[-1]['timestamp'], reports[-1]['id']])
+        return paged_response(trusted_rows(model, reports, selected), next_cursor)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -855,14 +3538,19 @@ async def update_report_status(report_id: str, status: str):
         if status == "resolved":
             update_data["resolved_at"] = datetime.utcnow()
         
-        result = await db.waste_reports.update_one(
+        previous = await db.waste_reports.find_one_and_update(
             {"id": report_id},
-            {"$set": update_data}
+            {"$set": update_data},
+            projection={"status": 1}
         )
         
-        if result.modified_count == 0:
+        if previous is None:
             raise HTTPException(status_code=404, detail="Report not found")
         
+        was_resolved, is_resolved = previous.get('status') == "resolved", status == "resolved"
+        if was_resolved != is_resolved:
+            await bump_analytics({"reports_resolved": 1 if is_resolved else -1})
+        
         return {"message": "Report status updated", "report_id": report_id, "new_status": status}
     except HTTPException:
         raise
@@ -873,50 +3561,104 @@ async def update_report_status(report_id: str, status: str):
 # ============================================
 # ANALYTICS & INSIGHTS
 # ============================================
+async def bump_analytics(increments: Dict[str, Any]):
+    """Apply write-path deltas to the materialized global analytics snapshot"""
+    increments = {field: value for field, value in increments.items() if value}
+    if not increments:
+        return
+    try:
+        await db.analytics_snapshot.update_one(
+            {"_id": "global"},
+            {"$inc": increments, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+    except Exception as e:
+        logging.error(f"Analytics snapshot update failed: {e}")
+    finally:
+        response_cache.invalidate("analytics")
+
+async def reconcile_analytics_snapshot() -> Dict[str, Any]:
+    """Recompute the global analytics snapshot from the source collections"""
+    totals_pipeline = [
+        {"$group": {
+            "_id": None,
+            "total_co2": {"$sum": "$co2_saved_kg"},
+            "total_points": {"$sum": "$total_points"}
+        }}
+    ]
+    category_pipeline = [
+        {"$group": {
+            "_id": "$category",
+            "count": {"$sum": 1}
+        }}
+    ]
+    
+    total_users, total_scans, totals, category_data, active_bins, reports_resolved = await fan_out(
+        "analytics_reconcile",
+        db.user_stats.count_documents({}),
+        db.waste_classifications.count_documents({}),
+        db.user_stats.aggregate(totals_pipeline).to_list(1),
+        db.waste_classifications.aggregate(category_pipeline).to_list(10),
+        db.bin_locations.count_documents({"status": "active"}),
+        db.waste_reports.count_documents({"status": "resolved"})
+    )
+    total_co2 = totals[0]['total_co2'] if totals else 0
+    total_points_global = totals[0]['total_points'] if totals else 0
+    category_breakdown = {item['_id']: item['count'] for item in category_data}
+    
+    now = datetime.utcnow()
+    snapshot = {
+        "total_users": total_users,
+        "total_scans": total_scans,
+        "total_co2_saved_kg": total_co2,
+        "total_points_awarded": total_points_global,
+        "category_breakdown": category_breakdown,
+        "active_bins": active_bins,
+        "reports_resolved": reports_resolved,
+        "updated_at": now,
+        "reconciled_at": now
+    }
+    await db.analytics_snapshot.replace_one({"_id": "global"}, snapshot, upsert=True)
+    response_cache.invalidate("analytics")
+    return snapshot
+
+async def reconcile_analytics_periodically():
+    """Correct any drift between the snapshot and the source collections"""
+    while True:
+        await asyncio.sleep(ANALYTICS_RECONCILE_SECONDS)
+        try:
+            await reconcile_analytics_snapshot()
+        except Exception as e:
+            logging.error(f"Analytics reconcile failed: {e}")
+
+declare_cached_route(r"/api/analytics/global", ttl=60, resources=["analytics"])
+
 @api_router.get("/analytics/global")
 async def get_global_analytics():
-    """Get global platform analytics"""
+    """Get global platform analytics from the materialized snapshot"""
     try:
-        total_users = await db.user_stats.count_documents({})
-        total_scans = await db.waste_classifications.count_documents({})
-        
-        # Aggregate CO2 saved
-        pipeline = [
-            {"$group": {
-                "_id": None,
-                "total_co2": {"$sum": "$co2_saved_kg"},
-                "total_points": {"$sum": "$total_points"}
-            }}
-        ]
-        
-        result = await db.user_stats.aggregate(pipeline).to_list(1)
-        total_co2 = result[0]['total_co2'] if result else 0
-        total_points_global = result[0]['total_points'] if result else 0
-        
-        # Category breakdown
-        category_pipeline = [
-            {"$group": {
-                "_id": "$category",
-                "count": {"$sum": 1}
-            }}
-        ]
-        
-        category_data = await db.waste_classifications.aggregate(category_pipeline).to_list(10)
-        category_breakdown = {item['_id']: item['count'] for item in category_data}
+        snapshot = await db.analytics_snapshot.find_one({"_id": "global"})
+        if not snapshot or 'reconciled_at' not in snapshot:
+            snapshot = await reconcile_analytics_snapshot()
         
         return {
-            "total_users": total_users,
-            "total_scans": total_scans,
-            "total_co2_saved_kg": round(total_co2, 2),
-            "total_points_awarded": total_points_global,
-            "category_breakdown": category_breakdown,
-            "active_bins": await db.bin_locations.count_documents({"status": "active"}),
-            "reports_resolved": await db.waste_reports.count_documents({"status": "resolved"})
+            "total_users": snapshot.get('total_users', 0),
+            "total_scans": snapshot.get('total_scans', 0),
+            "total_co2_saved_kg": round(snapshot.get('total_co2_saved_kg', 0), 2),
+            "total_points_awarded": snapshot.get('total_points_awarded', 0),
+            "category_breakdown": snapshot.get('category_breakdown', {}),
+            "active_bins": snapshot.get('active_bins', 0),
+            "reports_resolved": snapshot.get('reports_resolved', 0),
+            "updated_at": snapshot['updated_at'],
+            "reconciled_at": snapshot['reconciled_at']
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Static content, so clients may keep it for an hour
+declare_cached_route(r"/api/tips/[^/]+", ttl=3600, max_age=3600)
+
 @api_router.get("/tips/{category}")
 async def get_waste_tips(category: str):
     """Get waste management tips for a category"""
@@ -927,48 +3669,10 @@ async def get_waste_tips(category: str):
         
         category_data = WASTE_CATEGORIES[category]
         
-        tips_database = {
-            "RECYCLE": [
-                "Rinse containers before recycling to avoid contamination",
-                "Remove caps and lids from bottles",
-                "Flatten cardboard boxes to save space",
-                "Don't bag recyclables - keep them loose",
-                "Check local guidelines for specific materials"
-            ],
-            "COMPOST": [
-                "Balance green and brown materials",
-                "Turn your compost regularly for faster decomposition",
-                "Keep compost moist but not waterlogged",
-                "Avoid meat, dairy, and oily foods",
-                "Chop large items for faster breakdown"
-            ],
-            "E_WASTE": [
-                "Never throw electronics in regular trash",
-                "Remove batteries before recycling devices",
-                "Delete personal data before disposing",
-                "Look for manufacturer take-back programs",
-                "E-waste contains valuable recoverable materials"
-            ],
-            "HAZARDOUS": [
-                "Store hazardous waste in original containers",
-                "Never mix different chemicals",
-                "Contact local hazardous waste facility",
-                "Use up products completely when possible",
-                "Consider safer alternatives for future purchases"
-            ],
-            "LANDFILL": [
-                "Try to reduce landfill waste",
-                "Consider repairing instead of discarding",
-                "Explore creative reuse options",
-                "Check if items can be donated",
-                "Future purchases: choose recyclable alternatives"
-            ]
-        }
-        
         return {
             "category": category,
             "accepted_items": category_data['items'],
-            "tips": tips_database.get(category, []),
+            "tips": TIPS_DATABASE.get(category, []),
             "co2_impact_per_item": category_data['co2_saved_per_item'],
             "points_per_item": category_data['points']
         }
@@ -1000,6 +3704,42 @@ async def root():
         ]
     }
 
+@api_router.post("/badges/reload")
+async def reload_badges():
+    """Recompile badge rules after editing the badge_definitions collection.
+
+    Takes effect at once on the worker handling this call; the others pick the
+    change up within BADGE_RULES_REFRESH_SECONDS.
+    """
+    try:
+        await reload_badge_rules()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"message": "Badge rules reloaded", "badges": list(badge_engine.definitions)}
+
+@api_router.get("/diagnostics/query-plans")
+async def get_query_plans():
+    """Explain every registered query shape and flag collection scans"""
+    try:
+        report = await verify_query_plans()
+        return {"ok": not any(shape['collscan'] for shape in report), "queries": report}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.get("/metrics")
+async def get_metrics():
+    """In-process performance counters for this worker"""
+    return {
+        "classification_cache": classification_cache.stats(),
+        "classifier_routing": dict(classifier_routing),
+        "llm": llm_client.stats(),
+        "single_flight": classification_flights.stats(),
+        "jobs": await job_service.stats(),
+        "fan_out": fanout_stats(),
+        "response_cache": response_cache.stats(),
+        "user_stats_buffer": user_stats_buffer.stats()
+    }
+
 @api_router.post("/seed-data")
 async def seed_data():
     """Seed database with enhanced sample data"""
@@ -1091,7 +3831,14 @@ async def seed_data():
         
         for bin_data in sample_bins:
             bin_obj = BinLocation(**bin_data)
-            await db.bin_locations.insert_one(bin_obj.dict())
+            await db.bin_locations.insert_one({
+                **bin_obj.dict(),
+                "location": bin_geo_point(bin_obj.latitude, bin_obj.longitude)
+            })
+            bin_index.upsert(bin_obj.dict())
+            if bin_obj.status == "active":
+                await bump_analytics({"active_bins": 1})
+        response_cache.invalidate("bins")
         
         return {
             "message": f"Successfully seeded {len(sample_bins)} bin locations with enhanced data",
@@ -1101,15 +3848,60 @@ async def seed_data():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ============================================
+# DATABASE BOOTSTRAP
+# ============================================
+async def migrate_bin_locations() -> int:
+    """Backfill the GeoJSON `location` field on bins created before geo indexing"""
+    result = await db.bin_locations.update_many(
+        {"location": {"$exists": False}},
+        [{"$set": {"location": {"type": "Point", "coordinates": ["$longitude", "$latitude"]}}}]
+    )
+    return result.modified_count
+
+async def migrate_report_images(batch_size: int = 100) -> int:
+    """Move inline base64 report images into the blob store, leaving references.
+
+    The inline copy is only removed once the blob is stored. Reports whose image
+    cannot be decoded or stored keep it and are retried on the next startup.
+    """
+    migrated = 0
+    skipped = []
+    while True:
+        reports = await db.waste_reports.find(
+            {"image_base64": {"$type": "string"}, "_id": {"$nin": skipped}}, {"id": 1, "image_base64": 1}
+        ).limit(batch_size).to_list(batch_size)
+        if not reports:
+            if skipped:
+                logging.error(f"Left {len(skipped)} report images inline that could not be moved to the blob store")
+            return migrated
+        for report in reports:
+            update = {"$unset": {"image_base64": ""}}
+            if report['image_base64'].strip():
+                image_bytes = decode_image_base64(report['image_base64'])
+                try:
+                    if not image_bytes:
+                        raise ValueError("not valid base64")
+                    stored = await store_image(io.BytesIO(image_bytes))
+                except Exception as e:
+                    logging.error(f"Keeping inline image of report {report.get('id')}: {e}")
+                    skipped.append(report['_id'])
+                    continue
+                update["$set"] = {"image_id": stored['image_id'], "thumbnail_id": stored['thumbnail_id']}
+            await db.waste_reports.update_one({"_id": report['_id']}, update)
+            migrated += 1
+
 # Include router and configure app
 app.include_router(api_router)
 
+app.add_middleware(ResponseCacheMiddleware, cache=response_cache)
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
 
 logging.basicConfig(
@@ -1118,6 +3910,43 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def startup_db_client():
+    migrated = await migrate_bin_locations()
+    if migrated:
+        logging.info(f"Backfilled GeoJSON location on {migrated} bins")
+    migrated = await migrate_report_images()
+    if migrated:
+        logging.info(f"Moved {migrated} inline report images to the blob store")
+    await ensure_indexes()
+    if VERIFY_QUERY_PLANS:
+        collscans = [shape['name'] for shape in await verify_query_plans() if shape['collscan']]
+        if collscans:
+            raise RuntimeError(f"Query shapes falling back to COLLSCAN: {collscans}")
+    await init_leaderboard()
+    await ensure_user_rollups()
+    try:
+        await reload_badge_rules()
+    except ValueError as e:
+        logging.error(f"Invalid badge definitions, keeping built-in badges: {e}")
+    await reload_bin_index()
+    try:
+        await llm_client.warm_up()
+    except (KeyError, LlmUnavailable) as e:
+        logging.error(f"LLM warm-up failed, clients will be built on demand: {e!r}")
+    job_service.start()
+    app.state.bin_index_refresher = asyncio.create_task(refresh_bin_index_periodically())
+    app.state.analytics_reconciler = asyncio.create_task(reconcile_analytics_periodically())
+    app.state.badge_rules_refresher = asyncio.create_task(refresh_badge_rules_periodically())
+    user_stats_buffer.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    app.state.bin_index_refresher.cancel()
+    app.state.analytics_reconciler.cancel()
+    app.state.badge_rules_refresher.cancel()
+    await job_service.stop()
+    # After the job workers, so stats from their last scans are written too
+    await user_stats_buffer.stop()
+    image_executor.shutdown(wait=False)
     client.close()
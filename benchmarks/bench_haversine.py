@@ -0,0 +1,43 @@
+"""Nearest-3 bins for one origin: scalar haversine loop vs the NumPy kernels and the grid index.
+
+    python benchmarks/bench_haversine.py
+"""
+import math
+import random
+
+import numpy as np
+
+from common import best_ms, server
+
+
+def scalar_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """The per-pair haversine the bin lookups used before vectorizing"""
+    lat1_rad, lat2_rad = math.radians(lat1), math.radians(lat2)
+    dlat, dlon = math.radians(lat2 - lat1), math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2) ** 2
+    return 6371 * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def main():
+    rng = random.Random(42)
+    origin = (40.75, -73.95)
+    for count in (10_000, 1_000_000):
+        bins = [{"id": str(n), "type": "recycling", "latitude": 40.5 + rng.random(), "longitude": -74.5 + rng.random()}
+                for n in range(count)]
+        lats = np.array([b["latitude"] for b in bins])
+        lons = np.array([b["longitude"] for b in bins])
+        repeat = 5 if count <= 10_000 else 2
+
+        scalar = best_ms(lambda: sorted(
+            (scalar_km(*origin, b["latitude"], b["longitude"]), b["id"]) for b in bins)[:3], repeat)
+        vectorized = best_ms(lambda: server.top_k_indices(server.haversine_km(*origin, lats, lons), 3), repeat)
+        print(f"{count:>9,} bins  scalar loop + sort {scalar:8.2f} ms   "
+              f"vectorized {vectorized:7.2f} ms ({scalar / vectorized:.0f}x)")
+
+    index = server.BinSpatialIndex()
+    index.load(bins[:100_000])
+    print(f"  100,000 bins  indexed nearest-3 {best_ms(lambda: index.nearest(*origin, limit=3), 20):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
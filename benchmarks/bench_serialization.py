@@ -0,0 +1,58 @@
+"""Building a list response: pydantic models + jsonable_encoder + JSONResponse vs trusted_rows + ORJSONResponse.
+
+The "models" column leaves out FastAPI's second response_model validation pass,
+so it understates the old path slightly.
+
+    python benchmarks/bench_serialization.py
+"""
+import random
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from common import best_ms, server
+
+
+def stored_bins(count, rng):
+    return [{**server.BinLocation(name=f"Bin {n}", type="recycling", latitude=40 + rng.random(),
+                                  longitude=-74 + rng.random(), address=f"{n} Main St",
+                                  last_emptied=datetime(2026, 10, 1) + timedelta(minutes=n),
+                                  accepted_waste_types=["RECYCLE", "E_WASTE"]).dict(), "_id": n}
+            for n in range(count)]
+
+
+def stored_reports(count, rng):
+    return [server.WasteReport(location=f"{n} Main St", latitude=40 + rng.random(), longitude=-74 + rng.random(),
+                               description="Overflowing bin by the bus stop").dict() for n in range(count)]
+
+
+def stored_classifications(count, rng):
+    return [server.WasteClassification(classification="Plastic bottle", category="RECYCLE", suggestions="Rinse it",
+                                       recycling_info="PET 1", environmental_impact="Saves energy",
+                                       co2_saved=rng.random(), location={"latitude": 40.7, "longitude": -74.0}).dict()
+            for _ in range(count)]
+
+
+def old_body(model, docs):
+    return JSONResponse(content=jsonable_encoder([model(**doc) for doc in docs])).body
+
+
+def new_body(model, docs):
+    return server.paged_response(server.trusted_rows(model, docs), None).body
+
+
+def main():
+    rng = random.Random(5)
+    for label, model, make in [("bins", server.BinLocation, stored_bins),
+                               ("reports", server.WasteReport, stored_reports),
+                               ("history", server.WasteClassification, stored_classifications)]:
+        for count in (1_000, 10_000):
+            docs = make(count, rng)
+            old = best_ms(lambda: old_body(model, docs), repeat=3)
+            new = best_ms(lambda: new_body(model, docs), repeat=3)
+            print(f"{label:<8} {count:>6,} rows  models {old:7.1f} ms   trusted rows {new:6.1f} ms ({old / new:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
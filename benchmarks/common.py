@@ -0,0 +1,23 @@
+"""Shared setup for the benchmark scripts: import server without any external service"""
+import os
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark_database")
+os.environ["LLM_BACKEND"] = "fake"
+os.environ["JOB_QUEUE"] = "memory"
+os.environ["LEADERBOARD_STORE"] = "memory"
+os.environ["BLOB_STORE"] = "local"
+os.environ["BLOB_STORE_DIR"] = tempfile.mkdtemp(prefix="blobs-")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import server  # noqa: E402,F401
+
+
+def best_ms(fn, repeat: int = 5, number: int = 1) -> float:
+    """Best-of-`repeat` wall time of one call, in milliseconds"""
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number * 1000
@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import {
   View,
   Text,
@@ -11,18 +11,38 @@ import {
 import { SafeAreaView } from 'react-native-safe-area-context';
 import { MaterialCommunityIcons } from '@expo/vector-icons';
 import * as Location from 'expo-location';
-import { getBins, BinLocation } from '../../services/api';
+import { getBinsPage, BinLocation } from '../../services/api';
+
+// Search radii offered while located; the server only returns bins inside the chosen one
+const RADIUS_OPTIONS_KM = [10, 50, 200];
 
 export default function BinsScreen() {
   const [bins, setBins] = useState<BinLocation[]>([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [location, setLocation] = useState<Location.LocationObject | null>(null);
+  const [radiusKm, setRadiusKm] = useState(50);
+  // Bumped by every fresh load so late responses from an older one are dropped
+  const requestId = useRef(0);
+  // The query the current cursor belongs to; later pages must repeat it
+  const pageQuery = useRef<ReturnType<typeof binQuery> | null>(null);
 
   useEffect(() => {
-    loadBins();
     requestLocationPermission();
   }, []);
 
+  // Reload once the location is known so the server sorts bins by distance
+  useEffect(() => {
+    loadBins();
+  }, [location, radiusKm]);
+
+  function binQuery() {
+    return location
+      ? { latitude: location.coords.latitude, longitude: location.coords.longitude, radius_km: radiusKm, limit: 50, view: 'summary' as const }
+      : { limit: 50, view: 'summary' as const };
+  }
+
   const requestLocationPermission = async () => {
     try {
       const { status } = await Location.requestForegroundPermissionsAsync();
@@ -36,14 +56,36 @@ export default function BinsScreen() {
   };
 
   const loadBins = async () => {
+    const request = ++requestId.current;
+    const query = binQuery();
     try {
       setLoading(true);
-      const data = await getBins();
-      setBins(data);
+      setLoadingMore(false);
+      const page = await getBinsPage(query);
+      if (request !== requestId.current) return;
+      pageQuery.current = query;
+      setBins(page.items);
+      setNextCursor(page.nextCursor);
+    } catch (error: any) {
+      if (request === requestId.current) Alert.alert('Error', 'Failed to load bin locations');
+    } finally {
+      if (request === requestId.current) setLoading(false);
+    }
+  };
+
+  const loadMoreBins = async () => {
+    if (!nextCursor || loadingMore || !pageQuery.current) return;
+    const request = requestId.current;
+    try {
+      setLoadingMore(true);
+      const page = await getBinsPage({ ...pageQuery.current, cursor: nextCursor });
+      if (request !== requestId.current) return;
+      setBins((current) => [...current, ...page.items]);
+      setNextCursor(page.nextCursor);
     } catch (error: any) {
-      Alert.alert('Error', 'Failed to load bin locations');
+      console.log('Failed to load more bins:', error);
     } finally {
-      setLoading(false);
+      if (request === requestId.current) setLoadingMore(false);
     }
   };
 
@@ -103,7 +145,8 @@ export default function BinsScreen() {
   };
 
   const renderBin = ({ item }: { item: BinLocation }) => {
-    const distance = calculateDistance(item.latitude, item.longitude);
+    const distance =
+      item.distance !== undefined ? item.distance.toFixed(1) : calculateDistance(item.latitude, item.longitude);
 
     return (
       <TouchableOpacity style={styles.binCard}>
@@ -204,15 +247,37 @@ export default function BinsScreen() {
         </View>
       )}
 
+      {location && (
+        <View style={styles.radiusRow}>
+          <Text style={styles.radiusLabel}>Within</Text>
+          {RADIUS_OPTIONS_KM.map((km) => (
+            <TouchableOpacity
+              key={km}
+              style={[styles.radiusChip, km === radiusKm && styles.radiusChipActive]}
+              onPress={() => setRadiusKm(km)}
+            >
+              <Text style={[styles.radiusChipText, km === radiusKm && styles.radiusChipTextActive]}>
+                {km} km
+              </Text>
+            </TouchableOpacity>
+          ))}
+        </View>
+      )}
+
       <FlatList
         data={bins}
         renderItem={renderBin}
         keyExtractor={(item) => item.id}
         contentContainerStyle={styles.listContent}
+        onEndReached={loadMoreBins}
+        onEndReachedThreshold={0.5}
+        ListFooterComponent={loadingMore ? <ActivityIndicator color="#4CAF50" /> : null}
         ListEmptyComponent={
           <View style={styles.emptyContainer}>
             <MaterialCommunityIcons name="map-marker-off" size={64} color="#BDBDBD" />
-            <Text style={styles.emptyText}>No bin locations found</Text>
+            <Text style={styles.emptyText}>
+              {location ? `No bin locations within ${radiusKm} km` : 'No bin locations found'}
+            </Text>
             <TouchableOpacity style={styles.refreshButtonLarge} onPress={loadBins}>
               <Text style={styles.refreshButtonText}>Refresh</Text>
             </TouchableOpacity>
@@ -275,6 +340,37 @@ const styles = StyleSheet.create({
     fontSize: 14,
     color: '#E65100',
   },
+  radiusRow: {
+    flexDirection: 'row',
+    alignItems: 'center',
+    marginHorizontal: 16,
+    marginTop: 16,
+    gap: 8,
+  },
+  radiusLabel: {
+    fontSize: 14,
+    color: '#757575',
+  },
+  radiusChip: {
+    paddingHorizontal: 12,
+    paddingVertical: 6,
+    borderRadius: 16,
+    backgroundColor: '#FFF',
+    borderWidth: 1,
+    borderColor: '#E0E0E0',
+  },
+  radiusChipActive: {
+    backgroundColor: '#E8F5E9',
+    borderColor: '#4CAF50',
+  },
+  radiusChipText: {
+    fontSize: 14,
+    color: '#757575',
+  },
+  radiusChipTextActive: {
+    color: '#4CAF50',
+    fontWeight: '600',
+  },
   listContent: {
     padding: 16,
   },
@@ -30,6 +30,23 @@ export interface BinLocation {
   status: string;
   capacity: number;
   timings: string;
+  distance?: number; // km, only on location queries
+}
+
+export interface BinQuery {
+  latitude?: number;
+  longitude?: number;
+  radius_km?: number;
+  waste_type?: string;
+  status?: string;
+  limit?: number;
+  cursor?: string;
+  view?: 'summary' | 'detail';
+}
+
+export interface Page<T> {
+  items: T[];
+  nextCursor: string | null;
 }
 
 export interface UserStats {
@@ -49,11 +66,50 @@ export const classifyWaste = async (imageBase64: string): Promise<WasteClassific
   return response.data;
 };
 
-export const getBins = async (): Promise<BinLocation[]> => {
-  const response = await api.get('/bins');
+export interface ClassificationJob {
+  id: string;
+  status: 'queued' | 'running' | 'done' | 'failed';
+  result: WasteClassificationResponse | null;
+  error: string | null;
+}
+
+export const getClassificationJob = async (jobId: string): Promise<ClassificationJob> => {
+  const response = await api.get(`/jobs/${jobId}`);
   return response.data;
 };
 
+// Queues the classification and polls for the result, so no single request waits on the LLM
+export const classifyWasteQueued = async (
+  imageBase64: string,
+  pollIntervalMs: number = 1000,
+): Promise<WasteClassificationResponse> => {
+  const response = await api.post('/classify-waste', {
+    image_base64: imageBase64,
+    user_id: 'default_user',
+  }, { params: { async: true } });
+  let job: ClassificationJob = response.data;
+  while (job.status === 'queued' || job.status === 'running') {
+    await new Promise((resolve) => setTimeout(resolve, pollIntervalMs));
+    job = await getClassificationJob(job.id);
+  }
+  if (job.status === 'failed' || !job.result) {
+    throw new Error(job.error || 'Classification failed');
+  }
+  return job.result;
+};
+
+// One page of bins; located queries come back nearest first with `distance` set.
+// Pass `nextCursor` back as `cursor` for the following page.
+export const getBinsPage = async (query: BinQuery = {}): Promise<Page<BinLocation>> => {
+  const response = await api.get('/bins', { params: query });
+  return { items: response.data, nextCursor: response.headers['x-next-cursor'] ?? null };
+};
+
+export const getBins = async (query: BinQuery = {}): Promise<BinLocation[]> => {
+  const page = await getBinsPage(query);
+  return page.items;
+};
+
 export const getUserStats = async (userId: string = 'default_user'): Promise<UserStats> => {
   const response = await api.get(`/user-stats/${userId}`);
   return response.data;
@@ -0,0 +1,55 @@
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+# In-process stand-ins for everything outside this process; set before server is imported
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_database")
+os.environ["LLM_BACKEND"] = "fake"
+os.environ["JOB_QUEUE"] = "memory"
+os.environ["LEADERBOARD_STORE"] = "memory"
+os.environ["BLOB_STORE"] = "local"
+os.environ["BLOB_STORE_DIR"] = tempfile.mkdtemp(prefix="blobs-")
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import server  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """A fresh mongomock database behind server.db"""
+    client = AsyncMongoMockClient()
+    database = client["test_database"]
+    monkeypatch.setattr(server, "client", client)
+    monkeypatch.setattr(server, "db", database)
+    return database
+
+
+@pytest.fixture
+def llm_calls(db, monkeypatch):
+    """A slow fake LLM, fresh cache, flights and routing counters, and synchronous stats writes"""
+    calls = []
+
+    async def classify_with_llm(description):
+        calls.append(description)
+        await asyncio.sleep(0.01)
+        return {"classification": "Banana Peel", "category": "COMPOST", "details": "Organic"}
+
+    monkeypatch.setattr(server, "classify_with_llm", classify_with_llm)
+    monkeypatch.setattr(server, "classification_cache", server.ClassificationCache(100, 60))
+    monkeypatch.setattr(server, "classification_flights", server.SingleFlight())
+    monkeypatch.setattr(server, "classifier_routing", {"local": 0, "cache": 0, "llm": 0, "coalesced": 0})
+    monkeypatch.setattr(server, "user_stats_buffer", server.UserStatsBuffer(False, 1000, 100))
+    monkeypatch.setattr(server, "leaderboard", server.LeaderboardService(server.InMemorySortedSetStore()))
+    return calls
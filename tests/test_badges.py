@@ -0,0 +1,79 @@
+import pytest
+from fastapi import HTTPException
+
+import server
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = server.BadgeRuleEngine()
+    engine.load(server.BADGES)
+    monkeypatch.setattr(server, "badge_engine", engine)
+    return engine
+
+
+@pytest.mark.parametrize("requirement", ["rank >= 1", "user_id >= 1", "badges >= 2", "last_scan_date > 0"])
+def test_non_numeric_stats_are_rejected_at_load(engine, requirement):
+    with pytest.raises(ValueError, match="Badge requirement must compare"):
+        engine.load({"Bad": {"requirement": requirement, "points_bonus": 10}})
+    # The active rules are untouched
+    assert set(engine.definitions) == set(server.BADGES)
+
+
+def test_numeric_counters_are_accepted():
+    assert server.parse_badge_requirement("co2_saved_kg >= 2.5") == ("co2_saved_kg", ">=", 2.5)
+    assert server.parse_badge_requirement("daily_streak==3") == ("daily_streak", "==", 3.0)
+
+
+@pytest.mark.anyio
+async def test_reload_rejects_a_bad_definition_and_keeps_the_rules(db, engine):
+    await db.badge_definitions.insert_one({"name": "Top Dog", "requirement": "rank >= 1", "points_bonus": 5})
+    with pytest.raises(HTTPException) as error:
+        await server.reload_badges()
+    assert error.value.status_code == 400
+    assert "Top Dog" not in engine.definitions
+
+
+@pytest.mark.anyio
+async def test_periodic_refresh_picks_up_new_definitions(db, engine, monkeypatch):
+    monkeypatch.setattr(server, "BADGE_RULES_REFRESH_SECONDS", 0)
+    await db.badge_definitions.insert_one({"name": "Centurion", "requirement": "items_scanned >= 100", "points_bonus": 150})
+    refresher = server.asyncio.create_task(server.refresh_badge_rules_periodically())
+    for _ in range(10):
+        await server.asyncio.sleep(0)
+        if "Centurion" in engine.definitions:
+            break
+    refresher.cancel()
+    assert engine.points_bonus("Centurion") == 150
+    assert [rule.name for rule in engine.rules_for(["items_scanned"])].count("Centurion") == 1
+
+
+@pytest.mark.parametrize("info", [
+    {"requirement": "items_scanned >= 5"},
+    {"points_bonus": 10},
+    {"requirement": "items_scanned >= 5", "points_bonus": "50"},
+    {"requirement": "items_scanned >= 5", "points_bonus": -5},
+    {"requirement": "items_scanned >= 5", "points_bonus": 2.5},
+    {"requirement": "items_scanned >= 5", "points_bonus": True},
+    {"requirement": 5, "points_bonus": 10},
+])
+def test_malformed_definitions_raise_value_error(engine, info):
+    with pytest.raises(ValueError):
+        engine.load({**server.BADGES, "Bad": info})
+    assert "Bad" not in engine.definitions
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("doc", [
+    {"name": "No Bonus", "requirement": "items_scanned >= 5"},
+    {"name": "String Bonus", "requirement": "items_scanned >= 5", "points_bonus": "50"},
+    {"requirement": "items_scanned >= 5", "points_bonus": 5},
+])
+async def test_bad_documents_are_a_400_and_never_reach_the_pipeline(db, engine, doc):
+    await db.badge_definitions.insert_one(doc)
+    with pytest.raises(HTTPException) as error:
+        await server.reload_badges()
+    assert error.value.status_code == 400
+    assert set(engine.definitions) == set(server.BADGES)
+    # Every rule the scan pipeline compiles adds a numeric bonus
+    assert all(isinstance(rule.points_bonus, int) for rule in engine.rules)
@@ -0,0 +1,111 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+
+
+class CountingDb:
+    """Passes through to the mock database, counting insert_many calls on waste_classifications"""
+
+    def __init__(self, inner):
+        self._inner = inner
+        self.inserts = []
+        outer = self
+
+        class Classifications:
+            def __getattr__(self, name):
+                return getattr(inner.waste_classifications, name)
+
+            async def insert_many(self, docs, **kwargs):
+                outer.inserts.append(len(docs))
+                return await inner.waste_classifications.insert_many(docs, **kwargs)
+
+        self.waste_classifications = Classifications()
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+@pytest.fixture
+def counting_db(db, monkeypatch):
+    counting = CountingDb(db)
+    monkeypatch.setattr(server, "db", counting)
+    monkeypatch.setattr(server, "user_stats_buffer", server.UserStatsBuffer(False, 1000, 100))
+    monkeypatch.setattr(server, "leaderboard", server.LeaderboardService(server.InMemorySortedSetStore()))
+    return counting
+
+
+@pytest.fixture
+def stats_updates(monkeypatch):
+    calls = []
+    apply_user_scans = server.apply_user_scans
+
+    async def spy(user_id, scans):
+        calls.append((user_id, len(scans)))
+        return await apply_user_scans(user_id, scans)
+
+    monkeypatch.setattr(server, "apply_user_scans", spy)
+    return calls
+
+
+@pytest.fixture
+def failing_item(monkeypatch):
+    classify_item = server.classify_item
+
+    async def fails_on_request(image_id, cache_key, description, *args):
+        if description == "explode":
+            raise RuntimeError("model refused")
+        return await classify_item(image_id, cache_key, description, *args)
+
+    monkeypatch.setattr(server, "classify_item", fails_on_request)
+
+
+def item(description, user_id):
+    return {"image_base64": "", "description": description, "user_id": user_id}
+
+
+def post_batch(items):
+    response = TestClient(server.app).post("/api/classify-waste/batch", json={"items": items})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_streams_each_item_then_a_done_line_and_writes_once(db, counting_db, stats_updates, failing_item):
+    lines = post_batch([item("plastic bottle", "u1"), item("explode", "u1"),
+                        item("aluminum can", "u1"), item("coffee grounds", "u2")])
+
+    *results, done = lines
+    assert sorted(line["index"] for line in results) == [0, 1, 2, 3]
+    by_index = {line["index"]: line for line in results}
+    assert by_index[1] == {"index": 1, "status": "error", "detail": "Classification failed: model refused"}
+    assert by_index[0]["status"] == "ok" and by_index[0]["result"]["category"] == "RECYCLE"
+    assert done == {"status": "done", "classified": 3, "failed": 1}
+
+    # One insert for all records, one folded stats update per user; the failed item is in neither
+    assert counting_db.inserts == [3]
+    assert sorted(stats_updates) == [("u1", 2), ("u2", 1)]
+
+
+@pytest.mark.anyio
+async def test_written_records_and_stats_leave_out_failed_items(db, counting_db, stats_updates, failing_item):
+    post_batch([item("plastic bottle", "u1"), item("explode", "u1")])
+    assert await db.waste_classifications.count_documents({}) == 1
+    stats = await db.user_stats.find_one({"user_id": "u1"})
+    assert (stats["items_scanned"], stats["items_recycled"]) == (1, 1)
+
+
+def test_batch_where_every_item_fails_writes_nothing(counting_db, stats_updates, failing_item):
+    *_, done = post_batch([item("explode", "u1")])
+    assert done == {"status": "done", "classified": 0, "failed": 1}
+    assert counting_db.inserts == [] and stats_updates == []
+
+
+def test_empty_and_oversized_batches_are_rejected(counting_db, monkeypatch):
+    client = TestClient(server.app)
+    assert client.post("/api/classify-waste/batch", json={"items": []}).status_code == 400
+    monkeypatch.setattr(server, "BATCH_MAX_ITEMS", 2)
+    response = client.post("/api/classify-waste/batch", json={"items": [item("paper", "u1")] * 3})
+    assert response.status_code == 413
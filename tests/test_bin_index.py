@@ -0,0 +1,80 @@
+import random
+
+import numpy as np
+import pytest
+
+import server
+
+
+def random_bins(count, seed=3):
+    rng = random.Random(seed)
+    kinds = ["recycling", "compost", "e-waste"]
+    return [{"id": f"bin-{n:04d}", "type": rng.choice(kinds), "status": "active",
+             "latitude": 40.6 + rng.random() * 0.3, "longitude": -74.1 + rng.random() * 0.3,
+             "accepted_waste_types": rng.sample(["RECYCLE", "COMPOST", "E_WASTE"], 1)}
+            for n in range(count)]
+
+
+def brute_force(bins, latitude, longitude, waste_type=None):
+    if waste_type:
+        wanted = waste_type.lower()
+        bins = [b for b in bins if wanted in {b["type"], *(t.lower() for t in b["accepted_waste_types"])}]
+    distances = server.haversine_km(latitude, longitude, np.array([b["latitude"] for b in bins]),
+                                    np.array([b["longitude"] for b in bins]))
+    return sorted(zip(distances.tolist(), (b["id"] for b in bins)))
+
+
+@pytest.fixture
+def bins():
+    return random_bins(500)
+
+
+@pytest.fixture
+def index(bins):
+    index = server.BinSpatialIndex()
+    index.load(bins)
+    return index
+
+
+QUERIES = [(40.75, -73.95), (40.61, -74.09), (41.5, -73.0)]
+
+
+@pytest.mark.parametrize("latitude, longitude", QUERIES)
+@pytest.mark.parametrize("waste_type", [None, "RECYCLE", "compost"])
+def test_nearest_matches_a_full_scan(index, bins, latitude, longitude, waste_type):
+    expected = brute_force(bins, latitude, longitude, waste_type)[:5]
+    found = index.nearest(latitude, longitude, waste_type, limit=5)
+    assert [b["id"] for b in found] == [bin_id for _, bin_id in expected]
+    assert [b["distance"] for b in found] == pytest.approx([d for d, _ in expected])
+
+
+@pytest.mark.parametrize("radius_km", [0.5, 3, 25])
+def test_within_radius_matches_a_full_scan(index, bins, radius_km):
+    expected = {bin_id for d, bin_id in brute_force(bins, 40.75, -73.95, "E_WASTE") if d <= radius_km}
+    found = index.within_radius(40.75, -73.95, radius_km, "E_WASTE")
+    assert {b["id"] for b in found} == expected
+    assert [b["distance"] for b in found] == sorted(b["distance"] for b in found)
+
+
+def test_upsert_moves_a_bin_and_update_fields_keeps_its_place(index):
+    index.upsert({"id": "bin-0000", "type": "recycling", "status": "active", "latitude": 10.0, "longitude": 10.0,
+                  "accepted_waste_types": []})
+    nearest = index.nearest(10.0, 10.0, limit=1)[0]
+    assert nearest["id"] == "bin-0000" and nearest["distance"] == pytest.approx(0)
+    assert "bin-0000" not in {b["id"] for b in index.within_radius(40.75, -73.95, 100)}
+
+    index.update_fields("bin-0000", status="full")
+    assert index.nearest(10.0, 10.0, "recycling", limit=1)[0]["status"] == "full"
+
+
+def test_unknown_waste_types_and_empty_indexes_find_nothing(index):
+    assert index.nearest(40.75, -73.95, "plutonium") == []
+    empty = server.BinSpatialIndex()
+    empty.load([])
+    assert empty.ready
+    assert empty.nearest(40.75, -73.95) == [] and empty.within_radius(40.75, -73.95, 10) == []
+
+
+def test_reload_replaces_the_whole_snapshot(index):
+    index.load(random_bins(3, seed=9))
+    assert len(index.within_radius(40.75, -73.95, 500)) == 3
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+import pytest
+from cachetools import TTLCache
+from fastapi.testclient import TestClient
+
+import server
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.anyio
+async def test_cache_hit_skips_the_llm_but_still_records_the_scan(db, llm_calls):
+    client = TestClient(server.app)
+    for _ in range(2):
+        response = client.post("/api/classify-waste", json={"image_base64": "", "description": "Banana  PEEL",
+                                                            "user_id": "u1"})
+        assert response.status_code == 200
+        assert response.json()["category"] == "COMPOST"
+    assert llm_calls == ["Banana  PEEL"]
+    assert server.classifier_routing["cache"] == 1
+    assert await db.waste_classifications.count_documents({"user_id": "u1"}) == 2
+    assert (await db.user_stats.find_one({"user_id": "u1"}))["compost_items"] == 2
+
+
+def test_key_normalizes_the_description_but_not_the_image():
+    key = server.ClassificationCache.key
+    assert key(b"img", "  Plastic   Bottle ") == key(b"img", "plastic bottle")
+    assert key(b"img", None) == key(b"img", "")
+    assert key(b"img", "bottle") != key(b"other", "bottle")
+
+
+@pytest.mark.anyio
+async def test_entries_expire_and_least_recently_used_is_evicted():
+    cache = server.ClassificationCache(maxsize=2, ttl_seconds=60)
+    clock = Clock()
+    cache._local = TTLCache(maxsize=2, ttl=60, timer=clock)
+
+    await cache.set("a", {"category": "RECYCLE"})
+    await cache.set("b", {"category": "COMPOST"})
+    assert await cache.get("a") == {"category": "RECYCLE"}
+    await cache.set("c", {"category": "E_WASTE"})
+    assert await cache.get("b") is None  # evicted: least recently used
+
+    clock.now = 61
+    assert await cache.get("a") is None and await cache.get("c") is None
+    assert cache.stats() == {"hits": 1, "misses": 3, "hit_rate": 0.25, "size": 0, "shared": False}
+
+
+@pytest.mark.anyio
+async def test_shared_cache_serves_other_workers_until_expiry(db):
+    await server.ClassificationCache(10, 60, shared=True).set("k", {"category": "RECYCLE"})
+    other_worker = server.ClassificationCache(10, 60, shared=True)
+    assert await other_worker.get("k") == {"category": "RECYCLE"}
+
+    await db.classification_cache.update_one({"_id": "k"}, {"$set": {"expires_at": datetime.utcnow() - timedelta(1)}})
+    assert await server.ClassificationCache(10, 60, shared=True).get("k") is None
@@ -0,0 +1,61 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+
+
+def test_every_declared_query_leads_with_an_indexed_field():
+    for shape in server.QUERY_SHAPES:
+        fields = {*shape["filter"], *(field for field, _ in shape["sort"] or [])}
+        leading = {keys[0][0] for collection, keys, _ in server.REQUIRED_INDEXES if collection == shape["collection"]}
+        assert fields & leading, f"{shape['name']} has no index on {shape['collection']}"
+
+
+def test_plan_stages_walks_nested_plans():
+    plan = {"stage": "FETCH", "inputStage": {"stage": "OR", "inputStages": [
+        {"stage": "IXSCAN"}, {"stage": "COLLSCAN", "filter": {"a": 1}}
+    ]}}
+    assert server.plan_stages(plan) == ["FETCH", "OR", "IXSCAN", "COLLSCAN"]
+
+
+@pytest.mark.anyio
+async def test_ensure_indexes_creates_declared_indexes_and_survives_failures(db, monkeypatch):
+    await db.bins_test.insert_many([{"code": "a"}, {"code": "a"}])
+    monkeypatch.setattr(server, "REQUIRED_INDEXES", [
+        ("bins_test", [("code", 1)], {"unique": True}),  # blocked by the duplicates
+        ("bins_test", [("status", 1), ("id", 1)], {}),
+    ])
+    await server.ensure_indexes()
+    keys = [info["key"] for info in (await db.bins_test.index_information()).values()]
+    assert [("status", 1), ("id", 1)] in keys
+    assert [("code", 1)] not in keys
+
+
+class ExplainingDb:
+    """Answers explain commands with a canned winning plan per collection"""
+
+    def __init__(self, plans):
+        self.plans = plans
+        self.commands = []
+
+    async def command(self, command):
+        self.commands.append(command)
+        return {"queryPlanner": {"winningPlan": self.plans[command["explain"]["find"]]}}
+
+
+def test_query_plan_report_flags_collection_scans(monkeypatch):
+    monkeypatch.setattr(server, "QUERY_SHAPES", [])
+    server.declare_query("by code", "indexed", {"code": "a"}, [("created_at", -1)])
+    server.declare_query("by colour", "unindexed", {"colour": "red"})
+    explaining = ExplainingDb({
+        "indexed": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}},
+        "unindexed": {"stage": "COLLSCAN"},
+    })
+    monkeypatch.setattr(server, "db", explaining)
+
+    response = TestClient(server.app).get("/api/diagnostics/query-plans")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["ok"] is False
+    assert [(q["name"], q["collscan"]) for q in body["queries"]] == [("by code", False), ("by colour", True)]
+    assert explaining.commands[0]["explain"]["sort"] == {"created_at": -1}
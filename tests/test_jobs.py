@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import server
+
+
+def new_job(**fields):
+    return {"id": "job-1", "status": "queued", "params": {}, "attempts": 0, "created_at": datetime.utcnow(),
+            "started_at": None, "finished_at": None, "result": None, "error": None, **fields}
+
+
+@pytest.fixture
+def store(db, monkeypatch):
+    monkeypatch.setattr(server, "JOB_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(server, "JOB_LEASE_SECONDS", 60)
+    return server.MongoJobStore(db)
+
+
+@pytest.mark.anyio
+async def test_expired_lease_is_claimed_again(store):
+    await store.insert(new_job())
+    now = datetime.utcnow()
+    assert (await store.claim(now))["attempts"] == 1
+    assert await store.claim(now) is None
+    retried = await store.claim(now + timedelta(seconds=61))
+    assert retried["attempts"] == 2 and retried["status"] == "running"
+
+
+@pytest.mark.anyio
+async def test_job_whose_last_lease_expires_is_failed(store):
+    await store.insert(new_job())
+    now = datetime.utcnow()
+    await store.claim(now)
+    await store.claim(now + timedelta(seconds=61))
+
+    later = now + timedelta(seconds=200)
+    assert await store.claim(later) is None
+    job = await store.get("job-1")
+    assert job["status"] == "failed"
+    assert abs(job["finished_at"] - later) < timedelta(milliseconds=1)
+    assert "2 attempts" in job["error"]
+    assert "lease_until" not in job
+    assert (await store.counts())["running"] == 0
+
+
+@pytest.mark.anyio
+async def test_live_lease_on_the_last_attempt_is_left_running(store):
+    await store.insert(new_job())
+    now = datetime.utcnow()
+    await store.claim(now)
+    await store.claim(now + timedelta(seconds=61))
+    await store.claim(now + timedelta(seconds=90))
+    assert (await store.get("job-1"))["status"] == "running"
+
+
+async def read_events(response):
+    return [chunk if isinstance(chunk, str) else chunk.decode() async for chunk in response.body_iterator]
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(server, "JOB_POLL_SECONDS", 0.01)
+    service = server.ClassificationJobService(server.InMemoryJobStore())
+    monkeypatch.setattr(server, "job_service", service)
+    return service
+
+
+@pytest.mark.anyio
+async def test_event_stream_ends_when_the_job_disappears(service):
+    job = await service.enqueue({})
+    response = await server.stream_job_events(job["id"])
+    service.store._jobs.clear()
+    events = await read_events(response)
+    assert events[0].startswith("event: status")
+    assert events[-1].startswith("event: gone")
+
+
+@pytest.mark.anyio
+async def test_event_stream_ends_on_a_final_state(service):
+    job = await service.enqueue({})
+    response = await server.stream_job_events(job["id"])
+    await service.store.finish(job["id"], {"status": "failed", "error": "boom", "finished_at": datetime.utcnow()})
+    events = await read_events(response)
+    assert '"status": "failed"' in events[-1]
@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import server
+
+
+@pytest.fixture(params=["memory", "mongo"])
+def store(request, db):
+    if request.param == "memory":
+        return server.InMemorySortedSetStore()
+    return server.MongoSortedSetStore(db)
+
+
+@pytest.mark.anyio
+async def test_sorted_set_orders_by_score_then_member(store):
+    for member, score in [("carol", 30), ("alice", 50), ("bob", 30), ("dave", 10)]:
+        await store.zincrby("all_time", member, score)
+    assert await store.zrevrange("all_time", 0, 2) == [("alice", 50), ("bob", 30), ("carol", 30)]
+    assert await store.zrevrank("all_time", "carol") == 1
+    assert await store.zrevrank("all_time", "nobody") is None
+    assert await store.zrevrange_after("all_time", 30, "bob", 5) == [("carol", 30), ("dave", 10)]
+
+
+@pytest.mark.anyio
+async def test_members_dropping_to_zero_leave_the_set(store):
+    await store.zincrby("weekly", "alice", 20)
+    await store.zincrby("weekly", "alice", -20)
+    assert await store.zscore("weekly", "alice") is None
+    assert await store.is_empty()
+
+
+@pytest.mark.anyio
+async def test_claim_only_advances_the_watermark(store):
+    assert await store.claim("expired:weekly", "2026-10-01")
+    assert not await store.claim("expired:weekly", "2026-10-01")
+    assert not await store.claim("expired:weekly", "2026-09-30")
+    assert await store.claim("expired:weekly", "2026-10-02")
+
+
+@pytest.fixture
+def boards(store, monkeypatch):
+    service = server.LeaderboardService(store)
+    monkeypatch.setattr(server, "leaderboard", service)
+    return service
+
+
+@pytest.mark.anyio
+async def test_concurrent_startups_seed_the_boards_once(db, store, boards, monkeypatch):
+    await db.user_stats.insert_many([
+        {"user_id": "u1", "total_points": 40}, {"user_id": "u2", "total_points": 25}, {"user_id": "u3", "total_points": 0}
+    ])
+    await db.waste_classifications.insert_one({"user_id": "u1", "points_awarded": 15, "timestamp": datetime.utcnow()})
+
+    # Several workers starting at once all see an empty store before any of them seeds it
+    checked = asyncio.Event()
+    checks = []
+    is_empty = store.is_empty
+
+    async def all_check_first():
+        checks.append(await is_empty())
+        if len(checks) == 3:
+            checked.set()
+        await checked.wait()
+        return checks[-1]
+
+    monkeypatch.setattr(store, "is_empty", all_check_first)
+    await asyncio.gather(*(server.init_leaderboard() for _ in range(3)))
+    monkeypatch.setattr(store, "is_empty", is_empty)
+    assert await boards.top("all_time", 10) == [("u1", 40), ("u2", 25)]
+    assert await boards.top("weekly", 10) == [("u1", 15)]
+
+    # A later restart finds the boards seeded
+    await server.init_leaderboard()
+    assert await boards.rank("all_time", "u1") == (1, 40)
+
+
+@pytest.mark.anyio
+async def test_points_leave_a_window_once_their_day_expires(boards, store, monkeypatch):
+    await boards.record("u1", 10)
+    assert await boards.top("weekly", 5) == [("u1", 10)]
+
+    class Later(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime.utcnow() + timedelta(days=8)
+
+    monkeypatch.setattr(server, "datetime", Later)
+    assert await boards.top("weekly", 5) == []
+    assert await boards.top("monthly", 5) == [("u1", 10)]
+    assert await boards.top("all_time", 5) == [("u1", 10)]
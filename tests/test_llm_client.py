@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+import server
+
+
+class FlakyChat:
+    """Chat client failing the first `failures` sends across all instances"""
+    sent = 0
+    failures = 0
+
+    def __init__(self, api_key, session_id, system_message):
+        pass
+
+    def with_model(self, provider, model):
+        return self
+
+    async def send_message(self, message):
+        FlakyChat.sent += 1
+        if FlakyChat.sent <= FlakyChat.failures:
+            raise ConnectionError("provider unreachable")
+        return f"answer to {message.text}"
+
+
+class SlowChat(FlakyChat):
+    async def send_message(self, message):
+        await asyncio.sleep(1)
+        return "too late"
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(server, "LLM_MAX_RETRIES", 2)
+    monkeypatch.setattr(server, "LLM_RETRY_BASE_SECONDS", 0)
+    monkeypatch.setattr(server, "LLM_BREAKER_THRESHOLD", 3)
+    monkeypatch.setattr(server, "LLM_BREAKER_RESET_SECONDS", 60)
+    FlakyChat.sent = 0
+    FlakyChat.failures = 0
+    pool = server.LlmClientPool(2)
+    pool._chat_class = FlakyChat
+    return pool
+
+
+def test_breaker_opens_after_threshold_and_lets_one_trial_through(monkeypatch):
+    breaker = server.CircuitBreaker(threshold=2, reset_seconds=10)
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    # Once the reset window has passed, exactly one trial call is allowed
+    breaker.opened_at -= 10
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_failed_trial_reopens_the_breaker():
+    breaker = server.CircuitBreaker(threshold=5, reset_seconds=10)
+    for _ in range(5):
+        breaker.record_failure()
+    breaker.opened_at -= 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+@pytest.mark.anyio
+async def test_pool_retries_transient_failures(pool):
+    FlakyChat.failures = 2
+    assert await pool.complete("bottle") == "answer to bottle"
+    assert FlakyChat.sent == 3
+    assert pool.stats()["retries"] == 2
+
+
+@pytest.mark.anyio
+async def test_pool_raises_unavailable_after_last_retry(pool):
+    FlakyChat.failures = 100
+    with pytest.raises(server.LlmUnavailable):
+        await pool.complete("bottle")
+    assert FlakyChat.sent == 3
+
+
+@pytest.mark.anyio
+async def test_open_breaker_rejects_without_calling_the_provider(pool):
+    FlakyChat.failures = 100
+    with pytest.raises(server.LlmUnavailable):
+        await pool.complete("bottle")
+    sent = FlakyChat.sent
+    with pytest.raises(server.LlmUnavailable, match="circuit breaker"):
+        await pool.complete("bottle")
+    assert FlakyChat.sent == sent
+    assert pool.stats()["rejected"] == 1
+
+
+@pytest.mark.anyio
+async def test_pool_times_out_slow_calls(pool, monkeypatch):
+    monkeypatch.setattr(server, "LLM_TIMEOUT_SECONDS", 0.01)
+    monkeypatch.setattr(server, "LLM_MAX_RETRIES", 0)
+    pool._chat_class = SlowChat
+    pool._idle.clear()
+    with pytest.raises(server.LlmUnavailable):
+        await pool.complete("bottle")
+
+
+@pytest.mark.anyio
+async def test_fake_backend_answers_without_the_provider_sdk():
+    pool = server.LlmClientPool(1)
+    answer = await pool.complete("bottle")
+    assert "CATEGORY: LANDFILL" in answer
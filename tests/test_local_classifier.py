@@ -0,0 +1,55 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+
+NEAR_MISSES = ["phone case", "paper towel", "paper cup", "cable tie", "monitor stand", "paint brush", "oil filter",
+               "phone cases", "paper towels"]
+
+
+@pytest.mark.parametrize("description", NEAR_MISSES)
+def test_partial_matches_are_not_confident(description):
+    result = server.classify_locally(description)
+    assert result is not None
+    assert result["confidence"] < server.LOCAL_CLASSIFIER_THRESHOLD
+    # Even a permissive threshold keeps half-covered descriptions away from the fast path
+    assert result["confidence"] < 0.6
+
+
+@pytest.mark.parametrize("description, category", [
+    ("plastic bottle", "RECYCLE"),
+    ("an empty Aluminum Can", "RECYCLE"),
+    ("coffee grounds", "COMPOST"),
+    ("old battery", "E_WASTE"),
+    # The plural suffix the matcher accepts counts towards coverage
+    ("plastic bottles", "RECYCLE"),
+    ("Aluminum Cans", "RECYCLE"),
+    ("newspapers", "RECYCLE"),
+    ("old phones", "E_WASTE"),
+])
+def test_fully_covered_descriptions_are_confident(description, category):
+    result = server.classify_locally(description)
+    assert result["category"] == category
+    assert result["confidence"] >= server.LOCAL_CLASSIFIER_THRESHOLD
+
+
+def test_items_from_several_categories_are_not_confident():
+    result = server.classify_locally("glass bottle and food waste")
+    assert result["confidence"] < server.LOCAL_CLASSIFIER_THRESHOLD
+
+
+def test_unknown_descriptions_have_no_local_result():
+    assert server.classify_locally("banana peel") is None
+    assert server.classify_locally("") is None
+
+
+@pytest.mark.parametrize("description", ["phone case", "paint brush"])
+def test_near_misses_are_sent_to_the_llm(db, monkeypatch, description):
+    monkeypatch.setattr(server, "classifier_routing", {"local": 0, "cache": 0, "llm": 0, "coalesced": 0})
+    monkeypatch.setattr(server, "classification_cache", server.ClassificationCache(100, 60))
+    response = TestClient(server.app).post("/api/classify-waste", json={
+        "image_base64": "", "description": description, "user_id": "u1"
+    })
+    assert response.status_code == 200
+    assert server.classifier_routing["local"] == 0
+    assert server.classifier_routing["llm"] == 1
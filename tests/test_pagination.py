@@ -0,0 +1,95 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import server
+
+# Six bins at three spots: each spot holds two co-located bins
+SPOTS = [(40.7000, -74.0000), (40.7100, -74.0000), (40.7200, -74.0000)]
+BINS = [
+    {"name": f"Bin {n}", "type": "recycling", "latitude": lat, "longitude": lon,
+     "address": "Main St", "accepted_waste_types": ["RECYCLE"]}
+    for n, (lat, lon) in enumerate(spot for spot in SPOTS for _ in range(2))
+]
+
+
+def test_cursor_round_trips_dates_and_numbers():
+    values = [datetime(2026, 10, 1, 12, 30), 4.25, "bin-3"]
+    assert server.decode_cursor(server.encode_cursor(values), 3) == values
+
+
+@pytest.mark.parametrize("token", ["not-base64!", server.encode_cursor([1, 2, 3])])
+def test_malformed_or_misshapen_cursors_are_rejected(token):
+    with pytest.raises(HTTPException) as error:
+        server.decode_cursor(token, 2)
+    assert error.value.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_keyset_filter_resumes_strictly_after_ties(db):
+    await db.rows.insert_many([{"score": s, "id": i} for s, i in [(5, "a"), (5, "b"), (5, "c"), (3, "a"), (9, "z")]])
+    query = server.keyset_filter([("score", -1), ("id", 1)], [5, "b"])
+    rows = await db.rows.find(query, {"_id": 0}).sort([("score", -1), ("id", 1)]).to_list(None)
+    assert [(row["score"], row["id"]) for row in rows] == [(5, "c"), (3, "a")]
+
+
+class CapturingCollection:
+    def __init__(self):
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return self
+
+    async def to_list(self, length):
+        return []
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("after", [None, [1.5, "bin-3"]])
+async def test_every_geo_page_is_cut_in_cursor_order(monkeypatch, after):
+    collection = CapturingCollection()
+    monkeypatch.setattr(server, "db", type("Db", (), {"bin_locations": collection})())
+    await server.geo_near_bins(40.7, -74.0, {}, limit=3, after=after)
+    stages = [next(iter(stage)) for stage in collection.pipelines[0]]
+    assert stages.index("$sort") < stages.index("$limit")
+    assert collection.pipelines[0][stages.index("$sort")]["$sort"] == {"distance": 1, "id": 1}
+
+
+def page_through(client, params):
+    ids, cursor = [], None
+    while True:
+        response = client.get("/api/bins", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        ids += [row["id"] for row in response.json()]
+        cursor = response.headers.get(server.NEXT_CURSOR_HEADER)
+        if not cursor:
+            return ids
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    index = server.BinSpatialIndex()
+    index.load([])
+    monkeypatch.setattr(server, "bin_index", index)
+    server.response_cache.invalidate("bins")
+    return TestClient(server.app)
+
+
+def create_bins(client) -> list:
+    """Ids of the created bins, in creation order"""
+    return [client.post("/api/bins", json=bin_data).json()["id"] for bin_data in BINS]
+
+
+def test_unlocated_pages_cover_every_bin_once(client):
+    ids = create_bins(client)
+    assert page_through(client, {"limit": 4}) == sorted(ids)
+
+
+def test_located_pages_keep_co_located_bins(client):
+    ids = create_bins(client)
+    # Pages of one split each pair of co-located bins across pages
+    paged = page_through(client, {"latitude": 40.7, "longitude": -74.0, "radius_km": 50, "limit": 1})
+    assert paged == [bin_id for pair in zip(ids[::2], ids[1::2]) for bin_id in sorted(pair)]
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+import server
+
+
+def waste(**fields):
+    return server.WasteClassification(
+        classification="Plastic bottle", category="RECYCLE", suggestions="", recycling_info="",
+        environmental_impact="", user_id="u1", **fields
+    )
+
+
+@pytest.fixture
+def writes(db, monkeypatch):
+    """Stub the three writes so the test can see which ran and whether they finished"""
+    log = []
+
+    async def rollups(classifications):
+        log.append("rollup")
+
+    async def user_stats(*args):
+        log.append("stats")
+
+    monkeypatch.setattr(server, "record_classification_rollups", rollups)
+    monkeypatch.setattr(server, "update_user_stats_advanced", user_stats)
+    return log
+
+
+@pytest.mark.anyio
+async def test_writes_do_not_wait_for_the_bin_lookup(db, writes, monkeypatch):
+    stats_written = asyncio.Event()
+
+    async def user_stats(*args):
+        writes.append("stats")
+        stats_written.set()
+
+    async def slow_lookup(*args, **kwargs):
+        # Only finishes once the writes have gone through, so it must overlap them
+        await stats_written.wait()
+        return [{"id": "bin-1"}]
+
+    monkeypatch.setattr(server, "update_user_stats_advanced", user_stats)
+    monkeypatch.setattr(server, "find_nearest_bins", slow_lookup)
+    recorded = server.record_classification(waste(location={"latitude": 40.7, "longitude": -74.0}), None)
+    assert await asyncio.wait_for(recorded, 1) == [{"id": "bin-1"}]
+    assert sorted(writes) == ["rollup", "stats"]
+    assert await db.waste_classifications.count_documents({}) == 1
+
+
+@pytest.mark.anyio
+async def test_a_slow_bin_lookup_is_not_timed_out(db, writes, monkeypatch):
+    async def slow_lookup(*args, **kwargs):
+        await asyncio.sleep(0.05)
+        return []
+
+    monkeypatch.setattr(server, "QUERY_TIMEOUT_SECONDS", 0.01)
+    monkeypatch.setattr(server, "find_nearest_bins", slow_lookup)
+    assert await server.record_classification(waste(location={"latitude": 40.7, "longitude": -74.0}), None) == []
+    assert await db.waste_classifications.count_documents({}) == 1
+
+
+@pytest.mark.anyio
+async def test_failed_image_upload_writes_nothing(db, writes, monkeypatch):
+    async def store_fails(source, require_image=False):
+        raise ConnectionError("blob store unavailable")
+
+    monkeypatch.setattr(server, "store_image", store_fails)
+    with pytest.raises(ConnectionError):
+        await server.record_classification(waste(), b"image bytes")
+    assert writes == []
+    assert await db.waste_classifications.find_one({}) is None
+
+
+@pytest.mark.anyio
+async def test_a_failing_write_does_not_cancel_the_others(db, writes, monkeypatch):
+    async def slow_rollups(classifications):
+        await asyncio.sleep(0.05)
+        writes.append("rollup")
+
+    async def stats_fail(*args):
+        raise ConnectionError("user_stats unavailable")
+
+    monkeypatch.setattr(server, "QUERY_TIMEOUT_SECONDS", 0.01)
+    monkeypatch.setattr(server, "record_classification_rollups", slow_rollups)
+    monkeypatch.setattr(server, "update_user_stats_advanced", stats_fail)
+    with pytest.raises(ConnectionError):
+        await server.record_classification(waste(), None)
+    # The slow write outlived both the failure and the query timeout
+    assert writes == ["rollup"]
+    assert await db.waste_classifications.count_documents({}) == 1
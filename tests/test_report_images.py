@@ -0,0 +1,82 @@
+import base64
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import server
+
+
+def png_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), (30, 140, 60)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_decode_accepts_line_wrapped_base64():
+    image = png_bytes()
+    wrapped = base64.encodebytes(image).decode()
+    assert "\n" in wrapped
+    assert server.decode_image_base64(wrapped) == image
+    assert server.decode_image_base64("data:image/png;base64," + wrapped.replace("\n", "\r\n")) == image
+
+
+def test_decode_accepts_missing_padding():
+    assert server.decode_image_base64(base64.b64encode(b"abcd").decode().rstrip("=")) == b"abcd"
+
+
+def test_decode_rejects_non_base64():
+    assert server.decode_image_base64("not*base64!") is None
+    assert server.decode_image_base64("") is None
+
+
+@pytest.mark.anyio
+async def test_migration_moves_wrapped_images_and_keeps_undecodable_ones(db):
+    image = png_bytes()
+    await db.waste_reports.insert_many([
+        {"id": "wrapped", "image_base64": base64.encodebytes(image).decode()},
+        {"id": "broken", "image_base64": "%%% not an image %%%"},
+        {"id": "blank", "image_base64": ""},
+    ])
+
+    assert await server.migrate_report_images(batch_size=1) == 2
+
+    wrapped = await db.waste_reports.find_one({"id": "wrapped"})
+    assert "image_base64" not in wrapped
+    assert wrapped["image_id"] == server.blob_id_for(image)
+    assert await server.blob_store.exists(wrapped["image_id"])
+    assert (await db.waste_reports.find_one({"id": "broken"}))["image_base64"] == "%%% not an image %%%"
+    assert "image_base64" not in await db.waste_reports.find_one({"id": "blank"})
+
+
+@pytest.mark.anyio
+async def test_migration_keeps_inline_image_when_the_blob_store_fails(db, monkeypatch):
+    async def store_fails(source, require_image=False):
+        raise ConnectionError("GridFS unavailable")
+
+    monkeypatch.setattr(server, "store_image", store_fails)
+    encoded = base64.b64encode(png_bytes()).decode()
+    await db.waste_reports.insert_one({"id": "r1", "image_base64": encoded})
+
+    assert await server.migrate_report_images() == 0
+    report = await db.waste_reports.find_one({"id": "r1"})
+    assert report["image_base64"] == encoded
+    assert "image_id" not in report
+
+
+def report_payload(image_base64):
+    return {"location": "Main St", "latitude": 40.7, "longitude": -74.0, "description": "Overflowing bin",
+            "user_id": "u1", "image_base64": image_base64}
+
+
+def test_create_report_rejects_undecodable_image(db):
+    response = TestClient(server.app).post("/api/reports", json=report_payload("%%% not an image %%%"))
+    assert response.status_code == 400
+
+
+def test_create_report_stores_line_wrapped_image(db):
+    image = png_bytes()
+    response = TestClient(server.app).post("/api/reports", json=report_payload(base64.encodebytes(image).decode()))
+    assert response.status_code == 200
+    assert response.json()["image_id"] == server.blob_id_for(image)
@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime
+
+import httpx
+import pytest
+
+import server
+
+
+@pytest.fixture
+def boards(db, monkeypatch):
+    service = server.LeaderboardService(server.InMemorySortedSetStore())
+    monkeypatch.setattr(server, "leaderboard", service)
+    server.response_cache._entries.clear()
+    server.response_cache.invalidate("leaderboard", "analytics", "bins")
+    return service
+
+
+@pytest.fixture
+async def client():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test") as client:
+        yield client
+
+
+LEADERBOARD = "/api/leaderboard?view=summary"
+
+
+@pytest.mark.anyio
+async def test_second_request_is_a_hit_with_the_same_etag(boards, client):
+    await boards.record("u1", 10)
+    first = await client.get(LEADERBOARD)
+    second = await client.get(LEADERBOARD)
+    assert (first.headers["x-cache"], second.headers["x-cache"]) == ("MISS", "HIT")
+    assert first.content == second.content
+    assert first.headers["etag"] == second.headers["etag"]
+    # Query parameter order does not split the cache
+    reordered = await client.get("/api/leaderboard?limit=10&view=summary")
+    also = await client.get("/api/leaderboard?view=summary&limit=10")
+    assert also.headers["x-cache"] == "HIT" and also.content == reordered.content
+
+
+@pytest.mark.anyio
+async def test_matching_if_none_match_gets_an_empty_304(boards, client):
+    etag = (await client.get(LEADERBOARD)).headers["etag"]
+    response = await client.get(LEADERBOARD, headers={"If-None-Match": f'W/{etag}, "other"'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    stale = await client.get(LEADERBOARD, headers={"If-None-Match": '"stale"'})
+    assert stale.status_code == 200
+
+
+@pytest.mark.anyio
+async def test_errors_are_not_cached(boards, client):
+    assert (await client.get("/api/leaderboard?cursor=garbage")).status_code == 400
+    assert (await client.get("/api/leaderboard?cursor=garbage")).headers.get("x-cache") is None
+
+
+@pytest.mark.anyio
+async def test_page_rendered_during_a_write_is_not_served_after_it(boards, client, monkeypatch):
+    release = asyncio.Event()
+    zincrby = boards.store.zincrby
+
+    async def slow_zincrby(*args):
+        await release.wait()
+        return await zincrby(*args)
+
+    monkeypatch.setattr(boards.store, "zincrby", slow_zincrby)
+    recording = asyncio.create_task(boards.record("u1", 10))
+    await asyncio.sleep(0)
+    during = await client.get(LEADERBOARD)
+    assert during.json() == []
+
+    release.set()
+    await recording
+    after = await client.get(LEADERBOARD)
+    assert after.headers["x-cache"] == "MISS"
+    assert [row["user_id"] for row in after.json()] == ["u1"]
+
+
+@pytest.mark.anyio
+async def test_analytics_bump_retires_the_cached_snapshot(db, boards, client):
+    await db.analytics_snapshot.insert_one({"_id": "global", "total_scans": 1, "updated_at": datetime.utcnow(),
+                                            "reconciled_at": datetime.utcnow()})
+    assert (await client.get("/api/analytics/global")).json()["total_scans"] == 1
+    await server.bump_analytics({"total_scans": 2})
+    response = await client.get("/api/analytics/global")
+    assert response.headers["x-cache"] == "MISS"
+    assert response.json()["total_scans"] == 3
+
+
+@pytest.mark.anyio
+async def test_bin_index_refresh_retires_cached_bin_pages(db, boards, monkeypatch):
+    monkeypatch.setattr(server, "BIN_INDEX_REFRESH_SECONDS", 0)
+    monkeypatch.setattr(server, "bin_index", server.BinSpatialIndex())
+    before = server.response_cache.stats()["versions"]["bins"]
+    refresher = asyncio.create_task(server.refresh_bin_index_periodically())
+    for _ in range(20):
+        await asyncio.sleep(0)
+        if server.response_cache.stats()["versions"]["bins"] > before:
+            break
+    refresher.cancel()
+    assert server.response_cache.stats()["versions"]["bins"] > before
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+import server
+
+
+@pytest.mark.anyio
+async def test_concurrent_identical_keys_share_one_call():
+    flights = server.SingleFlight()
+    calls = []
+
+    async def work(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    results = await asyncio.gather(*(flights.run("k", work, 21) for _ in range(3)))
+    assert results == [(42, False), (42, True), (42, True)]
+    assert calls == [21]
+    assert flights.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 2}
+
+    # Once landed, the next call starts a fresh flight
+    assert await flights.run("k", work, 1) == (2, False)
+
+
+@pytest.mark.anyio
+async def test_leader_error_reaches_every_waiter():
+    flights = server.SingleFlight()
+
+    async def fails():
+        await asyncio.sleep(0.01)
+        raise server.LlmUnavailable("provider down")
+
+    results = await asyncio.gather(*(flights.run("k", fails) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, server.LlmUnavailable) for result in results)
+    assert flights.stats()["in_flight"] == 0
+
+
+@pytest.mark.anyio
+async def test_cancelled_leader_does_not_cancel_the_shared_call():
+    flights = server.SingleFlight()
+    release = asyncio.Event()
+    finished = []
+
+    async def work():
+        await release.wait()
+        finished.append(True)
+        return "answer"
+
+    leader = asyncio.create_task(flights.run("k", work))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flights.run("k", work))
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    assert await follower == ("answer", True)
+    assert finished == [True]
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+
+@pytest.mark.anyio
+async def test_identical_scans_in_flight_make_one_llm_call(llm_calls):
+    key = server.ClassificationCache.key(b"", "banana peel")
+    items = await asyncio.gather(*(server.classify_item(None, key, "banana peel", f"u{n}") for n in range(3)))
+    assert llm_calls == ["banana peel"]
+    assert [item.classified_by for item in items] == ["llm", "coalesced", "coalesced"]
+    assert server.classifier_routing == {"local": 0, "cache": 0, "llm": 1, "coalesced": 2}
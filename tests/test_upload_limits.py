@@ -0,0 +1,107 @@
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import server
+
+LIMIT = 64 * 1024
+BOUNDARY = "upload-boundary"
+
+
+def jpeg_bytes(size=(320, 240)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 120, 40)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def multipart_body(image: bytes, **fields) -> bytes:
+    parts = [
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in fields.items()
+    ]
+    parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="scan.jpg"\r\n'
+                 f'Content-Type: image/jpeg\r\n\r\n'.encode() + image + b"\r\n")
+    return b"".join(parts) + f"--{BOUNDARY}--\r\n".encode()
+
+
+def chunked(body: bytes, size=8192):
+    """A generator body, which the client sends with chunked encoding and no Content-Length"""
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+async def post_streamed(path: str, body: bytes, content_type: str, size=8192):
+    """POST a chunked body straight to the ASGI app; returns (status, bytes the app received)"""
+    received = 0
+    chunks = [body[start:start + size] for start in range(0, len(body), size)]
+    messages = []
+
+    async def receive():
+        nonlocal received
+        if not chunks:
+            return {"type": "http.request", "body": b"", "more_body": False}
+        chunk = chunks.pop(0)
+        received += len(chunk)
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+             "headers": [(b"content-type", content_type.encode()), (b"transfer-encoding", b"chunked")],
+             "client": ("test", 1), "server": ("test", 80)}
+    await server.app(scope, receive, send)
+    return messages[0]["status"], received
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setattr(server, "BLOB_MAX_BYTES", LIMIT)
+    return TestClient(server.app)
+
+
+MULTIPART = {"content-type": f"multipart/form-data; boundary={BOUNDARY}"}
+
+
+@pytest.mark.anyio
+async def test_chunked_raw_body_is_cut_off_at_the_limit(client):
+    status, received = await post_streamed("/api/classify-waste/upload", b"\xff" * (LIMIT * 10), "image/jpeg")
+    assert status == 413
+    assert received <= LIMIT + 8192
+
+
+@pytest.mark.anyio
+async def test_chunked_multipart_is_cut_off_at_the_limit(client):
+    body = multipart_body(b"\xff" * (LIMIT * 10), user_id="u1")
+    status, received = await post_streamed("/api/classify-waste/upload", body, MULTIPART["content-type"])
+    assert status == 413
+    # The form is not read to the end before the limit applies
+    assert received <= LIMIT + 8192
+
+
+def test_declared_size_over_the_limit_is_rejected_up_front(client):
+    response = client.post("/api/classify-waste/upload", content=b"\xff" * (LIMIT + 1),
+                           headers={"content-type": "image/jpeg"})
+    assert response.status_code == 413
+
+
+def test_chunked_multipart_upload_is_classified(client):
+    body = multipart_body(jpeg_bytes(), user_id="u7", description="plastic bottle")
+    response = client.post("/api/classify-waste/upload", content=chunked(body), headers=MULTIPART)
+    assert response.status_code == 200
+    assert response.json()["category"] == "RECYCLE"
+
+
+def test_raw_body_upload_is_classified(client):
+    response = client.post("/api/classify-waste/upload?description=plastic%20bottle", content=jpeg_bytes(),
+                           headers={"content-type": "image/jpeg"})
+    assert response.status_code == 200
+
+
+def test_multipart_without_a_file_is_rejected(client):
+    body = f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="user_id"\r\n\r\nu1\r\n--{BOUNDARY}--\r\n'
+    response = client.post("/api/classify-waste/upload", content=body.encode(), headers=MULTIPART)
+    assert response.status_code == 400
@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+import server
+
+SCAN = {"total_points": 10, "items_scanned": 1, "co2_saved_kg": 0.5, "items_recycled": 1}
+
+
+class FaultyCollection:
+    """Wraps a mongomock collection; `faults` maps a method name to a callable run in its place"""
+
+    def __init__(self, inner, faults):
+        self._inner = inner
+        self._faults = faults
+
+    def __getattr__(self, name):
+        if name in self._faults:
+            return lambda *args, **kwargs: self._faults[name](self._inner, *args, **kwargs)
+        return getattr(self._inner, name)
+
+
+class FaultyDb:
+    def __init__(self, inner, faults):
+        self._inner = inner
+        self.user_stats = FaultyCollection(inner.user_stats, faults)
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+def fail_with(error):
+    def fault(inner, *args, **kwargs):
+        raise error
+    return fault
+
+
+@pytest.fixture
+def buffer(db, monkeypatch):
+    monkeypatch.setattr(server, "leaderboard", server.LeaderboardService(server.InMemorySortedSetStore()))
+    return server.UserStatsBuffer(enabled=True, flush_ms=60000, flush_ops=1000)
+
+
+async def stored(db, user_id):
+    return await db.user_stats.find_one({"user_id": user_id})
+
+
+@pytest.mark.anyio
+async def test_flush_writes_folded_scans_once(db, buffer):
+    for _ in range(3):
+        buffer.add_scans("u1", SCAN, {"RECYCLE": 1})
+    assert await buffer.flush() == 3
+    doc = await stored(db, "u1")
+    assert (doc["total_points"], doc["items_scanned"], doc["items_recycled"]) == (30, 3, 3)
+    assert await buffer.flush() == 0
+    assert await server.leaderboard.top("all_time", 5) == [("u1", 30)]
+
+
+@pytest.mark.anyio
+async def test_failed_read_back_does_not_reapply_the_write(db, buffer, monkeypatch):
+    monkeypatch.setattr(server, "db", FaultyDb(db, {"find": fail_with(AutoReconnect("read-back lost"))}))
+    buffer.add_scans("u1", SCAN, {"RECYCLE": 1})
+    assert await buffer.flush() == 1
+    assert buffer.pending("u1") == {}
+
+    monkeypatch.setattr(server, "db", db)
+    assert await buffer.flush() == 0
+    doc = await stored(db, "u1")
+    assert (doc["total_points"], doc["items_scanned"]) == (10, 1)
+    assert buffer.stats()["readback_failures"] == 1
+    # Base points are still recorded without the read-back
+    assert await server.leaderboard.top("all_time", 5) == [("u1", 10)]
+
+
+@pytest.mark.anyio
+async def test_failed_bulk_write_keeps_deltas_pending(db, buffer, monkeypatch):
+    monkeypatch.setattr(server, "db", FaultyDb(db, {"bulk_write": fail_with(AutoReconnect("primary stepped down"))}))
+    buffer.add_scans("u1", SCAN, {"RECYCLE": 1})
+    buffer.add_points("u2", 5)
+    assert await buffer.flush() == 0
+    assert buffer.pending("u1")["total_points"] == 10
+    assert buffer.stats()["failures"] == 1
+    assert await stored(db, "u1") is None
+
+    buffer.add_scans("u1", SCAN, {"RECYCLE": 1})
+    monkeypatch.setattr(server, "db", db)
+    await buffer.flush()
+    doc = await stored(db, "u1")
+    assert (doc["total_points"], doc["items_scanned"]) == (20, 2)
+
+
+@pytest.mark.anyio
+async def test_partial_bulk_write_failure_restores_only_failed_users(db, buffer, monkeypatch):
+    async def second_update_fails(inner, requests, **kwargs):
+        await inner.bulk_write([requests[0]], **kwargs)
+        raise BulkWriteError({"writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate key"}]})
+
+    monkeypatch.setattr(server, "db", FaultyDb(db, {"bulk_write": second_update_fails}))
+    buffer.add_scans("u1", SCAN, {"RECYCLE": 1})
+    buffer.add_scans("u2", SCAN, {"RECYCLE": 1})
+    assert await buffer.flush() == 1
+    assert buffer.pending("u1") == {}
+    assert buffer.pending("u2")["items_scanned"] == 1
+
+    monkeypatch.setattr(server, "db", db)
+    await buffer.flush()
+    assert (await stored(db, "u1"))["items_scanned"] == 1
+    assert (await stored(db, "u2"))["items_scanned"] == 1
+
+
+@pytest.mark.anyio
+async def test_in_flight_batch_stays_visible_until_acknowledged(db, buffer, monkeypatch):
+    release = asyncio.Event()
+
+    async def slow_write(inner, *args, **kwargs):
+        await release.wait()
+        return await inner.bulk_write(*args, **kwargs)
+
+    monkeypatch.setattr(server, "db", FaultyDb(db, {"bulk_write": slow_write}))
+    buffer.add_scans("u1", SCAN, {"RECYCLE": 1})
+    flushing = asyncio.create_task(buffer.flush())
+    await asyncio.sleep(0)
+    assert buffer.pending("u1")["total_points"] == 10
+
+    # Deltas added while a batch is in flight count on top of it
+    buffer.add_points("u1", 5)
+    assert buffer.pending("u1")["total_points"] == 15
+
+    release.set()
+    await flushing
+    assert buffer.pending("u1") == {"total_points": 5}
+
+
+@pytest.mark.anyio
+async def test_report_points_ride_along_with_a_new_users_scans(db, buffer):
+    buffer.add_points("new", 5)
+    buffer.add_scans("new", SCAN, {"RECYCLE": 1})
+    buffer.add_points("ghost", 5)
+    await buffer.flush()
+    assert (await stored(db, "new"))["total_points"] == 15
+    # Report points never create a user
+    assert await stored(db, "ghost") is None
+    assert await server.leaderboard.top("all_time", 5) == [("new", 15)]
+
+
+@pytest.mark.anyio
+async def test_stop_flushes_what_is_pending(db, buffer):
+    buffer.start()
+    buffer.add_scans("u1", SCAN, {"RECYCLE": 1})
+    await buffer.stop()
+    assert (await stored(db, "u1"))["items_scanned"] == 1
@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo import ReturnDocument
+
+import server
+
+NOON = datetime(2026, 10, 14, 12, 0)
+SCAN = {"total_points": 10, "items_scanned": 1, "co2_saved_kg": 0.5, "items_recycled": 1}
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = server.BadgeRuleEngine()
+    engine.load(server.BADGES)
+    monkeypatch.setattr(server, "badge_engine", engine)
+    return engine
+
+
+async def scan(db, now, increments=SCAN, user_id="u1"):
+    return await db.user_stats.find_one_and_update(
+        {"user_id": user_id}, server.user_stats_pipeline(now, increments),
+        upsert=True, return_document=ReturnDocument.AFTER
+    )
+
+
+async def existing(db, **fields):
+    await db.user_stats.insert_one({**server.UserStats(user_id="u1", created_at=NOON - timedelta(days=30)).dict(),
+                                    **fields})
+
+
+@pytest.mark.anyio
+async def test_new_user_is_created_with_defaults(db, engine):
+    stats = await scan(db, NOON)
+    assert (stats["total_points"], stats["items_scanned"], stats["items_recycled"]) == (10, 1, 1)
+    assert (stats["compost_items"], stats["badges"], stats["daily_streak"], stats["level"]) == (0, [], 1, 1)
+    assert stats["created_at"] == stats["last_scan_date"] == NOON
+    assert "_badge_bonus" not in stats
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("last_scan, streak", [
+    (NOON - timedelta(hours=3), 3),            # same day keeps it
+    (NOON - timedelta(days=1), 4),             # the next day extends it
+    (NOON - timedelta(days=1, hours=11), 4),   # early yesterday still counts as yesterday
+    (NOON - timedelta(days=2), 1),             # a missed day resets it
+])
+async def test_daily_streak(db, engine, last_scan, streak):
+    await existing(db, daily_streak=3, last_scan_date=last_scan)
+    assert (await scan(db, NOON))["daily_streak"] == streak
+
+
+@pytest.mark.anyio
+async def test_badge_is_awarded_once_with_its_bonus_and_the_level_follows(db, engine):
+    await existing(db, total_points=40, items_scanned=9, last_scan_date=NOON)
+    stats = await scan(db, NOON)
+    # 40 + 10 for the scan + 50 for Eco Warrior crosses the 100-point level threshold
+    assert stats["last_badges_awarded"] == ["Eco Warrior"]
+    assert stats["badges"] == ["Eco Warrior"]
+    assert stats["total_points"] == 100
+    assert stats["level"] == 2
+
+    again = await scan(db, NOON)
+    assert again["last_badges_awarded"] == []
+    assert again["badges"] == ["Eco Warrior"]
+    assert again["total_points"] == 110
+
+
+@pytest.mark.anyio
+async def test_concurrent_scans_award_a_badge_once(db, engine, monkeypatch):
+    monkeypatch.setattr(server, "user_stats_buffer", server.UserStatsBuffer(False, 1000, 100))
+    monkeypatch.setattr(server, "leaderboard", server.LeaderboardService(server.InMemorySortedSetStore()))
+    await existing(db, total_points=40, items_scanned=8, last_scan_date=datetime.utcnow())
+
+    results = await asyncio.gather(*(server.update_user_stats_advanced("u1", "RECYCLE", 10, 0.5) for _ in range(3)))
+    stats = await db.user_stats.find_one({"user_id": "u1"})
+    assert stats["items_scanned"] == 11
+    assert stats["badges"] == ["Eco Warrior"]
+    assert stats["total_points"] == 40 + 30 + 50
+    assert sum(len(result["last_badges_awarded"]) for result in results) == 1
+    # The leaderboard got the bonus exactly once too
+    assert await server.leaderboard.top("all_time", 1) == [("u1", 80)]
+
+
+@pytest.mark.anyio
+async def test_scans_fold_into_one_update_per_user(db, engine, monkeypatch):
+    monkeypatch.setattr(server, "user_stats_buffer", server.UserStatsBuffer(False, 1000, 100))
+    monkeypatch.setattr(server, "leaderboard", server.LeaderboardService(server.InMemorySortedSetStore()))
+    stats = await server.apply_user_scans("u1", [("RECYCLE", 10, 0.5), ("COMPOST", 5, 0.25), ("LANDFILL", 1, 0)])
+    assert (stats["items_scanned"], stats["items_recycled"], stats["compost_items"]) == (3, 1, 1)
+    assert stats["total_points"] == 16
+    assert stats["co2_saved_kg"] == pytest.approx(0.75)
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+import server
+
+
+def brute_force(matcher, text):
+    """Every word-bounded occurrence of every term, found by plain substring search"""
+    text = text.lower()
+    matches = []
+    for term, category in matcher.term_categories.items():
+        start = text.find(term)
+        while start != -1:
+            if matcher._is_boundary(text, start - 1) and matcher._ends_on_boundary(text, start + len(term)):
+                matches.append((start, term, category))
+            start = text.find(term, start + 1)
+    return sorted(matches)
+
+
+@pytest.fixture
+def matcher():
+    return server.WasteTermMatcher({"can": "RECYCLE", "aluminum can": "RECYCLE", "box": "RECYCLE",
+                                    "battery": "E_WASTE", "bat": "HAZARDOUS", "coffee grounds": "COMPOST"})
+
+
+def test_matches_only_whole_words(matcher):
+    assert matcher.find_all("scan the candy") == []
+    assert matcher.find_all("Aluminum Can!") == [(0, "aluminum can", "RECYCLE"), (9, "can", "RECYCLE")]
+
+
+def test_plural_suffixes_are_allowed(matcher):
+    assert [term for _, term, _ in matcher.find_all("two boxes and cans")] == ["box", "can"]
+    assert matcher.find_all("boxing") == []
+
+
+def test_longest_match_wins_and_ties_go_to_the_earliest(matcher):
+    assert matcher.longest_match("an aluminum can") == ("aluminum can", "RECYCLE")
+    assert matcher.longest_match("a box or a can") == ("box", "RECYCLE")
+    assert matcher.longest_match("battery") == ("battery", "E_WASTE")
+    assert matcher.longest_match("nothing here") is None
+
+
+def test_first_category_listing_a_term_wins():
+    matcher = server.WasteTermMatcher.from_categories({
+        "RECYCLE": {"items": ["Glass Jar"]}, "LANDFILL": {"items": ["glass jar", "wrapper"]}
+    })
+    assert matcher.longest_match("GLASS JAR") == ("glass jar", "RECYCLE")
+    assert matcher.longest_match("wrapper") == ("wrapper", "LANDFILL")
+
+
+def test_automaton_agrees_with_substring_search_on_random_text():
+    matcher = server.waste_term_matcher
+    vocabulary = [*list(matcher.term_categories)[:40], "scan", "candy", "old", "the", "es", "s", ",", "-", "2"]
+    rng = random.Random(7)
+    for _ in range(300):
+        text = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 8)))
+        text = text.replace(" s", "s") if rng.random() < 0.3 else text
+        assert matcher.find_all(text) == brute_force(matcher, text), text